@@ -28,6 +28,8 @@ CREATE TABLE IF NOT EXISTS tenant_settings (
   retention_snapshots_days int NOT NULL DEFAULT 30,
   retention_annotated_days int NOT NULL DEFAULT 90,
   retention_reports_days int NOT NULL DEFAULT 90,
+  reasoning_daily_token_budget int,     -- Gemini tokens per UTC day; NULL = unlimited
+  reasoning_monthly_token_budget int,   -- per calendar month; NULL = unlimited
   updated_at timestamptz NOT NULL DEFAULT now()
 );
 
@@ -43,6 +45,7 @@ CREATE TABLE IF NOT EXISTS cameras (
   onvif_port int,
   onvif_username text,
   onvif_password_ref text,
+  roi_polygon jsonb,                      -- [[x, y], ...] normalized; NULL = full frame
   created_at timestamptz NOT NULL DEFAULT now()
 );
 CREATE INDEX IF NOT EXISTS cameras_tenant_idx ON cameras(tenant_id);
@@ -2,6 +2,7 @@
 AFASA 2.0 - NATS Event Bus
 Standardized event publishing and subscription
 """
+import asyncio
 import json
 import uuid
 from datetime import datetime, timezone
@@ -36,6 +37,7 @@ class EventBus:
     def __init__(self):
         self._nc: Optional[NATSClient] = None
         self._js = None
+        self._tasks: set = set()
     
     async def connect(self):
         settings = get_settings()
@@ -80,10 +82,15 @@ class EventBus:
         self,
         subject: str,
         handler: Callable[[EventEnvelope], Any],
-        queue: Optional[str] = None
+        queue: Optional[str] = None,
+        max_in_flight: int = 1
     ):
-        """Subscribe to events with standardized handling"""
-        async def message_handler(msg):
+        """
+        Subscribe to events with standardized handling.
+        With max_in_flight > 1, up to that many handlers run concurrently;
+        further deliveries wait for a free slot.
+        """
+        async def process(msg):
             try:
                 envelope = EventEnvelope.from_json(msg.data)
                 await handler(envelope)
@@ -92,6 +99,22 @@ class EventBus:
                 print(f"Error handling message: {e}")
                 await msg.nak()
         
+        if max_in_flight <= 1:
+            message_handler = process
+        else:
+            slots = asyncio.Semaphore(max_in_flight)
+            
+            async def message_handler(msg):
+                await slots.acquire()
+                task = asyncio.create_task(process(msg))
+                self._tasks.add(task)
+                
+                def _done(t):
+                    self._tasks.discard(t)
+                    slots.release()
+                
+                task.add_done_callback(_done)
+        
         if self._js:
             await self._js.subscribe(subject, cb=message_handler, queue=queue or "afasa-workers")
         elif self._nc:
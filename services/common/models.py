@@ -41,6 +41,8 @@ class TenantSettings(Base):
     retention_snapshots_days: Mapped[int] = mapped_column(Integer, default=30)
     retention_annotated_days: Mapped[int] = mapped_column(Integer, default=90)
     retention_reports_days: Mapped[int] = mapped_column(Integer, default=90)
+    reasoning_daily_token_budget: Mapped[Optional[int]] = mapped_column(Integer)  # null = unlimited
+    reasoning_monthly_token_budget: Mapped[Optional[int]] = mapped_column(Integer)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
@@ -57,6 +59,7 @@ class Camera(Base):
     onvif_port: Mapped[Optional[int]] = mapped_column(Integer)
     onvif_username: Mapped[Optional[str]] = mapped_column(String(255))
     onvif_password_ref: Mapped[Optional[str]] = mapped_column(String(255))
+    roi_polygon: Mapped[Optional[list]] = mapped_column(JSON)  # [[x, y], ...] normalized
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
 
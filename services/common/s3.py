@@ -53,21 +53,27 @@ class StorageClient:
         )
         return key
     
+    def annotated_key(self, tenant_id: str, snapshot_id: str) -> str:
+        """Key of the annotated image for a snapshot"""
+        return self._tenant_key(tenant_id, f"annotated/{snapshot_id}.jpg")
+    
     def upload_annotated(
         self,
         tenant_id: str,
         snapshot_id: str,
         data: bytes,
-        content_type: str = "image/jpeg"
+        content_type: str = "image/jpeg",
+        metadata: Optional[dict] = None
     ) -> str:
         """Upload an annotated image"""
-        key = self._tenant_key(tenant_id, f"annotated/{snapshot_id}.jpg")
+        key = self.annotated_key(tenant_id, snapshot_id)
         self._client.put_object(
             self._bucket,
             key,
             io.BytesIO(data),
             length=len(data),
-            content_type=content_type
+            content_type=content_type,
+            metadata=metadata
         )
         return key
     
@@ -98,6 +104,21 @@ class StorageClient:
         response.release_conn()
         return data
     
+    def get_metadata(self, key: str) -> Optional[dict]:
+        """Get user metadata of an object, or None if it doesn't exist"""
+        try:
+            stat = self._client.stat_object(self._bucket, key)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+        prefix = "x-amz-meta-"
+        return {
+            k[len(prefix):].lower(): v
+            for k, v in (stat.metadata or {}).items()
+            if k.lower().startswith(prefix)
+        }
+    
     def get_presigned_url(
         self,
         key: str,
@@ -2,6 +2,7 @@
 AFASA 2.0 - Shared Settings
 Centralized configuration using Pydantic Settings
 """
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -45,6 +46,95 @@ class Settings(BaseSettings):
     # MediaMTX
     mediamtx_api_base: str = "http://mediamtx:8888"
     
+    # Vision YOLO
+    yolo_batch_size: int = 8
+    yolo_batch_max_wait_ms: int = 50
+    yolo_subscriber_concurrency: int = 16
+    yolo_workers: int = 2
+    yolo_queue_depth: int = 8  # waiting requests before non-waiting callers get 503
+    yolo_priority_slo_sec: Dict[str, float] = {"interactive": 2.0, "event": 30.0, "backfill": 900.0}
+    yolo_tenant_weights: Dict[str, float] = {}  # tenant_id -> fair-share weight (default 1)
+    yolo_torch_threads: int = 2
+    yolo_backend: str = "torch"  # torch|onnx|openvino
+    yolo_int8: bool = False
+    yolo_input_size: int = 640
+    yolo_warmup_sizes: List[int] = [640]
+    yolo_warmup_runs: int = 2
+    yolo_annotation_cache_size: int = 64
+    yolo_models_dir: str = "."
+    yolo_default_model: str = "plant_disease"
+    yolo_model_paths: Dict[str, str] = {
+        "plant_disease": "plant_disease.pt",
+        "yolov8n": "yolov8n.pt"
+    }
+    yolo_tenant_models: Dict[str, str] = {}  # tenant_id -> model name
+    yolo_model_memory_budget_mb: int = 512
+    yolo_dedup_enabled: bool = True
+    yolo_dedup_max_distance: int = 4  # Hamming bits out of 64
+    yolo_dedup_max_age_sec: int = 21600
+    yolo_force_inference_tenants: List[str] = []  # bypass dedup/change gating
+    yolo_result_cache_size: int = 256
+    yolo_result_cache_ttl_sec: int = 86400
+    yolo_motion_enabled: bool = True
+    yolo_motion_grid: int = 8  # tiles per side (1-64)
+    yolo_motion_tile_threshold: float = 12.0  # mean abs gray-level change
+    yolo_motion_max_partial_fraction: float = 0.5  # larger changes run the full frame
+    yolo_motion_ttl_sec: int = 21600
+    yolo_quality_enabled: bool = True
+    yolo_quality_action: str = "skip"  # skip|flag unusable frames
+    yolo_quality_dark_level: int = 30
+    yolo_quality_max_dark_fraction: float = 0.85
+    yolo_quality_max_bright_fraction: float = 0.6
+    yolo_quality_min_sharpness: float = 50.0  # Laplacian variance on the preview
+    yolo_quality_min_contrast: float = 12.0
+    yolo_quality_min_saturation: float = 0.04
+    yolo_tracking_enabled: bool = True
+    yolo_tracking_iou_threshold: float = 0.3
+    yolo_tracking_max_centroid_distance: float = 0.05  # normalized, for small jittery boxes
+    yolo_tracking_max_misses: int = 2  # snapshots before a track is resolved
+    yolo_tracking_ttl_sec: int = 86400
+    yolo_publish_deltas: bool = False  # only new detections + resolved tracks; needs tracking
+    yolo_heatmap_retention_days: int = 90
+    yolo_cooldown_sec: int = 3600
+    yolo_cooldown_min_confidence: float = 0.5
+    yolo_tenant_cooldown_sec: Dict[str, int] = {}  # tenant_id -> cooldown override
+    yolo_tenant_min_confidence: Dict[str, float] = {}  # tenant_id -> alert threshold override
+    yolo_persist_max_rows: int = 500  # subscriber write-behind flush size
+    yolo_persist_flush_interval_ms: int = 1000
+    yolo_persist_max_retries: int = 5  # failed flushes in a row before a tenant's rows are dropped
+    yolo_persist_max_retained_rows: int = 20000  # per tenant, while its flushes keep failing
+    
+    # Vision Reasoner
+    reasoner_model: str = "gemini-1.5-flash"
+    reasoner_max_concurrency: int = 8  # Gemini calls in flight across all tenants
+    reasoner_tenant_concurrency: int = 2  # per tenant, so one outbreak can't take every slot
+    reasoner_timeout_sec: float = 30.0  # per-call deadline
+    reasoner_cache_enabled: bool = True
+    reasoner_cache_ttl_sec: int = 86400
+    reasoner_image_max_side: int = 1024  # longest side sent to Gemini
+    reasoner_image_quality: int = 80  # JPEG re-encode quality
+    reasoner_image_crop: bool = False  # crop to the union of significant detections
+    reasoner_image_crop_margin: float = 0.1  # fraction of the frame around that union
+    reasoner_batch_enabled: bool = True  # multi-image prompts for detection events
+    reasoner_batch_window_ms: int = 5000
+    reasoner_batch_max_size: int = 16  # events that close a window early
+    reasoner_batch_max_images: int = 4  # images per Gemini prompt
+    reasoner_camera_groups: Dict[str, str] = {}  # camera_id -> group batched separately
+    reasoner_triage_enabled: bool = True  # playbook answers for clear-cut detections
+    reasoner_breaker_window_sec: float = 60.0
+    reasoner_breaker_min_calls: int = 10  # calls in the window before it can open
+    reasoner_breaker_error_rate: float = 0.5
+    reasoner_breaker_slow_call_sec: float = 15.0
+    reasoner_breaker_slow_rate: float = 0.8
+    reasoner_breaker_open_sec: float = 30.0  # before a half-open probe
+    reasoner_replay_interval_sec: float = 10.0
+    reasoner_replay_max_items: int = 10000
+    reasoner_replay_max_age_sec: int = 86400
+    reasoner_replay_max_attempts: int = 5  # replays still unavailable before dead-lettering
+    reasoner_budget_soft_fraction: float = 0.75  # of a tenant budget before batching/sampling starts
+    reasoner_budget_min_sample_rate: float = 0.1  # share of escalations still sent right at the limit
+    reasoner_budget_cache_sec: float = 60.0
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -35,6 +35,7 @@ class CameraCreate(BaseModel):
     location: Optional[str] = None
     rtsp_url: str
     onvif: Optional[OnvifConfig] = None
+    roi_polygon: Optional[List[List[float]]] = None
 
 
 class CameraResponse(BaseModel):
@@ -44,12 +45,17 @@ class CameraResponse(BaseModel):
     location: Optional[str]
     rtsp_url: str
     onvif_enabled: bool
+    roi_polygon: Optional[List[List[float]]] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 
+class RoiUpdate(BaseModel):
+    polygon: Optional[List[List[float]]] = None  # normalized [x, y] vertices; None = full frame
+
+
 class SnapshotRequest(BaseModel):
     reason: str = "manual"
     timestamp_hint: Optional[datetime] = None
@@ -77,6 +83,23 @@ class StreamResponse(BaseModel):
     hls_url: str
 
 
+def validate_roi(polygon: Optional[List[List[float]]]) -> Optional[List[List[float]]]:
+    """ROI polygons are >= 3 normalized [x, y] points with a non-zero area"""
+    if polygon is None:
+        return None
+    if len(polygon) < 3 or any(len(p) != 2 for p in polygon):
+        raise HTTPException(status_code=400, detail="ROI polygon needs at least 3 [x, y] points")
+    if any(not (0 <= v <= 1) for p in polygon for v in p):
+        raise HTTPException(status_code=400, detail="ROI coordinates must be normalized to 0-1")
+    area = sum(
+        polygon[i - 1][0] * polygon[i][1] - polygon[i][0] * polygon[i - 1][1]
+        for i in range(len(polygon))
+    )
+    if abs(area) < 1e-4:
+        raise HTTPException(status_code=400, detail="ROI polygon has no area")
+    return [[round(x, 4), round(y, 4)] for x, y in polygon]
+
+
 @router.post("/cameras", response_model=CameraResponse)
 async def create_camera(
     body: CameraCreate,
@@ -93,6 +116,7 @@ async def create_camera(
             onvif_host=body.onvif.host if body.onvif else None,
             onvif_port=body.onvif.port if body.onvif else None,
             onvif_username=body.onvif.username if body.onvif else None,
+            roi_polygon=validate_roi(body.roi_polygon),
         )
         session.add(camera)
         await session.flush()
@@ -125,6 +149,28 @@ async def get_camera(
         return camera
 
 
+@router.put("/cameras/{camera_id}/roi", response_model=CameraResponse)
+async def update_camera_roi(
+    camera_id: UUID,
+    body: RoiUpdate,
+    token: TokenPayload = Depends(verify_token)
+):
+    """Set or clear the region of interest used for inference"""
+    polygon = validate_roi(body.polygon)
+    async with get_tenant_session(token.tenant_id) as session:
+        result = await session.execute(
+            select(Camera).where(Camera.id == camera_id)
+        )
+        camera = result.scalar_one_or_none()
+        if not camera:
+            raise HTTPException(status_code=404, detail="Camera not found")
+        
+        camera.roi_polygon = polygon
+        await session.flush()
+        await session.refresh(camera)
+        return camera
+
+
 @router.post("/cameras/{camera_id}/test")
 async def test_camera(
     camera_id: UUID,
@@ -198,7 +244,8 @@ async def create_snapshot(
                 "camera_id": str(camera_id),
                 "s3_key": s3_key,
                 "taken_at": taken_at.isoformat(),
-                "reason": body.reason
+                "reason": body.reason,
+                "roi_polygon": camera.roi_polygon
             },
             producer="afasa-media"
         )
@@ -77,6 +77,12 @@ class RetentionSettingsUpdate(BaseModel):
     retention_reports_days: Optional[int] = None
 
 
+class ReasoningBudgetUpdate(BaseModel):
+    # 0 clears a budget (unlimited)
+    reasoning_daily_token_budget: Optional[int] = None
+    reasoning_monthly_token_budget: Optional[int] = None
+
+
 class AlertSettingsUpdate(BaseModel):
     alert_cooldown_minutes: Optional[int] = None
     quiet_hours_start: Optional[str] = None
@@ -93,6 +99,8 @@ class SettingsResponse(BaseModel):
     retention_snapshots_days: int
     retention_annotated_days: int
     retention_reports_days: int
+    reasoning_daily_token_budget: Optional[int] = None
+    reasoning_monthly_token_budget: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -220,6 +228,59 @@ async def update_retention_settings(
     return {"success": True}
 
 
+@router.post("/settings/reasoning-budget", tags=["settings"])
+async def update_reasoning_budget(
+    body: ReasoningBudgetUpdate,
+    token: TokenPayload = Depends(require_role("tenant_admin"))
+):
+    """Update Gemini reasoning token budgets"""
+    audit = get_audit_service()
+    
+    for value in (body.reasoning_daily_token_budget, body.reasoning_monthly_token_budget):
+        if value is not None and value < 0:
+            raise HTTPException(status_code=400, detail="Budgets must be >= 0")
+    
+    async with get_tenant_session(token.tenant_id) as session:
+        result = await session.execute(
+            select(TenantSettings).where(TenantSettings.tenant_id == UUID(token.tenant_id))
+        )
+        settings = result.scalar_one_or_none()
+        
+        if not settings:
+            raise HTTPException(status_code=404, detail="Settings not found")
+        
+        before = {
+            "reasoning_daily_token_budget": settings.reasoning_daily_token_budget,
+            "reasoning_monthly_token_budget": settings.reasoning_monthly_token_budget
+        }
+        
+        if body.reasoning_daily_token_budget is not None:
+            settings.reasoning_daily_token_budget = body.reasoning_daily_token_budget or None
+        if body.reasoning_monthly_token_budget is not None:
+            settings.reasoning_monthly_token_budget = body.reasoning_monthly_token_budget or None
+        
+        settings.updated_at = datetime.now(timezone.utc)
+        await session.flush()
+        
+        after = {
+            "reasoning_daily_token_budget": settings.reasoning_daily_token_budget,
+            "reasoning_monthly_token_budget": settings.reasoning_monthly_token_budget
+        }
+    
+    await audit.log(
+        tenant_id=token.tenant_id,
+        actor_type="user",
+        actor_id=token.sub,
+        action="settings.reasoning_budget.updated",
+        target_type="tenant_settings",
+        target_id=token.tenant_id,
+        before=before,
+        after=after
+    )
+    
+    return {"success": True}
+
+
 # ============================================================================
 # /api/audit - Audit Logs
 # ============================================================================
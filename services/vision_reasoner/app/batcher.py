@@ -0,0 +1,139 @@
+"""
+AFASA 2.0 - Assessment Batcher
+Collects significant detection events per tenant (or camera group) for a
+short window and assesses them with multi-image Gemini calls
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.reasoner import get_reasoner
+from app.metrics import BATCH_SIZE, BATCH_WAIT
+
+
+BatchKey = Tuple[str, str]  # tenant, camera group
+
+
+@dataclass
+class _PendingAssessment:
+    image_data: bytes
+    context: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class AssessmentBatcher:
+    """
+    Holds events for up to window_ms or max_batch_size items, whichever
+    comes first, then assesses them in prompts of at most max_images images.
+    Cameras listed in camera_groups batch with their group; all others
+    share one batch per tenant.
+    """
+    
+    def __init__(
+        self,
+        window_ms: int = 5000,
+        max_batch_size: int = 16,
+        max_images: int = 4,
+        camera_groups: Optional[Dict[str, str]] = None
+    ):
+        self._window = window_ms / 1000
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_images = max(1, max_images)
+        self._camera_groups = camera_groups or {}
+        self._pending: Dict[BatchKey, List[_PendingAssessment]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+    
+    async def submit(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        image_data: bytes,
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Queue an event's image and context and wait for its assessment
+        (raises ReasonerUnavailable / AssessmentFailed like GeminiReasoner.assess)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (tenant_id, self._camera_groups.get(camera_id, ""))
+        
+        batch = self._pending.setdefault(key, [])
+        batch.append(_PendingAssessment(image_data, context, future, time.monotonic()))
+        
+        if len(batch) >= self._max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self._window, self._flush, key)
+        
+        return await future
+    
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        
+        batch = self._pending.pop(key, [])
+        if not batch:
+            return
+        
+        task = asyncio.create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, key: BatchKey, batch: List[_PendingAssessment]):
+        tenant_id, _ = key
+        started = time.monotonic()
+        for item in batch:
+            BATCH_WAIT.observe(started - item.enqueued_at)
+        
+        chunks = [
+            batch[start:start + self._max_images]
+            for start in range(0, len(batch), self._max_images)
+        ]
+        for chunk in chunks:
+            BATCH_SIZE.observe(len(chunk))
+        
+        reasoner = get_reasoner()
+        outcomes = await asyncio.gather(
+            *(
+                reasoner.assess_batch(
+                    [(item.image_data, item.context) for item in chunk], tenant_id
+                )
+                for chunk in chunks
+            ),
+            return_exceptions=True
+        )
+        
+        for chunk, results in zip(chunks, outcomes):
+            for n, item in enumerate(chunk):
+                if item.future.done():
+                    continue
+                if isinstance(results, BaseException):
+                    item.future.set_exception(results)
+                elif isinstance(results[n], Exception):
+                    item.future.set_exception(results[n])
+                else:
+                    item.future.set_result(results[n])
+
+
+_batcher: Optional[AssessmentBatcher] = None
+
+
+def get_assessment_batcher() -> AssessmentBatcher:
+    global _batcher
+    if _batcher is None:
+        settings = get_settings()
+        _batcher = AssessmentBatcher(
+            window_ms=settings.reasoner_batch_window_ms,
+            max_batch_size=settings.reasoner_batch_max_size,
+            max_images=settings.reasoner_batch_max_images,
+            camera_groups=settings.reasoner_camera_groups
+        )
+    return _batcher
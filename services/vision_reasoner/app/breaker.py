@@ -0,0 +1,146 @@
+"""
+AFASA 2.0 - Reasoner Circuit Breaker
+Stops calling Gemini while it is failing or too slow, and probes for recovery
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+from google.api_core import exceptions as api_exceptions
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ReasonerUnavailable(Exception):
+    """Gemini can't give an answer right now (circuit open, timeout, 5xx); worth replaying"""
+
+
+class AssessmentFailed(Exception):
+    """Gemini won't give an answer for this input (bad request, safety block, unparseable output)"""
+
+
+# Errors that say nothing about the request itself
+_TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    api_exceptions.ServerError,  # 5xx: internal, unavailable, deadline exceeded
+    api_exceptions.TooManyRequests,
+    api_exceptions.RetryError
+)
+
+
+def is_transient(error: BaseException) -> bool:
+    return isinstance(error, (ReasonerUnavailable,) + _TRANSIENT_ERRORS)
+
+
+class CircuitBreaker:
+    """
+    Opens when, over the last window_sec, at least min_calls calls were made
+    and either the error rate or the slow-call rate exceeds its limit.
+    After open_sec a few probe calls are let through (half-open): a fast
+    success closes the circuit, anything else opens it again.
+    """
+    
+    def __init__(
+        self,
+        window_sec: float = 60.0,
+        min_calls: int = 10,
+        max_error_rate: float = 0.5,
+        slow_call_sec: float = 15.0,
+        max_slow_rate: float = 0.8,
+        open_sec: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self._window_sec = window_sec
+        self._min_calls = max(1, min_calls)
+        self._max_error_rate = max_error_rate
+        self._slow_call_sec = slow_call_sec
+        self._max_slow_rate = max_slow_rate
+        self._open_sec = open_sec
+        self._half_open_probes = max(1, half_open_probes)
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (finished_at, failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED])
+    
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_sec:
+            return HALF_OPEN
+        return self._state
+    
+    def allow(self) -> bool:
+        """Whether a call may go out now (counts as a probe when half-open)"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_sec:
+            self._transition(HALF_OPEN)
+        if self._state == CLOSED:
+            return True
+        if self._state == HALF_OPEN and self._probes < self._half_open_probes:
+            self._probes += 1
+            return True
+        return False
+    
+    def record(self, ok: bool, latency: float):
+        slow = latency >= self._slow_call_sec
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            self._transition(CLOSED if ok and not slow else OPEN)
+            return
+        
+        now = time.monotonic()
+        self._calls.append((now, not ok, slow))
+        while self._calls and self._calls[0][0] < now - self._window_sec:
+            self._calls.popleft()
+        if self._state != CLOSED or len(self._calls) < self._min_calls:
+            return
+        
+        failed = sum(1 for _, f, _ in self._calls if f) / len(self._calls)
+        slowed = sum(1 for _, _, s in self._calls if s) / len(self._calls)
+        if failed >= self._max_error_rate or slowed >= self._max_slow_rate:
+            print(f"Reasoner circuit opening: error rate {failed:.0%}, slow rate {slowed:.0%}")
+            self._transition(OPEN)
+    
+    def abandon(self):
+        """A call was cancelled before it produced a verdict"""
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+    
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        BREAKER_TRANSITIONS.labels(previous=self._state, state=state).inc()
+        BREAKER_STATE.set(_STATE_VALUES[state])
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._probes = 0
+        elif state == CLOSED:
+            self._calls.clear()
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        settings = get_settings()
+        _breaker = CircuitBreaker(
+            window_sec=settings.reasoner_breaker_window_sec,
+            min_calls=settings.reasoner_breaker_min_calls,
+            max_error_rate=settings.reasoner_breaker_error_rate,
+            slow_call_sec=settings.reasoner_breaker_slow_call_sec,
+            max_slow_rate=settings.reasoner_breaker_slow_rate,
+            open_sec=settings.reasoner_breaker_open_sec
+        )
+    return _breaker
@@ -0,0 +1,176 @@
+"""
+AFASA 2.0 - Reasoning Budget
+Per-tenant Gemini usage metering and spend-aware admission control
+"""
+import random
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings, get_tenant_session, TenantSettings
+from app.redis_client import get_redis
+from app.metrics import TOKENS_USED, IMAGE_BYTES_SENT, ADMISSIONS
+
+DAY_TTL_SEC = 40 * 86400
+MONTH_TTL_SEC = 400 * 86400
+
+
+def usage_key(tenant_id: str, period: str) -> str:
+    return f"reasoner:usage:{tenant_id}:{period}"
+
+
+def _periods(now: datetime) -> Tuple[str, str]:
+    return now.strftime("%Y%m%d"), now.strftime("%Y%m")
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    image_bytes: int = 0
+    calls: int = 0
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.response_tokens
+    
+    @classmethod
+    def decode(cls, raw: Dict[bytes, bytes]) -> "Usage":
+        return cls(**{k.decode(): int(v) for k, v in raw.items()})
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+@dataclass
+class Admission:
+    admitted: bool
+    batch: bool  # force windowed batching to spread the fixed prompt cost
+    used_fraction: float  # of the tighter of the daily and monthly budgets
+    reason: str
+
+
+class BudgetMeter:
+    """
+    Token and image-byte counters per tenant per UTC day and month in Redis,
+    checked against TenantSettings budgets (cached for cache_sec).
+    Below soft_fraction of a budget everything goes through; from there
+    event-driven calls are batched and sampled, with the sample rate falling
+    linearly to min_sample_rate at the limit; at the limit only interactive
+    requests are refused too.
+    """
+    
+    def __init__(self, soft_fraction: float = 0.75, min_sample_rate: float = 0.1, cache_sec: float = 60.0):
+        self._soft_fraction = soft_fraction
+        self._min_sample_rate = min_sample_rate
+        self._cache_sec = cache_sec
+        self._budgets: Dict[str, Tuple[float, Optional[int], Optional[int]]] = {}
+    
+    async def record(
+        self,
+        tenant_id: str,
+        prompt_tokens: int,
+        response_tokens: int,
+        image_bytes: int
+    ):
+        TOKENS_USED.labels(tenant=tenant_id, kind="prompt").inc(prompt_tokens)
+        TOKENS_USED.labels(tenant=tenant_id, kind="response").inc(response_tokens)
+        IMAGE_BYTES_SENT.labels(tenant=tenant_id).inc(image_bytes)
+        
+        day, month = _periods(datetime.now(timezone.utc))
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            for period, ttl in ((f"day:{day}", DAY_TTL_SEC), (f"month:{month}", MONTH_TTL_SEC)):
+                key = usage_key(tenant_id, period)
+                pipe.hincrby(key, "prompt_tokens", prompt_tokens)
+                pipe.hincrby(key, "response_tokens", response_tokens)
+                pipe.hincrby(key, "image_bytes", image_bytes)
+                pipe.hincrby(key, "calls", 1)
+                pipe.expire(key, ttl)
+            await pipe.execute()
+    
+    async def usage(self, tenant_id: str) -> Tuple[Usage, Usage]:
+        """(today, this month)"""
+        day, month = _periods(datetime.now(timezone.utc))
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.hgetall(usage_key(tenant_id, f"day:{day}"))
+            pipe.hgetall(usage_key(tenant_id, f"month:{month}"))
+            today, this_month = await pipe.execute()
+        return Usage.decode(today), Usage.decode(this_month)
+    
+    async def history(self, tenant_id: str, days: int) -> List[Tuple[str, Usage]]:
+        """Daily usage, most recent first"""
+        now = datetime.now(timezone.utc)
+        periods = [(now - timedelta(days=offset)).strftime("%Y%m%d") for offset in range(days)]
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for day in periods:
+                pipe.hgetall(usage_key(tenant_id, f"day:{day}"))
+            raws = await pipe.execute()
+        return [(day, Usage.decode(raw)) for day, raw in zip(periods, raws)]
+    
+    async def budgets(self, tenant_id: str) -> Tuple[Optional[int], Optional[int]]:
+        """(daily, monthly) token budgets; None = unlimited"""
+        cached = self._budgets.get(tenant_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+        
+        async with get_tenant_session(tenant_id) as session:
+            result = await session.execute(
+                select(TenantSettings).where(TenantSettings.tenant_id == UUID(tenant_id))
+            )
+            tenant_settings = result.scalar_one_or_none()
+        daily = tenant_settings.reasoning_daily_token_budget if tenant_settings else None
+        monthly = tenant_settings.reasoning_monthly_token_budget if tenant_settings else None
+        self._budgets[tenant_id] = (time.monotonic() + self._cache_sec, daily, monthly)
+        return daily, monthly
+    
+    async def used_fraction(self, tenant_id: str) -> float:
+        daily, monthly = await self.budgets(tenant_id)
+        if not daily and not monthly:
+            return 0.0
+        today, this_month = await self.usage(tenant_id)
+        fractions = [0.0]
+        if daily:
+            fractions.append(today.total_tokens / daily)
+        if monthly:
+            fractions.append(this_month.total_tokens / monthly)
+        return max(fractions)
+    
+    async def admit(self, tenant_id: str, interactive: bool = False) -> Admission:
+        """Whether a Gemini call for this tenant should go ahead, and how"""
+        used = await self.used_fraction(tenant_id)
+        if used >= 1.0:
+            admission = Admission(False, False, used, "over_budget")
+        elif interactive or used < self._soft_fraction:
+            admission = Admission(True, False, used, "within_budget")
+        else:
+            span = max(1.0 - self._soft_fraction, 1e-9)
+            rate = 1.0 - (1.0 - self._min_sample_rate) * (used - self._soft_fraction) / span
+            if random.random() < rate:
+                admission = Admission(True, True, used, "sampled")
+            else:
+                admission = Admission(False, True, used, "sampled_out")
+        ADMISSIONS.labels(decision=admission.reason).inc()
+        return admission
+
+
+_budget_meter: Optional[BudgetMeter] = None
+
+
+def get_budget_meter() -> BudgetMeter:
+    global _budget_meter
+    if _budget_meter is None:
+        settings = get_settings()
+        _budget_meter = BudgetMeter(
+            soft_fraction=settings.reasoner_budget_soft_fraction,
+            min_sample_rate=settings.reasoner_budget_min_sample_rate,
+            cache_sec=settings.reasoner_budget_cache_sec
+        )
+    return _budget_meter
@@ -0,0 +1,91 @@
+"""
+AFASA 2.0 - Assessment Cache
+Gemini results keyed by image content and the normalized prompt context,
+shared by the route and subscriber so repeats and redeliveries don't pay twice
+"""
+import asyncio
+import hashlib
+import json
+from typing import Dict, Any, Optional, Callable, Awaitable
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.redis_client import get_redis
+from app.metrics import CACHE_REQUESTS
+
+
+def cache_key(image_data: bytes, context: Dict[str, Any], model: str) -> str:
+    """sha256 of the image bytes plus the canonical JSON of model and context"""
+    digest = hashlib.sha256(image_data)
+    digest.update(json.dumps({"model": model, "context": context}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class AssessmentCache:
+    """
+    Redis-backed, per tenant, with a TTL.
+    Concurrent lookups for the same key share one Gemini call (single-flight).
+    """
+    
+    def __init__(self, ttl_sec: int = 86400):
+        self._ttl_sec = ttl_sec
+        self._in_flight: Dict[str, asyncio.Future] = {}
+    
+    @staticmethod
+    def _redis_key(tenant_id: str, key: str) -> str:
+        return f"reasoner:assessment:{tenant_id}:{key}"
+    
+    async def get(self, tenant_id: str, key: str) -> Optional[Dict[str, Any]]:
+        r = await get_redis()
+        raw = await r.get(self._redis_key(tenant_id, key))
+        return json.loads(raw) if raw is not None else None
+    
+    async def put(self, tenant_id: str, key: str, result: Dict[str, Any]):
+        r = await get_redis()
+        await r.set(self._redis_key(tenant_id, key), json.dumps(result), ex=self._ttl_sec)
+    
+    async def get_or_compute(
+        self,
+        tenant_id: str,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Cached result, or run compute() once for all concurrent callers (failures aren't cached)"""
+        flight = f"{tenant_id}:{key}"
+        pending = self._in_flight.get(flight)
+        if pending is not None:
+            CACHE_REQUESTS.labels(result="shared").inc()
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight] = future
+        try:
+            result = await self.get(tenant_id, key)
+            if result is not None:
+                CACHE_REQUESTS.labels(result="hit").inc()
+            else:
+                CACHE_REQUESTS.labels(result="miss").inc()
+                result = await compute()
+                await self.put(tenant_id, key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[flight]
+
+
+_assessment_cache: Optional[AssessmentCache] = None
+
+
+def get_assessment_cache() -> AssessmentCache:
+    global _assessment_cache
+    if _assessment_cache is None:
+        _assessment_cache = AssessmentCache(ttl_sec=get_settings().reasoner_cache_ttl_sec)
+    return _assessment_cache
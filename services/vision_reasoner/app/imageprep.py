@@ -0,0 +1,100 @@
+"""
+AFASA 2.0 - Image Preparation
+Shrinks snapshots before they go to Gemini: downsized, re-encoded, and
+optionally cropped to the detections
+"""
+import io
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image
+
+Region = Tuple[float, float, float, float]  # normalized (x0, y0, x1, y1)
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    original_bytes: int
+    size: Tuple[int, int]
+    original_size: Tuple[int, int]
+    region: Optional[Region]
+    prep_ms: float
+
+
+def detection_region(detections: List[Dict[str, Any]], margin: float) -> Optional[Region]:
+    """Union of the detections' bboxes, padded by margin (fraction of the frame)"""
+    boxes = [d["bbox"] for d in detections if d.get("bbox")]
+    if not boxes:
+        return None
+    x0 = max(0.0, min(b[0] for b in boxes) - margin)
+    y0 = max(0.0, min(b[1] for b in boxes) - margin)
+    x1 = min(1.0, max(b[2] for b in boxes) + margin)
+    y1 = min(1.0, max(b[3] for b in boxes) + margin)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1, y1)
+
+
+def to_region(bbox: List[float], region: Region) -> List[float]:
+    """Re-express a frame-normalized bbox relative to a crop"""
+    x0, y0, x1, y1 = region
+    w, h = x1 - x0, y1 - y0
+    return [
+        round(min(max((bbox[0] - x0) / w, 0.0), 1.0), 3),
+        round(min(max((bbox[1] - y0) / h, 0.0), 1.0), 3),
+        round(min(max((bbox[2] - x0) / w, 0.0), 1.0), 3),
+        round(min(max((bbox[3] - y0) / h, 0.0), 1.0), 3)
+    ]
+
+
+def prepare_image(
+    image_data: bytes,
+    max_side: int = 1024,
+    quality: int = 80,
+    region: Optional[Region] = None
+) -> PreparedImage:
+    """
+    Crop to region (if any), fit the longest side to max_side and re-encode
+    as JPEG. JPEG sources are decoded at a reduced scale when the target is
+    small enough, so a 4K frame never gets fully decoded.
+    The original is kept when re-encoding wouldn't make it smaller.
+    """
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(image_data))
+    original_size = image.size
+    source_format = image.format
+    
+    # The decoder only scales by powers of two, never below the requested size
+    if region is None:
+        image.draft("RGB", (max_side, max_side))
+    else:
+        crop_w = original_size[0] * (region[2] - region[0])
+        crop_h = original_size[1] * (region[3] - region[1])
+        scale = min(1.0, max_side / max(crop_w, crop_h))
+        image.draft("RGB", (int(original_size[0] * scale), int(original_size[1] * scale)))
+    image = image.convert("RGB")
+    
+    if region is not None:
+        w, h = image.size
+        image = image.crop((
+            int(region[0] * w), int(region[1] * h),
+            int(round(region[2] * w)), int(round(region[3] * h))
+        ))
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality, optimize=True)
+    data = buf.getvalue()
+    unchanged = region is None and image.size == original_size
+    if unchanged and source_format == "JPEG" and len(data) >= len(image_data):
+        data = image_data
+    
+    return PreparedImage(
+        data=data,
+        original_bytes=len(image_data),
+        size=image.size,
+        original_size=original_size,
+        region=region,
+        prep_ms=(time.perf_counter() - started) * 1000
+    )
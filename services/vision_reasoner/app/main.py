@@ -2,6 +2,7 @@
 AFASA 2.0 - Vision Reasoner Service
 Gemini-powered agricultural AI reasoning
 """
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,7 +14,8 @@ sys.path.insert(0, '/app/services')
 from common import get_event_bus
 
 from app.routes import router
-from app.subscriber import start_detection_subscriber
+from app.subscriber import start_detection_subscriber, replay_degraded_assessments
+from app.breaker import get_breaker
 
 
 @asynccontextmanager
@@ -21,8 +23,10 @@ async def lifespan(app: FastAPI):
     # Startup
     event_bus = await get_event_bus()
     await start_detection_subscriber()
+    replay_task = asyncio.create_task(replay_degraded_assessments())
     yield
     # Shutdown
+    replay_task.cancel()
     await event_bus.disconnect()
 
 
@@ -50,7 +54,11 @@ async def healthz():
 
 @app.get("/readyz")
 async def readyz():
-    return {"status": "ready", "service": "afasa-vision-reasoner"}
+    return {
+        "status": "ready",
+        "service": "afasa-vision-reasoner",
+        "gemini_circuit": get_breaker().state
+    }
 
 
 @app.get("/metrics")
@@ -0,0 +1,116 @@
+"""
+AFASA 2.0 - Vision Reasoner Metrics
+Prometheus metrics for Gemini reasoning
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+QUEUE_DEPTH = Gauge(
+    "afasa_reasoner_queue_depth",
+    "Assessments waiting for a concurrency slot",
+    ["tenant"]
+)
+
+IN_FLIGHT = Gauge(
+    "afasa_reasoner_in_flight",
+    "Gemini calls currently running"
+)
+
+QUEUE_WAIT = Histogram(
+    "afasa_reasoner_queue_wait_seconds",
+    "Time an assessment waits for a concurrency slot",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+GEMINI_LATENCY = Histogram(
+    "afasa_reasoner_gemini_latency_seconds",
+    "Wall time of one Gemini generate call",
+    buckets=(0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+)
+
+GEMINI_REQUESTS = Counter(
+    "afasa_reasoner_gemini_requests_total",
+    "Gemini calls by outcome",
+    ["result"]
+)
+
+CACHE_REQUESTS = Counter(
+    "afasa_reasoner_cache_requests_total",
+    "Assessment cache lookups by outcome (hit, miss, shared, bypass)",
+    ["result"]
+)
+
+IMAGE_BYTES = Histogram(
+    "afasa_reasoner_image_bytes",
+    "Image size before and after preparation for Gemini",
+    ["stage"],
+    buckets=(25e3, 50e3, 100e3, 200e3, 400e3, 800e3, 1.6e6, 3.2e6, 6.4e6)
+)
+
+BATCH_SIZE = Histogram(
+    "afasa_reasoner_batch_size",
+    "Images per multi-image Gemini prompt",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+
+BATCH_WAIT = Histogram(
+    "afasa_reasoner_batch_wait_seconds",
+    "Time a detection event waits in the batching window",
+    buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+
+TRIAGE_DECISIONS = Counter(
+    "afasa_reasoner_triage_decisions_total",
+    "Local triage outcomes (resolved by playbook or escalated to Gemini) by reason",
+    ["outcome", "reason"]
+)
+
+ESCALATION_RATE = Gauge(
+    "afasa_reasoner_escalation_rate",
+    "Fraction of triaged events escalated to Gemini since startup"
+)
+
+BREAKER_STATE = Gauge(
+    "afasa_reasoner_breaker_state",
+    "Gemini circuit breaker state (0 closed, 1 half-open, 2 open)"
+)
+
+BREAKER_TRANSITIONS = Counter(
+    "afasa_reasoner_breaker_transitions_total",
+    "Gemini circuit breaker state changes",
+    ["previous", "state"]
+)
+
+REPLAY_QUEUE_DEPTH = Gauge(
+    "afasa_reasoner_replay_queue_depth",
+    "Assessments queued for replay while the reasoner was degraded"
+)
+
+REPLAY_DEAD_LETTERS = Counter(
+    "afasa_reasoner_replay_dead_letters_total",
+    "Assessments given up on and moved to the dead-letter list",
+    ["reason"]
+)
+
+REPLAYS = Counter(
+    "afasa_reasoner_replays_total",
+    "Replayed assessments by outcome",
+    ["result"]
+)
+
+TOKENS_USED = Counter(
+    "afasa_reasoner_tokens_total",
+    "Gemini tokens used per tenant (prompt, response)",
+    ["tenant", "kind"]
+)
+
+IMAGE_BYTES_SENT = Counter(
+    "afasa_reasoner_image_bytes_sent_total",
+    "Image bytes uploaded to Gemini per tenant",
+    ["tenant"]
+)
+
+ADMISSIONS = Counter(
+    "afasa_reasoner_admissions_total",
+    "Budget admission decisions for Gemini calls",
+    ["decision"]
+)
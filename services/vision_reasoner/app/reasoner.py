@@ -2,56 +2,376 @@
 AFASA 2.0 - Gemini Reasoning Engine
 Multi-modal AI for agricultural analysis
 """
+import asyncio
 import json
-import base64
-from typing import Dict, Any, List, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
 import google.generativeai as genai
 import sys
 sys.path.insert(0, '/app/services')
 
 from common import get_settings
+from app.metrics import (
+    QUEUE_DEPTH, IN_FLIGHT, QUEUE_WAIT, GEMINI_LATENCY, GEMINI_REQUESTS, CACHE_REQUESTS,
+    IMAGE_BYTES
+)
+from app.cache import cache_key, get_assessment_cache
+from app.breaker import ReasonerUnavailable, AssessmentFailed, OPEN, get_breaker, is_transient
+from app.budget import get_budget_meter
+from app.imageprep import PreparedImage, prepare_image, detection_region, to_region
 
 settings = get_settings()
 
 
+def normalize_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The parts of the context the prompt uses, in canonical form: defaults
+    filled in, detections reduced to label/confidence/bbox (no track IDs) and
+    sorted, floats rounded, so equivalent requests share a cache entry.
+    """
+    detections = sorted(
+        (
+            {
+                "label": d.get("label"),
+                "confidence": round(float(d.get("confidence", 0)), 2),
+                **({"bbox": [round(float(v), 3) for v in d["bbox"]]} if d.get("bbox") else {})
+            }
+            for d in context.get("recent_detections") or []
+        ),
+        key=lambda d: (str(d["label"]), -d["confidence"], d.get("bbox", []))
+    )
+    telemetry = {
+        k: round(v, 1) if isinstance(v, float) else v
+        for k, v in sorted((context.get("recent_telemetry_summary") or {}).items())
+        if v is not None
+    }
+    return {
+        "crop": str(context.get("crop") or "chili").strip().lower(),
+        "farm_location": str(context.get("farm_location") or "Malaysia").strip(),
+        "recent_detections": detections,
+        "recent_telemetry_summary": telemetry
+    }
+
+
 class GeminiReasoner:
-    def __init__(self):
+    """
+    Gemini client on the SDK's async API.
+    Calls are bounded by a global and a per-tenant semaphore and each one
+    gets a timeout, so the event loop keeps serving while requests are out.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        tenant_concurrency: int = 2,
+        timeout_sec: float = 30.0
+    ):
         if settings.gemini_api_key:
             genai.configure(api_key=settings.gemini_api_key)
-            self._model = genai.GenerativeModel("gemini-1.5-flash")
+            self._model = genai.GenerativeModel(settings.reasoner_model)
         else:
             self._model = None
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._tenant_concurrency = max(1, tenant_concurrency)
+        self._tenant_slots: Dict[str, asyncio.Semaphore] = {}
+        self._timeout_sec = timeout_sec
+        # Results depend on how the image was prepared as well as on the model
+        self._cache_variant = (
+            f"{settings.reasoner_model}|{settings.reasoner_image_max_side}"
+            f"|{settings.reasoner_image_quality}"
+            f"|{settings.reasoner_image_crop_margin if settings.reasoner_image_crop else 'full'}"
+        )
+    
+    @asynccontextmanager
+    async def _slot(self, tenant_id: str):
+        """Tenant slot first, so a tenant at its cap doesn't sit on a global one"""
+        tenant_slots = self._tenant_slots.get(tenant_id)
+        if tenant_slots is None:
+            tenant_slots = self._tenant_slots[tenant_id] = asyncio.Semaphore(self._tenant_concurrency)
+        
+        started = time.monotonic()
+        QUEUE_DEPTH.labels(tenant=tenant_id).inc()
+        try:
+            await tenant_slots.acquire()
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                tenant_slots.release()
+                raise
+        finally:
+            QUEUE_DEPTH.labels(tenant=tenant_id).dec()
+        QUEUE_WAIT.observe(time.monotonic() - started)
+        
+        IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            IN_FLIGHT.dec()
+            self._slots.release()
+            tenant_slots.release()
     
     async def assess(
         self,
         image_data: bytes,
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        tenant_id: str = "",
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Analyze crop image with context and return assessment.
+        Identical image + context is answered from the cache unless use_cache is off.
+        Raises ReasonerUnavailable when Gemini can't answer right now (circuit
+        open, deadline exceeded, 5xx) and AssessmentFailed when it won't answer
+        this input (4xx, safety block, unparseable output).
         """
         if self._model is None:
             return self._mock_assessment()
         
-        # Build prompt
-        prompt = self._build_prompt(context)
-        
+        context = normalize_context(context)
         try:
-            # Create image part
-            image_part = {
-                "mime_type": "image/jpeg",
-                "data": base64.b64encode(image_data).decode()
+            if not (use_cache and settings.reasoner_cache_enabled):
+                CACHE_REQUESTS.labels(result="bypass").inc()
+                return await self._generate(image_data, context, tenant_id)
+            return await get_assessment_cache().get_or_compute(
+                tenant_id,
+                cache_key(image_data, context, self._cache_variant),
+                lambda: self._generate(image_data, context, tenant_id)
+            )
+        except Exception as e:
+            raise self._classify(e) from e
+    
+    def _classify(self, error: Exception) -> Exception:
+        if isinstance(error, (ReasonerUnavailable, AssessmentFailed)):
+            return error
+        if isinstance(error, asyncio.TimeoutError):
+            return ReasonerUnavailable(f"Gemini timed out after {self._timeout_sec}s")
+        if is_transient(error):
+            return ReasonerUnavailable(f"Gemini error: {error}")
+        return AssessmentFailed(f"Gemini error: {error}")
+    
+    async def assess_batch(
+        self,
+        items: List[Tuple[bytes, Dict[str, Any]]],
+        tenant_id: str = "",
+        use_cache: bool = True
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Assess several (image, context) pairs with one multi-image Gemini call.
+        Cached pairs are answered from the cache; pairs missing from the
+        combined response are retried on their own. Pairs Gemini couldn't
+        answer get the ReasonerUnavailable or AssessmentFailed that assess
+        would have raised.
+        """
+        if self._model is None:
+            return [self._mock_assessment() for _ in items]
+        
+        caching = use_cache and settings.reasoner_cache_enabled
+        cache = get_assessment_cache()
+        contexts = [normalize_context(context) for _, context in items]
+        keys = [
+            cache_key(image_data, context, self._cache_variant)
+            for (image_data, _), context in zip(items, contexts)
+        ]
+        results: List[Any] = [None] * len(items)
+        for i, key in enumerate(keys):
+            if not caching:
+                CACHE_REQUESTS.labels(result="bypass").inc()
+                continue
+            results[i] = await cache.get(tenant_id, key)
+            CACHE_REQUESTS.labels(result="hit" if results[i] is not None else "miss").inc()
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        batched: List[Optional[Dict[str, Any]]] = [None] * len(pending)
+        if len(pending) > 1:
+            try:
+                batched = await self._generate_batch(
+                    [items[i][0] for i in pending], [contexts[i] for i in pending], tenant_id
+                )
+            except Exception as e:
+                error = self._classify(e)
+                if isinstance(error, ReasonerUnavailable):
+                    # Circuit open, timeout or 5xx: individual calls would fare no better
+                    print(f"Gemini batch of {len(pending)} not assessed: {error}")
+                    for i in pending:
+                        results[i] = error
+                    return results
+                # Something in this batch's input or answer; try each image on its own
+                print(f"Gemini batch of {len(pending)} failed, assessing individually: {e}")
+        
+        async def settle(i: int, result: Optional[Dict[str, Any]]) -> Union[Dict[str, Any], Exception]:
+            try:
+                if result is None:
+                    result = await self._generate(items[i][0], contexts[i], tenant_id)
+                if caching:
+                    await cache.put(tenant_id, keys[i], result)
+                return result
+            except Exception as e:
+                print(f"Gemini error: {e}")
+                return self._classify(e)
+        
+        settled = await asyncio.gather(*(settle(i, r) for i, r in zip(pending, batched)))
+        for i, result in zip(pending, settled):
+            results[i] = result
+        return results
+    
+    async def _prepare(
+        self,
+        image_data: bytes,
+        context: Dict[str, Any]
+    ) -> Tuple[PreparedImage, Dict[str, Any]]:
+        """Shrink the upload: downsized, re-encoded, optionally cropped to the findings"""
+        region = None
+        if settings.reasoner_image_crop:
+            region = detection_region(context["recent_detections"], settings.reasoner_image_crop_margin)
+        prepared = await asyncio.to_thread(
+            prepare_image,
+            image_data,
+            settings.reasoner_image_max_side,
+            settings.reasoner_image_quality,
+            region
+        )
+        IMAGE_BYTES.labels(stage="original").observe(prepared.original_bytes)
+        IMAGE_BYTES.labels(stage="sent").observe(len(prepared.data))
+        if region is not None:
+            # Boxes in the prompt must match the cropped image
+            context = {
+                **context,
+                "recent_detections": [
+                    {**d, "bbox": to_region(d["bbox"], region)} if d.get("bbox") else d
+                    for d in context["recent_detections"]
+                ]
             }
-            
-            # Generate response
-            response = self._model.generate_content([prompt, image_part])
-            
-            # Parse structured response
-            return self._parse_response(response.text)
-            
+        return prepared, context
+    
+    async def _call(
+        self,
+        parts: List[Any],
+        tenant_id: str,
+        parse: Callable[[str], Any]
+    ) -> Tuple[Any, float]:
+        """
+        Generate under the concurrency limits, circuit breaker and per-call
+        deadline: (parsed response, latency). A response that can't be read
+        or parsed still shows Gemini is up, so the breaker sees a success.
+        """
+        breaker = get_breaker()
+        if breaker.state == OPEN:
+            GEMINI_REQUESTS.labels(result="rejected").inc()
+            raise ReasonerUnavailable("Gemini circuit open")
+        
+        async with self._slot(tenant_id):
+            # The circuit may have opened while this call was queued
+            if not breaker.allow():
+                GEMINI_REQUESTS.labels(result="rejected").inc()
+                raise ReasonerUnavailable("Gemini circuit open")
+            started = time.monotonic()
+            response = None
+            try:
+                response = await asyncio.wait_for(
+                    self._model.generate_content_async(parts),
+                    timeout=self._timeout_sec
+                )
+                # .text raises ValueError when the response was blocked
+                result = parse(response.text)
+            except asyncio.TimeoutError:
+                GEMINI_REQUESTS.labels(result="timeout").inc()
+                breaker.record(False, time.monotonic() - started)
+                raise
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+            except ValueError:
+                # Gemini answered; a blocked or malformed answer is about the input
+                GEMINI_REQUESTS.labels(result="invalid").inc()
+                breaker.record(True, time.monotonic() - started)
+                raise
+            except Exception:
+                GEMINI_REQUESTS.labels(result="error").inc()
+                breaker.record(False, time.monotonic() - started)
+                raise
+            finally:
+                latency = time.monotonic() - started
+                GEMINI_LATENCY.observe(latency)
+                if response is not None:
+                    # Tokens are spent whether or not the answer was usable
+                    await self._meter(tenant_id, parts, response)
+        GEMINI_REQUESTS.labels(result="ok").inc()
+        breaker.record(True, latency)
+        return result, latency
+    
+    async def _meter(self, tenant_id: str, parts: List[Any], response: Any):
+        """Record the call against the tenant's budget"""
+        usage = getattr(response, "usage_metadata", None)
+        try:
+            await get_budget_meter().record(
+                tenant_id,
+                prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+                response_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+                image_bytes=sum(len(p["data"]) for p in parts if isinstance(p, dict))
+            )
         except Exception as e:
-            print(f"Gemini error: {e}")
-            return self._mock_assessment()
+            print(f"Failed to meter Gemini usage for tenant {tenant_id}: {e}")
+    
+    async def _generate(
+        self,
+        image_data: bytes,
+        context: Dict[str, Any],
+        tenant_id: str
+    ) -> Dict[str, Any]:
+        """One Gemini call; raises on timeout, API errors and unparseable output"""
+        prepared, context = await self._prepare(image_data, context)
+        
+        # Build prompt
+        prompt = self._build_prompt(context)
+        
+        # Raw bytes; the SDK sends them as a blob without a base64 string copy here
+        image_part = {
+            "mime_type": "image/jpeg",
+            "data": prepared.data
+        }
+        
+        # Generate and parse structured response
+        result, latency = await self._call([prompt, image_part], tenant_id, self._parse_response)
+        print(
+            f"Gemini call: {prepared.original_bytes} -> {len(prepared.data)} bytes "
+            f"({prepared.original_size[0]}x{prepared.original_size[1]} -> "
+            f"{prepared.size[0]}x{prepared.size[1]}), prep {prepared.prep_ms:.1f} ms, "
+            f"latency {latency:.2f}s"
+        )
+        return result
+    
+    async def _generate_batch(
+        self,
+        images: List[bytes],
+        contexts: List[Dict[str, Any]],
+        tenant_id: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """One multi-image Gemini call; None for images the response left out"""
+        prepared = await asyncio.gather(*(
+            self._prepare(image_data, context) for image_data, context in zip(images, contexts)
+        ))
+        
+        parts: List[Any] = [self._build_batch_prompt([context for _, context in prepared])]
+        for n, (image, _) in enumerate(prepared, start=1):
+            parts.append(f"Image {n}:")
+            parts.append({"mime_type": "image/jpeg", "data": image.data})
+        
+        by_image, latency = await self._call(parts, tenant_id, self._parse_batch_response)
+        print(
+            f"Gemini batch call: {len(images)} images, "
+            f"{sum(image.original_bytes for image, _ in prepared)} -> "
+            f"{sum(len(image.data) for image, _ in prepared)} bytes, latency {latency:.2f}s"
+        )
+        return [by_image.get(n) for n in range(1, len(images) + 1)]
+    
+    def _parse_batch_response(self, text: str) -> Dict[int, Dict[str, Any]]:
+        """Per-image entries of a batch response, keyed by image number"""
+        by_image = {}
+        for entry in self._parse_response(text).get("assessments", []):
+            if isinstance(entry, dict) and isinstance(entry.get("image"), int):
+                by_image[entry.pop("image")] = entry
+        return by_image
     
     def _build_prompt(self, context: Dict[str, Any]) -> str:
         crop = context.get("crop", "chili")
@@ -92,7 +412,52 @@ Respond ONLY with valid JSON in this exact format:
     ],
     "summary": "brief overall assessment"
 }}"""
-    
+
+    def _build_batch_prompt(self, contexts: List[Dict[str, Any]]) -> str:
+        images = []
+        for n, context in enumerate(contexts, start=1):
+            lines = [
+                f"Image {n}:",
+                f"Crop type: {context.get('crop', 'chili')}",
+                f"Location: {context.get('farm_location', 'Malaysia')}"
+            ]
+            if context.get("recent_detections"):
+                lines.append(f"YOLO detections: {json.dumps(context['recent_detections'])}")
+            if context.get("recent_telemetry_summary"):
+                lines.append(f"Sensor readings: {json.dumps(context['recent_telemetry_summary'])}")
+            images.append("\n".join(lines))
+        image_summary = "\n\n".join(images)
+        
+        return f"""You are an expert agricultural AI assistant analyzing {len(contexts)} crop images.
+They come from the same farm around the same time; assess each image on its own evidence,
+using the others only as context (e.g. a disease spreading between plots).
+
+{image_summary}
+
+For each image provide:
+1. Overall plant health assessment
+2. Identify any diseases, pests, or deficiencies visible
+3. Severity level (low/medium/high)
+4. Confidence in each hypothesis (0-1)
+5. Recommended actions with priority (1=urgent, 5=low)
+
+Respond ONLY with valid JSON in this exact format, one entry per image:
+{{
+    "assessments": [
+        {{
+            "image": 1,
+            "severity": "low|medium|high",
+            "hypotheses": [
+                {{"name": "disease_name", "confidence": 0.8, "evidence": "description"}}
+            ],
+            "recommended_actions": [
+                {{"action": "action_description", "priority": 2, "notes": "additional_info"}}
+            ],
+            "summary": "brief overall assessment"
+        }}
+    ]
+}}"""
+
     def _parse_response(self, text: str) -> Dict[str, Any]:
         """Parse Gemini response into structured format"""
         try:
@@ -105,10 +470,11 @@ Respond ONLY with valid JSON in this exact format:
         except json.JSONDecodeError:
             pass
         
-        return self._mock_assessment()
+        # Not cached; the caller treats it like any other failed call
+        raise ValueError("Gemini response contained no valid JSON")
     
     def _mock_assessment(self) -> Dict[str, Any]:
-        """Return mock assessment when Gemini unavailable"""
+        """Return mock assessment when no Gemini API key is configured"""
         return {
             "severity": "low",
             "hypotheses": [
@@ -135,5 +501,9 @@ _reasoner: GeminiReasoner = None
 def get_reasoner() -> GeminiReasoner:
     global _reasoner
     if _reasoner is None:
-        _reasoner = GeminiReasoner()
+        _reasoner = GeminiReasoner(
+            max_concurrency=settings.reasoner_max_concurrency,
+            tenant_concurrency=settings.reasoner_tenant_concurrency,
+            timeout_sec=settings.reasoner_timeout_sec
+        )
     return _reasoner
@@ -0,0 +1,97 @@
+"""
+AFASA 2.0 - Assessment Replay Queue
+Detection events that couldn't be assessed while Gemini was unavailable,
+kept in Redis until the circuit closes. Events Gemini won't assess, or that
+run out of attempts, go to a dead-letter list instead.
+"""
+import json
+import time
+from typing import Dict, Any, Optional
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.redis_client import get_redis
+from app.metrics import REPLAY_QUEUE_DEPTH, REPLAY_DEAD_LETTERS
+
+REPLAY_KEY = "reasoner:replay"
+DEAD_LETTER_KEY = "reasoner:replay:dead"
+
+
+class ReplayQueue:
+    """
+    FIFO of pending assessments (event data only; images are re-read from
+    storage on replay). Bounded: the oldest entries are dropped first.
+    """
+    
+    def __init__(self, max_items: int = 10000, max_age_sec: int = 86400, max_attempts: int = 5):
+        self._max_items = max(1, max_items)
+        self._max_age_sec = max_age_sec
+        self._max_attempts = max(1, max_attempts)
+    
+    async def push(self, item: Dict[str, Any]):
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.rpush(REPLAY_KEY, json.dumps({**item, "queued_at": time.time(), "attempts": 0}))
+            pipe.ltrim(REPLAY_KEY, -self._max_items, -1)
+            pipe.llen(REPLAY_KEY)
+            _, _, depth = await pipe.execute()
+        REPLAY_QUEUE_DEPTH.set(depth)
+    
+    async def pop(self) -> Optional[Dict[str, Any]]:
+        """Oldest item that hasn't expired, or None"""
+        r = await get_redis()
+        while True:
+            raw = await r.lpop(REPLAY_KEY)
+            if raw is None:
+                REPLAY_QUEUE_DEPTH.set(0)
+                return None
+            item = json.loads(raw)
+            if time.time() - item["queued_at"] <= self._max_age_sec:
+                return item
+            print(f"Dropping stale replay for snapshot {item.get('snapshot_id')}")
+    
+    async def requeue(self, item: Dict[str, Any]) -> bool:
+        """
+        Put an item back at the head after a replay that found Gemini still
+        unavailable. Dead-letters it instead once it has used up its
+        attempts; returns whether it was requeued.
+        """
+        item = {**item, "attempts": item.get("attempts", 0) + 1}
+        if item["attempts"] >= self._max_attempts:
+            await self.dead_letter(item, "out of replay attempts", reason="attempts")
+            return False
+        r = await get_redis()
+        await r.lpush(REPLAY_KEY, json.dumps(item))
+        return True
+    
+    async def dead_letter(self, item: Dict[str, Any], error: str, reason: str = "error"):
+        """Park an item Gemini won't assess, for inspection; bounded like the queue"""
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.rpush(DEAD_LETTER_KEY, json.dumps({**item, "error": error, "failed_at": time.time()}))
+            pipe.ltrim(DEAD_LETTER_KEY, -self._max_items, -1)
+            await pipe.execute()
+        REPLAY_DEAD_LETTERS.labels(reason=reason).inc()
+        print(f"Dead-lettered assessment for snapshot {item.get('snapshot_id')}: {error}")
+    
+    async def depth(self) -> int:
+        r = await get_redis()
+        depth = await r.llen(REPLAY_KEY)
+        REPLAY_QUEUE_DEPTH.set(depth)
+        return depth
+
+
+_replay_queue: Optional[ReplayQueue] = None
+
+
+def get_replay_queue() -> ReplayQueue:
+    global _replay_queue
+    if _replay_queue is None:
+        settings = get_settings()
+        _replay_queue = ReplayQueue(
+            max_items=settings.reasoner_replay_max_items,
+            max_age_sec=settings.reasoner_replay_max_age_sec,
+            max_attempts=settings.reasoner_replay_max_attempts
+        )
+    return _replay_queue
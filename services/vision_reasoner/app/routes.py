@@ -4,7 +4,7 @@ AFASA 2.0 - Vision Reasoner Routes
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy import select
 import sys
@@ -16,6 +16,8 @@ from common import (
     Assessment
 )
 from app.reasoner import get_reasoner
+from app.breaker import ReasonerUnavailable
+from app.budget import get_budget_meter
 
 router = APIRouter(tags=["vision-reasoner"])
 
@@ -36,6 +38,7 @@ class AssessRequest(BaseModel):
     camera_id: UUID
     s3_key: str
     context: Optional[Dict[str, Any]] = None
+    bypass_cache: bool = False  # force a fresh Gemini call
 
 
 class HypothesisItem(BaseModel):
@@ -59,6 +62,27 @@ class AssessResponse(BaseModel):
     created_at: datetime
 
 
+class UsageItem(BaseModel):
+    prompt_tokens: int
+    response_tokens: int
+    total_tokens: int
+    image_bytes: int
+    calls: int
+
+
+class DailyUsageItem(UsageItem):
+    day: str
+
+
+class UsageResponse(BaseModel):
+    daily_token_budget: Optional[int]
+    monthly_token_budget: Optional[int]
+    used_fraction: float
+    today: UsageItem
+    month: UsageItem
+    history: List[DailyUsageItem]
+
+
 @router.post("/assess", response_model=AssessResponse)
 async def assess_snapshot(
     body: AssessRequest,
@@ -68,6 +92,10 @@ async def assess_snapshot(
     storage = get_storage_client()
     reasoner = get_reasoner()
     
+    admission = await get_budget_meter().admit(token.tenant_id, interactive=True)
+    if not admission.admitted:
+        raise HTTPException(status_code=429, detail="Reasoning budget exhausted for this period")
+    
     # Get snapshot image from S3
     try:
         image_data = storage.get_object(body.s3_key)
@@ -82,7 +110,12 @@ async def assess_snapshot(
         context["farm_location"] = "Malaysia"
     
     # Run reasoning
-    result = await reasoner.assess(image_data, context)
+    try:
+        result = await reasoner.assess(
+            image_data, context, token.tenant_id, use_cache=not body.bypass_cache
+        )
+    except ReasonerUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Reasoner degraded: {e}")
     
     async with get_tenant_session(token.tenant_id) as session:
         # Store assessment
@@ -122,3 +155,23 @@ async def assess_snapshot(
             recommended_actions=[ActionItem(**a) for a in result.get("recommended_actions", [])],
             created_at=assessment.created_at
         )
+
+
+@router.get("/usage", response_model=UsageResponse)
+async def get_usage(
+    days: int = Query(30, ge=1, le=40),
+    token: TokenPayload = Depends(verify_token)
+):
+    """Gemini tokens and image bytes used by the tenant, against its budgets"""
+    meter = get_budget_meter()
+    daily, monthly = await meter.budgets(token.tenant_id)
+    today, month = await meter.usage(token.tenant_id)
+    history = await meter.history(token.tenant_id, days)
+    return UsageResponse(
+        daily_token_budget=daily,
+        monthly_token_budget=monthly,
+        used_fraction=round(await meter.used_fraction(token.tenant_id), 4),
+        today=UsageItem(**today.to_dict()),
+        month=UsageItem(**month.to_dict()),
+        history=[DailyUsageItem(day=day, **usage.to_dict()) for day, usage in history]
+    )
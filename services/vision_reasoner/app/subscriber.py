@@ -2,11 +2,19 @@
 AFASA 2.0 - Detection Event Subscriber
 Auto-runs reasoning on significant detections
 """
+import asyncio
+from typing import Dict, Any, Optional
 import sys
 sys.path.insert(0, '/app/services')
 
-from common import get_event_bus, EventEnvelope, Subjects, get_storage_client
+from common import get_event_bus, EventEnvelope, Subjects, get_storage_client, get_settings
 from app.reasoner import get_reasoner
+from app.breaker import ReasonerUnavailable, AssessmentFailed, OPEN, get_breaker
+from app.replay import get_replay_queue
+from app.budget import get_budget_meter
+from app.metrics import REPLAYS
+from app.batcher import get_assessment_batcher
+from app.triage import get_triage
 
 
 # Only run reasoning for these detection types
@@ -52,52 +60,160 @@ async def handle_detection_created(envelope: EventEnvelope):
     
     print(f"Running reasoning for {len(significant)} significant detections")
     
+    # Build context from detections
+    context = {
+        "crop": "chili",
+        "farm_location": "Malaysia",
+        "recent_detections": significant
+    }
+    
+    item = {
+        "tenant_id": tenant_id,
+        "snapshot_id": snapshot_id,
+        "camera_id": camera_id,
+        "s3_key": s3_key,
+        "context": context,
+        "correlation_id": envelope.correlation_id
+    }
     try:
+        await assess_and_publish(
+            tenant_id, snapshot_id, camera_id, s3_key, context, envelope.correlation_id
+        )
+    except ReasonerUnavailable as e:
+        # Degraded: ack the event and assess it once Gemini is back
+        print(f"Reasoner degraded ({e}); queued {snapshot_id} for replay")
+        await get_replay_queue().push(item)
+    except AssessmentFailed as e:
+        # Retrying won't change Gemini's answer
+        await get_replay_queue().dead_letter(item, str(e))
+    except Exception as e:
+        print(f"Error in reasoning for {snapshot_id}: {e}")
+
+
+async def assess_and_publish(
+    tenant_id: str,
+    snapshot_id: str,
+    camera_id: str,
+    s3_key: str,
+    context: Dict[str, Any],
+    correlation_id: Optional[str] = None,
+    triage: bool = True
+):
+    """Triage or reason about a snapshot and publish ASSESSMENT_CREATED"""
+    settings = get_settings()
+    
+    # Clear-cut cases get the playbook answer; only ambiguous ones reach Gemini
+    result = None
+    if triage and settings.reasoner_triage_enabled:
+        decision = get_triage().evaluate(context)
+        result = decision.assessment
+        if result is None:
+            print(f"Escalating {snapshot_id} to Gemini: {decision.reason}")
+    
+    if result is None:
+        # Near the tenant's budget, calls are batched and sampled; over it, none go out
+        admission = await get_budget_meter().admit(tenant_id)
+        if not admission.admitted:
+            print(
+                f"Skipping Gemini for {snapshot_id}: {admission.reason} "
+                f"({admission.used_fraction:.0%} of budget used)"
+            )
+            return
+        
         storage = get_storage_client()
-        reasoner = get_reasoner()
         
         # Get image
         image_data = storage.get_object(s3_key)
         
-        # Build context from detections
-        context = {
-            "crop": "chili",
-            "farm_location": "Malaysia",
-            "recent_detections": significant
-        }
-        
-        # Run reasoning
-        result = await reasoner.assess(image_data, context)
-        
-        # Publish assessment event
-        event_bus = await get_event_bus()
-        await event_bus.publish(
-            Subjects.ASSESSMENT_CREATED,
-            tenant_id,
-            {
-                "assessment_id": snapshot_id,  # Using snapshot ID as assessment reference
-                "snapshot_id": snapshot_id,
-                "camera_id": camera_id,
-                "severity": result.get("severity", "low"),
-                "hypotheses": result.get("hypotheses", []),
-                "recommended_actions": result.get("recommended_actions", [])
-            },
-            producer="afasa-vision-reasoner",
-            correlation_id=envelope.correlation_id
-        )
-        
-        print(f"Assessment complete: severity={result.get('severity')}")
-        
-    except Exception as e:
-        print(f"Error in reasoning for {snapshot_id}: {e}")
+        # Run reasoning, windowed with the tenant's other events when batching
+        if settings.reasoner_batch_enabled or admission.batch:
+            result = await get_assessment_batcher().submit(tenant_id, camera_id, image_data, context)
+        else:
+            result = await get_reasoner().assess(image_data, context, tenant_id)
+    
+    # Publish assessment event
+    event_bus = await get_event_bus()
+    await event_bus.publish(
+        Subjects.ASSESSMENT_CREATED,
+        tenant_id,
+        {
+            "assessment_id": snapshot_id,  # Using snapshot ID as assessment reference
+            "snapshot_id": snapshot_id,
+            "camera_id": camera_id,
+            "severity": result.get("severity", "low"),
+            "hypotheses": result.get("hypotheses", []),
+            "recommended_actions": result.get("recommended_actions", []),
+            "source": result.get("source", "gemini")
+        },
+        producer="afasa-vision-reasoner",
+        correlation_id=correlation_id
+    )
+    
+    print(f"Assessment complete: severity={result.get('severity')}")
+
+
+async def replay_degraded_assessments():
+    """
+    Drain the replay queue whenever the Gemini circuit lets calls through.
+    Items go in rounds of up to a batch so replays share batching windows.
+    """
+    settings = get_settings()
+    queue = get_replay_queue()
+    while True:
+        await asyncio.sleep(settings.reasoner_replay_interval_sec)
+        try:
+            while get_breaker().state != OPEN:
+                items = []
+                while len(items) < max(1, settings.reasoner_batch_max_size):
+                    item = await queue.pop()
+                    if item is None:
+                        break
+                    items.append(item)
+                if not items:
+                    break
+                
+                outcomes = await asyncio.gather(
+                    *(
+                        assess_and_publish(
+                            item["tenant_id"], item["snapshot_id"], item["camera_id"],
+                            item["s3_key"], item["context"], item.get("correlation_id"),
+                            triage=False  # already escalated the first time
+                        )
+                        for item in items
+                    ),
+                    return_exceptions=True
+                )
+                degraded = False
+                # Newest first, so requeued items keep their order at the head
+                for item, outcome in reversed(list(zip(items, outcomes))):
+                    if isinstance(outcome, ReasonerUnavailable):
+                        # Still degraded; keep its place for the next round
+                        if await queue.requeue(item):
+                            REPLAYS.labels(result="requeued").inc()
+                        else:
+                            REPLAYS.labels(result="dead_letter").inc()
+                        degraded = True
+                    elif isinstance(outcome, Exception):
+                        REPLAYS.labels(result="dead_letter").inc()
+                        await queue.dead_letter(item, str(outcome))
+                    else:
+                        REPLAYS.labels(result="ok").inc()
+                if degraded:
+                    break
+        except Exception as e:
+            print(f"Replay loop error: {e}")
 
 
 async def start_detection_subscriber():
     """Start listening for detection events"""
+    settings = get_settings()
     event_bus = await get_event_bus()
     await event_bus.subscribe(
         Subjects.DETECTION_CREATED,
         handle_detection_created,
-        queue="reasoner-workers"
+        queue="reasoner-workers",
+        # Gemini calls are awaited, not blocking; the reasoner's semaphores bound them.
+        # Enough deliveries in flight to fill a batching window too.
+        max_in_flight=max(settings.reasoner_max_concurrency * 2, settings.reasoner_batch_max_size)
     )
     print("Vision Reasoner subscriber started")
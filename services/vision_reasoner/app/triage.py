@@ -0,0 +1,237 @@
+"""
+AFASA 2.0 - Local Triage
+Playbook answers for clear-cut detections, so only ambiguous cases go to Gemini
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.metrics import TRIAGE_DECISIONS, ESCALATION_RATE
+
+Range = Tuple[Optional[float], Optional[float]]  # inclusive, None = unbounded
+
+
+@dataclass(frozen=True)
+class PlaybookRule:
+    """Standard response to one label on given crops, above a confidence floor"""
+    label: str
+    min_confidence: float
+    severity: str
+    hypothesis: str
+    evidence: str
+    actions: Tuple[Tuple[str, int, str], ...]  # (action, priority, notes)
+    crops: Tuple[str, ...] = ("chili",)
+    # Telemetry that would contradict the diagnosis; readings outside escalate
+    telemetry: Dict[str, Range] = field(default_factory=dict)
+    requires_telemetry: bool = False
+    # This many detections of the label means it is spreading
+    spread_count: int = 5
+
+
+PLAYBOOK: Tuple[PlaybookRule, ...] = (
+    PlaybookRule(
+        label="powdery_mildew",
+        min_confidence=0.85,
+        severity="medium",
+        hypothesis="powdery_mildew",
+        evidence="White powdery growth on leaf surfaces detected with high confidence",
+        actions=(
+            ("Apply sulphur or potassium bicarbonate spray to affected plants", 2, "Repeat after 7-10 days"),
+            ("Remove heavily infected leaves", 3, "Bag and dispose away from the plot"),
+            ("Improve airflow between plants", 4, "Prune dense growth")
+        ),
+        telemetry={"humidity_avg": (40.0, None)}
+    ),
+    PlaybookRule(
+        label="rust",
+        min_confidence=0.85,
+        severity="medium",
+        hypothesis="rust",
+        evidence="Orange-brown pustules on leaves detected with high confidence",
+        actions=(
+            ("Apply a copper-based or mancozeb fungicide", 2, "Cover leaf undersides"),
+            ("Remove and destroy infected leaves", 3, None),
+            ("Avoid overhead irrigation", 4, "Water at the base in the morning")
+        )
+    ),
+    PlaybookRule(
+        label="leaf_blight",
+        min_confidence=0.85,
+        severity="high",
+        hypothesis="leaf_blight",
+        evidence="Expanding necrotic leaf lesions detected with high confidence",
+        actions=(
+            ("Apply a protective fungicide (chlorothalonil or mancozeb)", 1, "Treat neighbouring plants too"),
+            ("Remove infected foliage and fallen debris", 2, None),
+            ("Reduce leaf wetness", 3, "Switch to drip irrigation where possible")
+        )
+    ),
+    PlaybookRule(
+        label="anthracnose",
+        min_confidence=0.85,
+        severity="high",
+        hypothesis="anthracnose",
+        evidence="Sunken dark lesions on fruit detected with high confidence",
+        actions=(
+            ("Harvest and destroy infected fruit", 1, "Do not compost"),
+            ("Apply a fungicide labelled for anthracnose", 2, "Repeat per label interval"),
+            ("Keep fruit off the soil with mulch", 4, None)
+        )
+    ),
+    PlaybookRule(
+        label="bacterial_spot",
+        min_confidence=0.85,
+        severity="medium",
+        hypothesis="bacterial_spot",
+        evidence="Water-soaked leaf spots with yellow halos detected with high confidence",
+        actions=(
+            ("Apply a copper bactericide", 2, "Fungicides alone are ineffective"),
+            ("Avoid working among wet plants", 3, "Bacteria spread on hands and tools"),
+            ("Disinfect tools after use", 4, None)
+        )
+    ),
+    PlaybookRule(
+        label="mosaic_virus",
+        min_confidence=0.9,
+        severity="high",
+        hypothesis="mosaic_virus",
+        evidence="Mottled light/dark green leaf pattern detected with high confidence",
+        actions=(
+            ("Uproot and destroy infected plants", 1, "There is no cure once infected"),
+            ("Control aphids and whiteflies", 2, "They transmit the virus"),
+            ("Disinfect tools and hands between plants", 3, None)
+        ),
+        spread_count=2
+    ),
+    PlaybookRule(
+        label="pest",
+        min_confidence=0.85,
+        severity="medium",
+        hypothesis="insect_pest",
+        evidence="Insect pests detected on plants with high confidence",
+        actions=(
+            ("Inspect leaf undersides to identify the pest", 2, "Treatment depends on the species"),
+            ("Apply neem oil or insecticidal soap to affected plants", 2, None),
+            ("Set yellow sticky traps to monitor numbers", 4, None)
+        )
+    ),
+    # Wilting is only clear-cut when the soil is dry; otherwise it could be bacterial wilt
+    PlaybookRule(
+        label="wilting",
+        min_confidence=0.85,
+        severity="medium",
+        hypothesis="water_stress",
+        evidence="Wilting with low soil moisture readings",
+        actions=(
+            ("Irrigate affected plants", 1, "Check the irrigation schedule and emitters"),
+            ("Mulch to retain soil moisture", 4, None)
+        ),
+        telemetry={"soil_moisture_avg": (None, 25.0)},
+        requires_telemetry=True
+    ),
+)
+
+
+@dataclass
+class TriageDecision:
+    assessment: Optional[Dict[str, Any]]  # None = escalate to Gemini
+    reason: str
+
+
+class PlaybookTriage:
+    """
+    Matches a detection context against the playbook.
+    A single label at or above its rule's confidence floor, on a listed crop,
+    with no contradicting telemetry, is answered locally; mixed labels, mid
+    confidence, unknown crops and conflicting readings escalate.
+    """
+    
+    def __init__(self, playbook: Tuple[PlaybookRule, ...] = PLAYBOOK):
+        self._rules: Dict[str, List[PlaybookRule]] = {}
+        for rule in playbook:
+            self._rules.setdefault(rule.label, []).append(rule)
+        for rules in self._rules.values():
+            rules.sort(key=lambda r: -r.min_confidence)
+        self._resolved = 0
+        self._escalated = 0
+    
+    def evaluate(self, context: Dict[str, Any]) -> TriageDecision:
+        decision = self._decide(context)
+        outcome = "escalated" if decision.assessment is None else "resolved"
+        TRIAGE_DECISIONS.labels(outcome=outcome, reason=decision.reason).inc()
+        if decision.assessment is None:
+            self._escalated += 1
+        else:
+            self._resolved += 1
+        ESCALATION_RATE.set(self._escalated / (self._escalated + self._resolved))
+        return decision
+    
+    def _decide(self, context: Dict[str, Any]) -> TriageDecision:
+        detections = context.get("recent_detections") or []
+        labels = {str(d.get("label", "")).lower() for d in detections}
+        if not labels:
+            return TriageDecision(None, "no_detections")
+        if len(labels) > 1:
+            return TriageDecision(None, "mixed_labels")
+        
+        label = labels.pop()
+        crop = str(context.get("crop") or "chili").lower()
+        rules = [r for r in self._rules.get(label, []) if crop in r.crops]
+        if not rules:
+            return TriageDecision(None, "no_rule")
+        
+        confidence = max(float(d.get("confidence", 0)) for d in detections)
+        rules = [r for r in rules if confidence >= r.min_confidence]
+        if not rules:
+            return TriageDecision(None, "mid_confidence")
+        
+        telemetry = context.get("recent_telemetry_summary") or {}
+        for rule in rules:
+            conflict = self._telemetry_conflict(rule, telemetry)
+            if conflict is None:
+                return TriageDecision(self._assessment(rule, confidence, len(detections)), "playbook")
+        return TriageDecision(None, conflict)
+    
+    @staticmethod
+    def _telemetry_conflict(rule: PlaybookRule, telemetry: Dict[str, Any]) -> Optional[str]:
+        for key, (low, high) in rule.telemetry.items():
+            value = telemetry.get(key)
+            if value is None:
+                if rule.requires_telemetry:
+                    return "telemetry_missing"
+                continue
+            if (low is not None and value < low) or (high is not None and value > high):
+                return "telemetry_conflict"
+        return None
+    
+    @staticmethod
+    def _assessment(rule: PlaybookRule, confidence: float, count: int) -> Dict[str, Any]:
+        severity = "high" if count >= rule.spread_count else rule.severity
+        return {
+            "severity": severity,
+            "hypotheses": [
+                {
+                    "name": rule.hypothesis,
+                    "confidence": round(confidence, 2),
+                    "evidence": rule.evidence
+                }
+            ],
+            "recommended_actions": [
+                {"action": action, "priority": priority, "notes": notes}
+                for action, priority, notes in rule.actions
+            ],
+            "summary": f"{rule.hypothesis.replace('_', ' ').capitalize()} ({count} detection(s)); playbook response.",
+            "source": "playbook"
+        }
+
+
+_triage: Optional[PlaybookTriage] = None
+
+
+def get_triage() -> PlaybookTriage:
+    global _triage
+    if _triage is None:
+        _triage = PlaybookTriage()
+    return _triage
@@ -0,0 +1,10 @@
+"""
+Test setup: make the service's `app` package and the shared `common`
+package importable when running pytest from services/vision_reasoner
+"""
+import sys
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVICE_DIR))
+sys.path.insert(0, str(SERVICE_DIR.parent))
@@ -0,0 +1,144 @@
+"""
+Replay only covers transient Gemini failures: unusable answers are
+dead-lettered straight away and replays give up after max_attempts
+"""
+import asyncio
+import io
+import types
+
+import pytest
+from PIL import Image
+
+from app import breaker, reasoner, replay
+from app.breaker import ReasonerUnavailable, AssessmentFailed, CLOSED, CircuitBreaker
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._ops = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def __getattr__(self, name):
+        return lambda *args: self._ops.append((name, args))
+    
+    async def execute(self):
+        return [await getattr(self._redis, name)(*args) for name, args in self._ops]
+
+
+class FakeRedis:
+    """Just the list commands the replay queue uses"""
+    
+    def __init__(self):
+        self.lists = {}
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+        return len(self.lists[key])
+    
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+        return len(self.lists[key])
+    
+    async def lpop(self, key):
+        items = self.lists.get(key)
+        return items.pop(0) if items else None
+    
+    async def ltrim(self, key, start, end):
+        items = self.lists.get(key, [])
+        self.lists[key] = items[start:] if end == -1 else items[start:end + 1]
+    
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+
+class BlockedModel:
+    """A response whose text can't be read, like a safety-blocked candidate"""
+    
+    async def generate_content_async(self, parts):
+        return types.SimpleNamespace(text="I can't help with that image.", usage_metadata=None)
+
+
+class SlowModel:
+    """Times out on every call"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_content_async(self, parts):
+        self.calls += 1
+        await asyncio.sleep(1)
+
+
+class NullMeter:
+    async def record(self, *args, **kwargs):
+        pass
+
+
+def _jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_unparseable_answer_fails_assessment_without_opening_breaker(monkeypatch):
+    circuit = CircuitBreaker(min_calls=1, max_error_rate=0.5)
+    monkeypatch.setattr(reasoner, "get_breaker", lambda: circuit)
+    monkeypatch.setattr(reasoner, "get_budget_meter", lambda: NullMeter())
+    gemini = reasoner.GeminiReasoner(timeout_sec=5)
+    gemini._model = BlockedModel()
+    
+    with pytest.raises(AssessmentFailed):
+        asyncio.run(gemini.assess(_jpeg(), {"crop": "chili"}, "tenant", use_cache=False))
+    # Gemini answered; one tenant's blocked images mustn't degrade everyone
+    assert circuit.state == CLOSED
+
+
+def test_timed_out_batch_is_replayed_not_fanned_out(monkeypatch):
+    monkeypatch.setattr(reasoner, "get_breaker", lambda: CircuitBreaker(min_calls=100))
+    monkeypatch.setattr(reasoner, "get_budget_meter", lambda: NullMeter())
+    gemini = reasoner.GeminiReasoner(timeout_sec=0.05)
+    gemini._model = SlowModel()
+    
+    items = [(_jpeg(), {"crop": "chili", "n": n}) for n in range(3)]
+    results = asyncio.run(gemini.assess_batch(items, "tenant", use_cache=False))
+    assert all(isinstance(result, ReasonerUnavailable) for result in results)
+    assert gemini._model.calls == 1
+
+
+def test_replay_dead_letters_after_max_attempts(monkeypatch):
+    fake = FakeRedis()
+    
+    async def get_redis():
+        return fake
+    
+    monkeypatch.setattr(replay, "get_redis", get_redis)
+    queue = replay.ReplayQueue(max_attempts=3)
+    
+    async def scenario():
+        await queue.push({"snapshot_id": "s1"})
+        requeued = []
+        while True:
+            item = await queue.pop()
+            if item is None:
+                return requeued
+            requeued.append(await queue.requeue(item))
+    
+    assert asyncio.run(scenario()) == [True, True, False]
+    assert fake.lists[replay.REPLAY_KEY] == []
+    assert len(fake.lists[replay.DEAD_LETTER_KEY]) == 1
+
+
+def test_transient_errors_are_replayable():
+    assert breaker.is_transient(ReasonerUnavailable("circuit open"))
+    assert breaker.is_transient(asyncio.TimeoutError())
+    assert not breaker.is_transient(ValueError("no JSON"))
+    assert not breaker.is_transient(AssessmentFailed("blocked"))
@@ -0,0 +1,219 @@
+"""
+AFASA 2.0 - Annotated Image Rendering
+Draws detection boxes on demand, cached in-process and in MinIO
+"""
+import asyncio
+import hashlib
+import io
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings, get_storage_client
+from app.metrics import ANNOTATION_REQUESTS, ANNOTATION_RENDER_LATENCY
+
+# Labels worth an annotated image up front (mirrors the reasoner's triggers)
+SIGNIFICANT_LABELS = {
+    "leaf_blight",
+    "powdery_mildew",
+    "rust",
+    "bacterial_spot",
+    "mosaic_virus",
+    "anthracnose",
+    "pest",
+    "wilting"
+}
+
+MIN_SIGNIFICANT_CONFIDENCE = 0.5
+
+# MinIO metadata field tying an annotated object to the detections drawn on it
+DIGEST_METADATA = "detections-digest"
+
+_PALETTE = [
+    (255, 56, 56), (255, 157, 151), (255, 112, 31), (255, 178, 29),
+    (207, 210, 49), (72, 249, 10), (146, 204, 23), (61, 219, 134),
+    (26, 147, 52), (0, 212, 187), (44, 153, 168), (0, 194, 255),
+]
+
+
+def is_significant(detections: List[Dict[str, Any]]) -> bool:
+    """Whether any detection should get an annotated image immediately"""
+    return any(
+        d["label"].lower() in SIGNIFICANT_LABELS
+        and d["confidence"] >= MIN_SIGNIFICANT_CONFIDENCE
+        for d in detections
+    )
+
+
+def detections_digest(detections: List[Dict[str, Any]]) -> str:
+    """Stable digest of the boxes drawn on an image"""
+    canonical = json.dumps(
+        sorted(
+            [d["label"], round(float(d["confidence"]), 3), [round(float(v), 4) for v in d["bbox"]]]
+            for d in detections
+        )
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def _label_color(label: str) -> Tuple[int, int, int]:
+    return _PALETTE[sum(label.encode()) % len(_PALETTE)]
+
+
+def draw_detections(
+    image_data: bytes,
+    detections: List[Dict[str, Any]],
+    quality: int = 85
+) -> bytes:
+    """Draw normalized bboxes with labels onto the image and JPEG-encode it"""
+    img = Image.open(io.BytesIO(image_data)).convert("RGB")
+    width, height = img.size
+    draw = ImageDraw.Draw(img)
+    
+    line_width = max(2, round(max(width, height) / 400))
+    font_size = max(12, line_width * 6)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+    
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        box = (x1 * width, y1 * height, x2 * width, y2 * height)
+        color = _label_color(det["label"])
+        draw.rectangle(box, outline=color, width=line_width)
+        
+        text = f"{det['label']} {det['confidence']:.2f}"
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        text_y = max(0, box[1] - (bottom - top) - 2 * line_width)
+        draw.rectangle(
+            (box[0], text_y, box[0] + (right - left) + 2 * line_width, text_y + (bottom - top) + 2 * line_width),
+            fill=color
+        )
+        draw.text((box[0] + line_width, text_y + line_width - top), text, fill=(255, 255, 255), font=font)
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class AnnotationCache:
+    """
+    Resolves annotated images for (tenant, snapshot, detections).
+    Looks in an in-process LRU, then MinIO, and only renders on a miss.
+    """
+    
+    def __init__(self, max_entries: int = 64):
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, bytes]]" = OrderedDict()
+    
+    async def get_or_render(
+        self,
+        tenant_id: str,
+        snapshot_id: str,
+        detections: List[Dict[str, Any]],
+        image_data: Optional[bytes] = None,
+        s3_key: Optional[str] = None
+    ) -> Tuple[str, bytes]:
+        """
+        Return (annotated_s3_key, jpeg_bytes).
+        The original image is taken from image_data, or fetched from s3_key.
+        """
+        digest = detections_digest(detections)
+        cache_key = (tenant_id, snapshot_id, digest)
+        
+        cached = self._entries.get(cache_key)
+        if cached is not None:
+            self._entries.move_to_end(cache_key)
+            ANNOTATION_REQUESTS.labels(result="memory_hit").inc()
+            return cached
+        
+        entry = await asyncio.to_thread(
+            self._load_or_render, tenant_id, snapshot_id, detections, digest, image_data, s3_key
+        )
+        self._remember(cache_key, entry)
+        return entry
+    
+    async def ensure(
+        self,
+        tenant_id: str,
+        snapshot_id: str,
+        detections: List[Dict[str, Any]],
+        image_data: Optional[bytes] = None,
+        s3_key: Optional[str] = None
+    ) -> str:
+        """
+        Make sure an up-to-date annotated image exists and return its key.
+        Unlike get_or_render, a MinIO hit doesn't download the image.
+        """
+        digest = detections_digest(detections)
+        cache_key = (tenant_id, snapshot_id, digest)
+        
+        cached = self._entries.get(cache_key)
+        if cached is not None:
+            self._entries.move_to_end(cache_key)
+            ANNOTATION_REQUESTS.labels(result="memory_hit").inc()
+            return cached[0]
+        
+        annotated_key, annotated = await asyncio.to_thread(
+            self._load_or_render, tenant_id, snapshot_id, detections, digest, image_data, s3_key, False
+        )
+        if annotated is not None:
+            self._remember(cache_key, (annotated_key, annotated))
+        return annotated_key
+    
+    def _remember(self, cache_key: Tuple[str, str, str], entry: Tuple[str, bytes]):
+        self._entries[cache_key] = entry
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+    
+    def _load_or_render(
+        self,
+        tenant_id: str,
+        snapshot_id: str,
+        detections: List[Dict[str, Any]],
+        digest: str,
+        image_data: Optional[bytes],
+        s3_key: Optional[str],
+        load_bytes: bool = True
+    ) -> Tuple[str, Optional[bytes]]:
+        storage = get_storage_client()
+        annotated_key = storage.annotated_key(tenant_id, snapshot_id)
+        
+        metadata = storage.get_metadata(annotated_key)
+        if metadata and metadata.get(DIGEST_METADATA) == digest:
+            ANNOTATION_REQUESTS.labels(result="storage_hit").inc()
+            return annotated_key, storage.get_object(annotated_key) if load_bytes else None
+        
+        if image_data is None:
+            if not s3_key:
+                raise ValueError("Either image_data or s3_key is required to render")
+            image_data = storage.get_object(s3_key)
+        
+        started = time.perf_counter()
+        annotated = draw_detections(image_data, detections)
+        ANNOTATION_RENDER_LATENCY.observe(time.perf_counter() - started)
+        ANNOTATION_REQUESTS.labels(result="rendered").inc()
+        
+        storage.upload_annotated(
+            tenant_id,
+            snapshot_id,
+            annotated,
+            metadata={DIGEST_METADATA: digest}
+        )
+        return annotated_key, annotated
+
+
+_annotation_cache: Optional[AnnotationCache] = None
+
+
+def get_annotation_cache() -> AnnotationCache:
+    global _annotation_cache
+    if _annotation_cache is None:
+        settings = get_settings()
+        _annotation_cache = AnnotationCache(max_entries=settings.yolo_annotation_cache_size)
+    return _annotation_cache
@@ -0,0 +1,127 @@
+"""
+AFASA 2.0 - YOLO Inference Backends
+Maps model weights to a PyTorch, ONNX Runtime or OpenVINO artifact
+"""
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_path(weights: str, backend: str, int8: bool = False) -> Path:
+    """Where the exported artifact for a backend lives, next to the .pt file"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    
+    path = Path(weights)
+    suffix = "_int8" if int8 else ""
+    if backend == "onnx":
+        return path.with_name(f"{path.stem}{suffix}.onnx")
+    if backend == "openvino":
+        return path.with_name(f"{path.stem}{suffix}_openvino_model")
+    return path
+
+
+def resolve_weights(weights: str, backend: str = "torch", int8: bool = False) -> str:
+    """
+    Path to load for the requested backend.
+    Falls back to the PyTorch weights if the export hasn't been built.
+    """
+    path = exported_path(weights, backend, int8)
+    if backend != "torch" and not path.exists():
+        print(f"No {backend} export at {path}, falling back to PyTorch weights {weights}")
+        return weights
+    return str(path)
+
+
+def export_weights(
+    weights: str,
+    backend: str,
+    int8: bool = False,
+    imgsz: int = 640,
+    data: Optional[str] = None
+) -> Path:
+    """
+    Export PyTorch weights for a backend.
+    ONNX INT8 uses onnxruntime dynamic quantization; OpenVINO INT8 uses
+    ultralytics/NNCF post-training quantization calibrated on `data`.
+    """
+    from ultralytics import YOLO
+    
+    target = exported_path(weights, backend, int8)
+    if backend == "torch":
+        return target
+    
+    model = YOLO(weights)
+    if backend == "onnx":
+        # Dynamic axes so batched calls work
+        exported = Path(model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(str(exported), str(target), weight_type=QuantType.QUInt8)
+            return target
+    else:
+        exported = Path(model.export(
+            format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data
+        ))
+    
+    if exported.resolve() != target.resolve():
+        exported.rename(target)
+    return target
+
+
+def _measure_latency(model, images: List[Any], imgsz: int, runs: int) -> Dict[str, float]:
+    """Per-image predict latency in milliseconds"""
+    model(images[0], imgsz=imgsz, verbose=False)  # warm-up
+    samples = []
+    for i in range(runs):
+        started = time.perf_counter()
+        model(images[i % len(images)], imgsz=imgsz, verbose=False)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "latency_ms_mean": round(statistics.mean(samples), 2),
+        "latency_ms_p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2)
+    }
+
+
+def compare_backends(
+    weights: str,
+    data: str,
+    images: List[Any],
+    imgsz: int = 640,
+    runs: int = 50
+) -> List[Dict[str, Any]]:
+    """
+    Latency and mAP for every available export of `weights`.
+    mAP drift is reported relative to the PyTorch baseline.
+    """
+    from ultralytics import YOLO
+    
+    report = []
+    baseline_map = None
+    for backend in BACKENDS:
+        for int8 in (False, True):
+            if backend == "torch" and int8:
+                continue
+            path = exported_path(weights, backend, int8)
+            if not path.exists():
+                continue
+            
+            model = YOLO(str(path), task="detect")
+            row = {"backend": backend, "int8": int8, "path": str(path)}
+            row.update(_measure_latency(model, images, imgsz, runs))
+            
+            metrics = model.val(data=data, imgsz=imgsz, batch=1, verbose=False, plots=False)
+            row["map50_95"] = round(float(metrics.box.map), 4)
+            row["map50"] = round(float(metrics.box.map50), 4)
+            
+            if backend == "torch":
+                baseline_map = row["map50_95"]
+            row["map_drift"] = (
+                round(row["map50_95"] - baseline_map, 4) if baseline_map is not None else None
+            )
+            report.append(row)
+    return report
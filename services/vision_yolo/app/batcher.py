@@ -0,0 +1,128 @@
+"""
+AFASA 2.0 - Snapshot Micro-Batcher
+Coalesces snapshot inference requests into multi-image model calls
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.executor import get_executor
+from app.metrics import BATCH_SIZE, BATCH_LATENCY, BATCH_WAIT, IMAGES_INFERRED
+
+
+BatchKey = Tuple[str, float, str, str]  # model, threshold, tenant, priority
+
+
+@dataclass
+class _PendingImage:
+    image_data: bytes
+    future: asyncio.Future
+    enqueued_at: float
+    region: Optional[Tuple[float, float, float, float]] = None
+    roi: Optional[List[Tuple[float, float]]] = None
+
+
+class InferenceBatcher:
+    """
+    Collects images for up to max_batch_size items or max_wait_ms,
+    whichever comes first, then runs a single model call for them.
+    Images are grouped by (model, threshold) since both apply to the whole call,
+    and by tenant and priority so the scheduler can order batches fairly.
+    """
+    
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: int = 50):
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max_wait_ms / 1000
+        self._pending: Dict[BatchKey, List[_PendingImage]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+    
+    async def submit(
+        self,
+        image_data: bytes,
+        model: str,
+        threshold: float = 0.5,
+        region: Optional[Tuple[float, float, float, float]] = None,
+        roi: Optional[List[Tuple[float, float]]] = None,
+        tenant_id: str = "",
+        priority: str = "event"
+    ) -> Dict[str, Any]:
+        """
+        Queue an image and wait for its result, optionally limited to a
+        normalized crop and/or ROI polygon
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (model, threshold, tenant_id, priority)
+        
+        batch = self._pending.setdefault(key, [])
+        batch.append(_PendingImage(image_data, future, time.monotonic(), region, roi))
+        
+        if len(batch) >= self._max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self._max_wait, self._flush, key)
+        
+        return await future
+    
+    def _flush(self, key: BatchKey):
+        """Hand the pending batch for a key to a model call"""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        
+        batch = self._pending.pop(key, [])
+        if not batch:
+            return
+        
+        task = asyncio.create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, key: BatchKey, batch: List[_PendingImage]):
+        model, threshold, tenant_id, priority = key
+        started = time.monotonic()
+        for item in batch:
+            BATCH_WAIT.observe(started - item.enqueued_at)
+        
+        try:
+            results = await get_executor().infer_batch(
+                [item.image_data for item in batch],
+                threshold,
+                model=model,
+                regions=[item.region for item in batch],
+                rois=[item.roi for item in batch],
+                priority=priority,
+                tenant_id=tenant_id
+            )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        
+        BATCH_LATENCY.observe(time.monotonic() - started)
+        BATCH_SIZE.observe(len(batch))
+        IMAGES_INFERRED.labels(source="batch").inc(len(batch))
+        
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+
+_batcher: Optional[InferenceBatcher] = None
+
+
+def get_batcher() -> InferenceBatcher:
+    global _batcher
+    if _batcher is None:
+        settings = get_settings()
+        _batcher = InferenceBatcher(
+            max_batch_size=settings.yolo_batch_size,
+            max_wait_ms=settings.yolo_batch_max_wait_ms
+        )
+    return _batcher
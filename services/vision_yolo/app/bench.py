@@ -0,0 +1,143 @@
+"""
+AFASA 2.0 - Vision YOLO Micro-benchmarks
+
+Usage:
+    python -m app.bench ingest [--image frame.jpg] [--runs 30]
+    python -m app.bench postprocess [--runs 200]
+"""
+import argparse
+import io
+import statistics
+import time
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+from app.ingest import decode_for_inference
+from app.infer import extract_detections
+
+
+def _timeit(fn: Callable[[], object], runs: int) -> float:
+    """Median wall time in milliseconds"""
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _synthetic_jpeg(width: int = 3840, height: int = 2160) -> bytes:
+    """Noisy gradient frame; noise keeps the JPEG realistically large"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    frame = np.clip(gradient + rng.normal(0, 25, (height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _letterbox(array: np.ndarray, size: int) -> np.ndarray:
+    """The resize the model applies to whatever it is given"""
+    import cv2
+    h, w = array.shape[:2]
+    scale = size / max(h, w)
+    return cv2.resize(array, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+
+
+def bench_ingest(image_data: bytes, runs: int, size: int = 640):
+    def full_decode():
+        img = Image.open(io.BytesIO(image_data)).convert("RGB")
+        return _letterbox(np.ascontiguousarray(np.asarray(img)[:, :, ::-1]), size)
+    
+    def reduced_decode():
+        return _letterbox(decode_for_inference(image_data, size).array, size)
+    
+    baseline = _timeit(full_decode, runs)
+    reduced = _timeit(reduced_decode, runs)
+    decoded = decode_for_inference(image_data, size)
+    print(f"source {decoded.original_size[0]}x{decoded.original_size[1]}, "
+          f"reduced decode 1/{decoded.reduction} -> {decoded.array.shape[1]}x{decoded.array.shape[0]}")
+    print(f"full decode + resize:    {baseline:8.2f} ms")
+    print(f"reduced decode + resize: {reduced:8.2f} ms  ({baseline / reduced:.1f}x)")
+
+
+def _synthetic_boxes(count: int, width: int = 960, height: int = 540) -> np.ndarray:
+    """Random raw boxes (x1, y1, x2, y2, conf, cls) in pixels"""
+    rng = np.random.default_rng(count)
+    xy = rng.uniform(0, 0.9, (count, 2)) * [width, height]
+    wh = rng.uniform(0.01, 0.1, (count, 2)) * [width, height]
+    conf = rng.uniform(0.25, 1.0, (count, 1))
+    cls = rng.integers(0, 7, (count, 1))
+    return np.hstack([xy, xy + wh, conf, cls]).astype(np.float32)
+
+
+def _legacy_extract(boxes, names, classes):
+    """The previous per-box loop, kept here as the benchmark baseline"""
+    detections = []
+    for box in boxes:
+        x1, y1, x2, y2 = box.xyxyn[0].tolist()
+        conf = float(box.conf[0])
+        cls_id = int(box.cls[0])
+        label = names[cls_id]
+        if classes and label not in classes:
+            continue
+        detections.append({
+            "label": label,
+            "confidence": round(conf, 3),
+            "bbox": [round(x1, 4), round(y1, 4), round(x2, 4), round(y2, 4)]
+        })
+    return detections
+
+
+def bench_postprocess(runs: int):
+    names = {i: name for i, name in enumerate([
+        "leaf_blight", "powdery_mildew", "rust", "bacterial_spot",
+        "mosaic_virus", "anthracnose", "healthy"
+    ])}
+    classes = ["leaf_blight", "rust"]
+    class_ids = [0, 2]
+    orig_shape = (540, 960)
+    
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+    except ImportError:
+        torch = None
+        print("torch/ultralytics not installed; legacy per-box loop skipped")
+    
+    print(f"{'boxes':>6}{'legacy ms':>12}{'vectorized ms':>16}")
+    for count in (0, 10, 500):
+        data = _synthetic_boxes(count)
+        vectorized = _timeit(lambda: extract_detections(data, orig_shape, names, 0.25, class_ids), runs)
+        legacy = ""
+        if torch is not None:
+            boxes = Boxes(torch.from_numpy(data), orig_shape)
+            legacy = f"{_timeit(lambda: _legacy_extract(boxes, names, classes), runs):.3f}"
+        print(f"{count:>6}{legacy:>12}{vectorized:>16.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vision YOLO micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    ingest = sub.add_parser("ingest", help="Full vs reduced-resolution JPEG decode")
+    ingest.add_argument("--image", help="JPEG to decode (default: synthetic 4K frame)")
+    ingest.add_argument("--runs", type=int, default=30)
+    
+    postprocess = sub.add_parser("postprocess", help="Per-box loop vs vectorized extraction")
+    postprocess.add_argument("--runs", type=int, default=200)
+    
+    args = parser.parse_args()
+    
+    if args.command == "ingest":
+        data = open(args.image, "rb").read() if args.image else _synthetic_jpeg()
+        bench_ingest(data, args.runs)
+    elif args.command == "postprocess":
+        bench_postprocess(args.runs)
+
+
+if __name__ == "__main__":
+    main()
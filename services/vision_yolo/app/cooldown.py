@@ -2,30 +2,44 @@
 AFASA 2.0 - Detection Cooldown Policy
 Prevents alert spam using Redis-based cooldowns
 """
-import time
-from typing import Tuple
-import redis.asyncio as redis
+from typing import List, Tuple
 import sys
 sys.path.insert(0, '/app/services')
 
 from common import get_settings
+from app.redis_client import get_redis
 
-settings = get_settings()
-
-# Default cooldown: 1 hour
-DEFAULT_COOLDOWN_SEC = 3600
-
-# Minimum confidence threshold
-MIN_CONFIDENCE = 0.5
-
-_redis: redis.Redis = None
-
+# Check-and-arm every key in one atomic step, on Redis' clock.
+# Returns per key: 0 = alert (cooldown now armed), otherwise seconds remaining.
+# Values are epoch milliseconds; older float-seconds values are still understood.
+_CHECK_AND_SET = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local cooldown_ms = tonumber(ARGV[1])
+local result = {}
+for i, key in ipairs(KEYS) do
+  local remaining = 0
+  local last = redis.call('GET', key)
+  if last then
+    local last_ms = tonumber(last)
+    if last_ms < 100000000000 then
+      last_ms = last_ms * 1000
+    end
+    remaining = last_ms + cooldown_ms - now_ms
+  end
+  if remaining > 0 then
+    result[i] = math.ceil(remaining / 1000)
+  else
+    if cooldown_ms > 0 then
+      redis.call('SET', key, now_ms, 'PX', cooldown_ms)
+    end
+    result[i] = 0
+  end
+end
+return result
+"""
 
-async def get_redis() -> redis.Redis:
-    global _redis
-    if _redis is None:
-        _redis = redis.from_url(settings.redis_url)
-    return _redis
+_script = None
 
 
 def cooldown_key(tenant_id: str, camera_id: str, label: str) -> str:
@@ -33,53 +47,60 @@ def cooldown_key(tenant_id: str, camera_id: str, label: str) -> str:
     return f"cooldown:{tenant_id}:{camera_id}:{label}"
 
 
-async def check_cooldown(
+def cooldown_policy(tenant_id: str) -> Tuple[int, float]:
+    """(cooldown_sec, min_confidence) for a tenant, falling back to the defaults"""
+    settings = get_settings()
+    return (
+        settings.yolo_tenant_cooldown_sec.get(tenant_id, settings.yolo_cooldown_sec),
+        settings.yolo_tenant_min_confidence.get(tenant_id, settings.yolo_cooldown_min_confidence)
+    )
+
+
+async def check_cooldowns(
     tenant_id: str,
-    camera_id: str,
-    label: str,
-    confidence: float,
-    cooldown_sec: int = DEFAULT_COOLDOWN_SEC,
-    min_confidence: float = MIN_CONFIDENCE
-) -> Tuple[bool, int]:
+    items: List[Tuple[str, str, float]]
+) -> List[Tuple[bool, int]]:
     """
-    Check if detection should trigger alert.
-    Returns (should_alert, cooldown_remaining_sec).
+    Decide alerts for a batch of (camera_id, label, confidence) in one round trip.
+    Alerting items arm their cooldown in the same step, so concurrent callers
+    can't both alert. Returns (should_alert, cooldown_remaining_sec) per item.
     """
-    # Below minimum confidence - never alert
-    if confidence < min_confidence:
-        return False, 0
-    
-    r = await get_redis()
-    key = cooldown_key(tenant_id, camera_id, label)
-    
-    last_alert = await r.get(key)
-    
-    if last_alert is None:
-        # No previous alert - should alert
-        return True, 0
+    global _script
+    cooldown_sec, min_confidence = cooldown_policy(tenant_id)
     
-    last_alert_time = float(last_alert.decode())
-    elapsed = time.time() - last_alert_time
-    remaining = int(cooldown_sec - elapsed)
+    # Below minimum confidence - never alert, and don't touch Redis for it
+    eligible = [i for i, (_, _, confidence) in enumerate(items) if confidence >= min_confidence]
+    results = [(False, 0)] * len(items)
+    if not eligible:
+        return results
+    if cooldown_sec <= 0:
+        # Cooldown disabled: every eligible detection alerts
+        for i in eligible:
+            results[i] = (True, 0)
+        return results
     
-    if remaining <= 0:
-        # Cooldown expired - should alert
-        return True, 0
+    r = await get_redis()
+    if _script is None:
+        _script = r.register_script(_CHECK_AND_SET)
+    keys = [cooldown_key(tenant_id, items[i][0], items[i][1]) for i in eligible]
+    remaining = await _script(keys=keys, args=[cooldown_sec * 1000])
     
-    # Still in cooldown - don't alert
-    return False, remaining
+    for i, left in zip(eligible, remaining):
+        results[i] = (int(left) == 0, int(left))
+    return results
 
 
-async def update_cooldown(
+async def check_cooldown(
     tenant_id: str,
     camera_id: str,
     label: str,
-    cooldown_sec: int = DEFAULT_COOLDOWN_SEC
-):
-    """Update last alert time for cooldown tracking"""
-    r = await get_redis()
-    key = cooldown_key(tenant_id, camera_id, label)
-    await r.set(key, str(time.time()), ex=cooldown_sec)
+    confidence: float
+) -> Tuple[bool, int]:
+    """
+    Check if detection should trigger alert, arming the cooldown if so.
+    Returns (should_alert, cooldown_remaining_sec).
+    """
+    return (await check_cooldowns(tenant_id, [(camera_id, label, confidence)]))[0]
 
 
 async def clear_cooldown(
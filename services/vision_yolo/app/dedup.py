@@ -0,0 +1,124 @@
+"""
+AFASA 2.0 - Near-Duplicate Frame Detection
+Perceptual hashing so static cameras don't re-run the model on identical frames
+"""
+import json
+import time
+from typing import Dict, Any, Optional
+import numpy as np
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.ingest import thumbnail
+from app.redis_client import get_redis
+
+HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so coeffs = D @ X @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    basis[0] /= np.sqrt(2)
+    return basis.astype(np.float32)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(gray: np.ndarray) -> int:
+    """64-bit pHash of a grayscale preview: low-frequency DCT signs vs. their median"""
+    pixels = thumbnail(gray, _DCT_SIZE)
+    coeffs = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # DC term only tracks overall brightness; exclude it from the median
+    bits = coeffs > np.median(coeffs[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def frame_key(tenant_id: str, camera_id: str) -> str:
+    return f"yolo:frame:{tenant_id}:{camera_id}"
+
+
+class FrameDeduplicator:
+    """
+    Remembers the last processed frame per camera (hash + detections) in Redis.
+    A new frame within max_distance bits of it reuses the stored detections.
+    """
+    
+    def __init__(self, max_distance: int = 4, max_age_sec: int = 21600):
+        self._max_distance = max_distance
+        self._max_age_sec = max_age_sec
+    
+    async def lookup(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        frame_hash: int,
+        model: str,
+        threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        """Previous frame state if this frame is a near-duplicate of it"""
+        r = await get_redis()
+        raw = await r.get(frame_key(tenant_id, camera_id))
+        if raw is None:
+            return None
+        
+        previous = json.loads(raw)
+        if previous["model"] != model or previous["threshold"] != threshold:
+            return None
+        if hamming_distance(int(previous["phash"], 16), frame_hash) > self._max_distance:
+            return None
+        return previous
+    
+    async def remember(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        snapshot_id: str,
+        frame_hash: int,
+        model: str,
+        threshold: float,
+        result: Dict[str, Any]
+    ):
+        """Store the frame just processed as the camera's reference"""
+        r = await get_redis()
+        await r.set(
+            frame_key(tenant_id, camera_id),
+            json.dumps({
+                "phash": f"{frame_hash:016x}",
+                "snapshot_id": snapshot_id,
+                "model": model,
+                "threshold": threshold,
+                "detections": result["detections"],
+                "image_size": result.get("image_size"),
+                "processed_at": time.time()
+            }),
+            ex=self._max_age_sec
+        )
+
+
+def dedup_enabled(tenant_id: str) -> bool:
+    """Tenants listed in yolo_force_inference_tenants always get full inference"""
+    settings = get_settings()
+    return settings.yolo_dedup_enabled and tenant_id not in settings.yolo_force_inference_tenants
+
+
+_deduplicator: Optional[FrameDeduplicator] = None
+
+
+def get_deduplicator() -> FrameDeduplicator:
+    global _deduplicator
+    if _deduplicator is None:
+        settings = get_settings()
+        _deduplicator = FrameDeduplicator(
+            max_distance=settings.yolo_dedup_max_distance,
+            max_age_sec=settings.yolo_dedup_max_age_sec
+        )
+    return _deduplicator
@@ -0,0 +1,299 @@
+"""
+AFASA 2.0 - YOLO Inference Executor
+Runs inference in a pool of worker processes, each holding a preloaded detector
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.scheduler import SlotScheduler
+from app.metrics import (
+    EXECUTOR_WORKERS, EXECUTOR_CAPACITY, EXECUTOR_IN_FLIGHT,
+    EXECUTOR_REJECTED, WORKER_LATENCY,
+    MODEL_LOADS, MODEL_EVICTIONS, MODEL_RESIDENT_BYTES, MODELS_LOADED
+)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when too many requests of a priority are queued and the caller won't wait"""
+    pass
+
+
+def _init_worker(
+    torch_threads: int,
+    model_overrides: Dict[str, str],
+    preload_models: List[Optional[str]],
+    warmup_sizes: List[int],
+    warmup_runs: int,
+    ready_queue
+):
+    """
+    Pin torch intra-op threads, then load and warm each preloaded model
+    (None is the default model) once per worker. Reports
+    (pid, load_s, warmup_s, error) on ready_queue; a model that didn't load
+    is an error.
+    """
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except Exception as e:
+        print(f"Failed to set torch threads in worker {os.getpid()}: {e}")
+    
+    from app.infer import get_detector, set_model_overrides
+    set_model_overrides(model_overrides)
+    
+    load_s = warmup_s = 0.0
+    error = None
+    try:
+        for name in preload_models:
+            started = time.perf_counter()
+            detector = get_detector(name)
+            load_s += time.perf_counter() - started
+            if not detector.loaded:
+                raise RuntimeError(f"{name or 'default model'}: {detector.load_error}")
+            
+            started = time.perf_counter()
+            detector.warmup(warmup_sizes, warmup_runs)
+            warmup_s += time.perf_counter() - started
+    except Exception as e:
+        error = str(e)
+    ready_queue.put((os.getpid(), load_s, warmup_s, error))
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_batch(
+    images: List[bytes],
+    threshold: float,
+    classes: Optional[List[str]],
+    model: Optional[str],
+    regions: Optional[List[Optional[Tuple[float, float, float, float]]]] = None,
+    rois: Optional[List[Optional[List[Tuple[float, float]]]]] = None
+) -> Tuple[int, float, List[Dict[str, Any]], Dict[str, Any]]:
+    """Worker entry point: returns (pid, seconds, results, registry report)"""
+    from app.infer import get_registry
+    registry = get_registry()
+    started = time.perf_counter()
+    results = registry.get(model).infer_batch(
+        images, threshold=threshold, classes=classes, regions=regions, rois=rois
+    )
+    elapsed = time.perf_counter() - started
+    report = {"events": registry.drain_events(), **registry.stats()}
+    return os.getpid(), elapsed, results, report
+
+
+class InferenceExecutor:
+    """
+    Process pool for CPU-bound inference.
+    Only one batch per worker is handed to the pool at a time; everything else
+    waits in the SlotScheduler, where priority and tenant fairness decide the
+    order. Callers that won't wait get ExecutorBusyError once queue_depth
+    requests at their priority or above are already waiting.
+    """
+    
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_depth: int = 8,
+        torch_threads: int = 2,
+        model_overrides: Optional[Dict[str, str]] = None,
+        preload_models: Optional[List[str]] = None,
+        warmup_sizes: Optional[List[int]] = None,
+        warmup_runs: int = 1,
+        slo_sec: Optional[Dict[str, float]] = None,
+        tenant_weights: Optional[Dict[str, float]] = None
+    ):
+        self._workers = max(1, workers)
+        self._queue_depth = max(0, queue_depth)
+        self._scheduler = SlotScheduler(self._workers, slo_sec or {}, tenant_weights)
+        self._in_flight = 0
+        # Batches accepted (queued or running); drain waits for them
+        self._accepted = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._draining = False
+        context = multiprocessing.get_context("spawn")
+        self._ready_queue = context.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                max(1, torch_threads),
+                model_overrides or {},
+                # The default model first, then any named ones
+                [None] + [name for name in preload_models or [] if name],
+                warmup_sizes or [],
+                warmup_runs,
+                self._ready_queue
+            )
+        )
+    
+    async def start(self, timeout: float = 600) -> List[Tuple[int, float, float]]:
+        """
+        Spawn every worker and wait until each has loaded and warmed its models.
+        Returns (pid, load_s, warmup_s) per worker.
+        """
+        loop = asyncio.get_running_loop()
+        # Each submission finds no idle worker, so the pool spawns all of them
+        pings = [loop.run_in_executor(self._pool, _ping) for _ in range(self._workers)]
+        
+        reports = []
+        deadline = time.monotonic() + timeout
+        for _ in range(self._workers):
+            remaining = max(0.1, deadline - time.monotonic())
+            pid, load_s, warmup_s, error = await asyncio.to_thread(
+                self._ready_queue.get, True, remaining
+            )
+            if error:
+                raise RuntimeError(f"Worker {pid} failed to load model: {error}")
+            reports.append((pid, load_s, warmup_s))
+        await asyncio.gather(*pings)
+        
+        EXECUTOR_WORKERS.set(self._workers)
+        EXECUTOR_CAPACITY.set(self._workers)
+        return reports
+    
+    def is_full(self, priority: str = "interactive") -> bool:
+        return self._scheduler.waiting(priority) >= self._queue_depth
+    
+    async def infer_batch(
+        self,
+        images: List[bytes],
+        threshold: float = 0.5,
+        classes: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        wait: bool = True,
+        regions: Optional[List[Optional[Tuple[float, float, float, float]]]] = None,
+        rois: Optional[List[Optional[List[Tuple[float, float]]]]] = None,
+        priority: str = "event",
+        tenant_id: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a batch on a worker process; model=None uses the default model.
+        regions optionally limits each image to a normalized crop, rois to a polygon.
+        """
+        if self._draining and get_executor() is not self:
+            # Swapped out: new work goes to the serving executor
+            return await get_executor().infer_batch(
+                images, threshold, classes, model=model, wait=wait, regions=regions,
+                rois=rois, priority=priority, tenant_id=tenant_id
+            )
+        
+        if not wait and self.is_full(priority):
+            EXECUTOR_REJECTED.inc()
+            raise ExecutorBusyError("Inference queue is full")
+        
+        self._accepted += 1
+        self._idle.clear()
+        try:
+            await self._scheduler.acquire(priority, tenant_id, cost=len(images))
+            self._in_flight += 1
+            EXECUTOR_IN_FLIGHT.set(self._in_flight)
+            try:
+                loop = asyncio.get_running_loop()
+                pid, elapsed, results, report = await loop.run_in_executor(
+                    self._pool, _run_batch, images, threshold, classes, model, regions, rois
+                )
+                WORKER_LATENCY.labels(worker=str(pid)).observe(elapsed)
+                self._record_registry(pid, report)
+                return results
+            finally:
+                self._in_flight -= 1
+                EXECUTOR_IN_FLIGHT.set(self._in_flight)
+                self._scheduler.release()
+        finally:
+            self._accepted -= 1
+            if self._accepted == 0:
+                self._idle.set()
+    
+    async def infer(
+        self,
+        image_data: bytes,
+        threshold: float = 0.5,
+        classes: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        wait: bool = True,
+        roi: Optional[List[Tuple[float, float]]] = None,
+        priority: str = "event",
+        tenant_id: str = ""
+    ) -> Dict[str, Any]:
+        """Run a single image on a worker process"""
+        results = await self.infer_batch(
+            [image_data], threshold, classes, model=model, wait=wait, rois=[roi],
+            priority=priority, tenant_id=tenant_id
+        )
+        return results[0]
+    
+    def _record_registry(self, pid: int, report: Dict[str, Any]):
+        """Export a worker's model registry activity"""
+        for event, name in report["events"]:
+            if event == "load":
+                MODEL_LOADS.labels(model=name).inc()
+            else:
+                MODEL_EVICTIONS.labels(model=name).inc()
+        MODEL_RESIDENT_BYTES.labels(worker=str(pid)).set(report["resident_bytes"])
+        MODELS_LOADED.labels(worker=str(pid)).set(len(report["models"]))
+    
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    async def drain(self):
+        """
+        Stop accepting batches (later calls go to the serving executor), let
+        the ones already queued in the scheduler or running finish, then stop
+        the workers
+        """
+        self._draining = True
+        await self._idle.wait()
+        await asyncio.to_thread(self._pool.shutdown, True)
+
+
+def create_executor(
+    model_overrides: Optional[Dict[str, str]] = None,
+    preload_models: Optional[List[str]] = None
+) -> InferenceExecutor:
+    settings = get_settings()
+    return InferenceExecutor(
+        workers=settings.yolo_workers,
+        queue_depth=settings.yolo_queue_depth,
+        torch_threads=settings.yolo_torch_threads,
+        model_overrides=model_overrides,
+        preload_models=preload_models,
+        warmup_sizes=settings.yolo_warmup_sizes,
+        warmup_runs=settings.yolo_warmup_runs,
+        slo_sec=settings.yolo_priority_slo_sec,
+        tenant_weights=settings.yolo_tenant_weights
+    )
+
+
+_executor: Optional[InferenceExecutor] = None
+
+
+def get_executor() -> InferenceExecutor:
+    global _executor
+    if _executor is None:
+        _executor = create_executor()
+    return _executor
+
+
+def replace_executor(executor: InferenceExecutor) -> Optional[InferenceExecutor]:
+    """Atomically route new submissions to executor; returns the previous one"""
+    global _executor
+    previous, _executor = _executor, executor
+    return previous
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,68 @@
+"""
+AFASA 2.0 - YOLO Export Tool
+Builds ONNX Runtime / OpenVINO artifacts and compares them to PyTorch
+
+Usage:
+    python -m app.export build --weights plant_disease.pt --backend onnx [--int8]
+    python -m app.export compare --weights plant_disease.pt --data val.yaml --images val/images
+"""
+import argparse
+import json
+from pathlib import Path
+
+from app.backends import BACKENDS, export_weights, compare_backends
+
+
+def _load_images(images_dir: str, limit: int = 20):
+    from PIL import Image
+    paths = sorted(
+        p for p in Path(images_dir).iterdir()
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )[:limit]
+    if not paths:
+        raise SystemExit(f"No images found in {images_dir}")
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and compare YOLO inference backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    build = sub.add_parser("build", help="Export weights for a backend")
+    build.add_argument("--weights", default="plant_disease.pt")
+    build.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], required=True)
+    build.add_argument("--int8", action="store_true", help="Also quantize to INT8")
+    build.add_argument("--imgsz", type=int, default=640)
+    build.add_argument("--data", help="Dataset YAML for INT8 calibration (OpenVINO)")
+    
+    compare = sub.add_parser("compare", help="Latency and mAP drift report")
+    compare.add_argument("--weights", default="plant_disease.pt")
+    compare.add_argument("--data", required=True, help="Validation dataset YAML")
+    compare.add_argument("--images", required=True, help="Directory of images for latency runs")
+    compare.add_argument("--imgsz", type=int, default=640)
+    compare.add_argument("--runs", type=int, default=50)
+    compare.add_argument("--output", help="Write the report as JSON")
+    
+    args = parser.parse_args()
+    
+    if args.command == "build":
+        path = export_weights(args.weights, args.backend, args.int8, args.imgsz, args.data)
+        print(f"Exported {args.weights} -> {path}")
+        return
+    
+    report = compare_backends(
+        args.weights, args.data, _load_images(args.images), args.imgsz, args.runs
+    )
+    print(f"{'backend':<10}{'int8':<6}{'mean ms':>10}{'p95 ms':>10}{'mAP50-95':>10}{'drift':>10}")
+    for row in report:
+        drift = "" if row["map_drift"] is None else f"{row['map_drift']:+.4f}"
+        print(
+            f"{row['backend']:<10}{str(row['int8']):<6}{row['latency_ms_mean']:>10}"
+            f"{row['latency_ms_p95']:>10}{row['map50_95']:>10}{drift:>10}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+AFASA 2.0 - Detection Heatmaps
+Per-camera, per-label grids of where detections appear, updated as they are created
+"""
+import io
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+import numpy as np
+from PIL import Image
+import sys
+sys.path.insert(0, '/app/services')
+
+from redis.exceptions import WatchError
+
+from common import get_settings
+from app.redis_client import get_redis
+
+GRID = 64
+TOTAL = "total"
+
+
+def heatmap_key(tenant_id: str, camera_id: str, label: str, day: str) -> str:
+    return f"yolo:heatmap:{tenant_id}:{camera_id}:{label}:{day}"
+
+
+def labels_key(tenant_id: str, camera_id: str) -> str:
+    return f"yolo:heatmap:{tenant_id}:{camera_id}:labels"
+
+
+def day_of(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m%d")
+
+
+def detection_grids(detections: List[Dict[str, Any]], grid: int = GRID) -> Dict[str, np.ndarray]:
+    """Confidence-weighted bbox coverage per label"""
+    grids: Dict[str, np.ndarray] = {}
+    for det in detections:
+        x0, y0, x1, y1 = np.clip(np.asarray(det["bbox"], dtype=np.float64), 0, 1)
+        c0, r0 = int(x0 * grid), int(y0 * grid)
+        c1, r1 = max(c0 + 1, int(np.ceil(x1 * grid))), max(r0 + 1, int(np.ceil(y1 * grid)))
+        cells = grids.setdefault(det["label"], np.zeros((grid, grid), dtype=np.float32))
+        cells[r0:r1, c0:c1] += det["confidence"]
+    return grids
+
+
+def _decode(raw: Optional[bytes], grid: int = GRID) -> np.ndarray:
+    if raw is None:
+        return np.zeros((grid, grid), dtype=np.float32)
+    return np.frombuffer(raw, dtype=np.float32).reshape(grid, grid).copy()
+
+
+class HeatmapStore:
+    """
+    Daily grids with a retention TTL, plus an all-time grid per label so any
+    query reads a bounded number of 16 KB arrays however long the history is.
+    """
+    
+    def __init__(self, retention_days: int = 90):
+        self._retention_days = retention_days
+    
+    async def record(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        detections: List[Dict[str, Any]],
+        taken_at: float
+    ):
+        """Add a snapshot's detections to today's and the all-time grids"""
+        grids = detection_grids(detections)
+        if not grids:
+            return
+        
+        day = day_of(taken_at)
+        keys = {
+            label: (
+                heatmap_key(tenant_id, camera_id, label, day),
+                heatmap_key(tenant_id, camera_id, label, TOTAL)
+            )
+            for label in grids
+        }
+        watched = [key for pair in keys.values() for key in pair]
+        
+        r = await get_redis()
+        async with r.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(*watched)
+                    current = dict(zip(watched, await pipe.mget(watched)))
+                    pipe.multi()
+                    for label, (daily, total) in keys.items():
+                        pipe.set(
+                            daily,
+                            (_decode(current[daily]) + grids[label]).tobytes(),
+                            ex=self._retention_days * 86400
+                        )
+                        pipe.set(total, (_decode(current[total]) + grids[label]).tobytes())
+                    pipe.sadd(labels_key(tenant_id, camera_id), *grids)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    # Concurrent snapshot from the same camera; re-read and retry
+                    continue
+    
+    async def labels(self, tenant_id: str, camera_id: str) -> List[str]:
+        r = await get_redis()
+        return sorted(m.decode() for m in await r.smembers(labels_key(tenant_id, camera_id)))
+    
+    async def load(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        label: Optional[str] = None,
+        days: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Sum of the grids for one label (or all) over the last days days,
+        or all time when days is None
+        """
+        labels = [label] if label else await self.labels(tenant_id, camera_id)
+        if days is None:
+            periods = [TOTAL]
+        else:
+            today = datetime.now(timezone.utc)
+            periods = [
+                (today - timedelta(days=offset)).strftime("%Y%m%d")
+                for offset in range(min(days, self._retention_days))
+            ]
+        
+        keys = [heatmap_key(tenant_id, camera_id, l, p) for l in labels for p in periods]
+        result = np.zeros((GRID, GRID), dtype=np.float32)
+        if not keys:
+            return result
+        r = await get_redis()
+        for raw in await r.mget(keys):
+            if raw is not None:
+                result += _decode(raw)
+        return result
+
+
+def render_png(grid: np.ndarray, size: int = 256) -> bytes:
+    """Heatmap as a colour PNG (black -> red -> yellow -> white), scaled to its maximum"""
+    peak = float(grid.max())
+    norm = grid / peak if peak > 0 else grid
+    rgb = np.stack([
+        np.clip(norm * 3, 0, 1),
+        np.clip(norm * 3 - 1, 0, 1),
+        np.clip(norm * 3 - 2, 0, 1)
+    ], axis=-1)
+    image = Image.fromarray((rgb * 255).astype(np.uint8), "RGB")
+    image = image.resize((size, size), Image.NEAREST)
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+_heatmap_store: Optional[HeatmapStore] = None
+
+
+def get_heatmap_store() -> HeatmapStore:
+    global _heatmap_store
+    if _heatmap_store is None:
+        _heatmap_store = HeatmapStore(retention_days=get_settings().yolo_heatmap_retention_days)
+    return _heatmap_store
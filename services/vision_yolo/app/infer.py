@@ -1,27 +1,52 @@
 """
 AFASA 2.0 - YOLO Inference Engine
 """
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-import io
-from PIL import Image
+import threading
 import numpy as np
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.backends import resolve_weights
+from app.ingest import decode_for_inference, crop_region
+from app.roi import Polygon, Region, polygon_bbox, polygon_mask, apply_mask, inside_mask
 
 
 class YOLOInference:
-    def __init__(self, model_path: str = "yolov8n.pt"):
+    def __init__(
+        self,
+        model_path: str = "yolov8n.pt",
+        backend: str = "torch",
+        int8: bool = False,
+        imgsz: int = 640
+    ):
         self._model = None
+        self.load_error: Optional[str] = None
         self._model_path = model_path
+        self._backend = backend
+        self._int8 = int8
+        self._imgsz = imgsz
         self._load_model()
     
     def _load_model(self):
-        """Load YOLO model"""
+        """Load YOLO model with the configured backend"""
         try:
             from ultralytics import YOLO
-            self._model = YOLO(self._model_path)
+            self._model = YOLO(
+                resolve_weights(self._model_path, self._backend, self._int8),
+                task="detect"
+            )
         except Exception as e:
             print(f"Failed to load YOLO model: {e}")
             self._model = None
+            self.load_error = str(e)
+    
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
     
     def infer(
         self,
@@ -31,48 +56,163 @@ class YOLOInference:
     ) -> Dict[str, Any]:
         """
         Run inference on image.
-        Returns detections list and annotated image.
+        Returns detections list and original image size.
         """
-        if self._model is None:
-            return {"detections": [], "annotated_data": None}
-        
-        # Load image
-        img = Image.open(io.BytesIO(image_data))
+        return self.infer_batch([image_data], threshold=threshold, classes=classes)[0]
+    
+    def infer_batch(
+        self,
+        images: List[bytes],
+        threshold: float = 0.5,
+        classes: List[str] = None,
+        regions: Optional[List[Optional[Region]]] = None,
+        rois: Optional[List[Optional[Polygon]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run inference on several images in one model call.
+        regions optionally restricts each image to a normalized (x0, y0, x1, y1)
+        crop, and rois to a polygon (pixels outside are greyed out and
+        detections centred outside dropped); bboxes are still returned
+        relative to the full frame.
+        Returns one result per image, in input order.
+        """
+        regions = list(regions) if regions else [None] * len(images)  # filled in from rois below
+        rois = rois or [None] * len(images)
         
-        # Run inference
-        results = self._model(img, conf=threshold)
+        # Decode close to model input size (of the crop, when there is one)
+        decoded = []
+        arrays = []
+        masks = []
+        for i, (data, roi) in enumerate(zip(images, rois)):
+            if roi and regions[i] is None:
+                regions[i] = polygon_bbox(roi)
+            region = regions[i]
+            if region is None:
+                d = decode_for_inference(data, self._imgsz)
+                array = d.array
+            else:
+                span = max(region[2] - region[0], region[3] - region[1])
+                d = decode_for_inference(data, int(self._imgsz / span))
+                array = crop_region(d.array, region)
+            mask = None
+            if roi:
+                mask = polygon_mask(roi, region, array.shape[:2])
+                array = apply_mask(array, mask)
+            decoded.append(d)
+            arrays.append(array)
+            masks.append(mask)
+        empty = [{"detections": [], "image_size": list(d.original_size)} for d in decoded]
         
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxyn[0].tolist()  # Normalized coords
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0])
-                label = result.names[cls_id]
-                
-                # Filter by classes if specified
-                if classes and label not in classes:
-                    continue
-                
-                detections.append({
-                    "label": label,
-                    "confidence": round(conf, 3),
-                    "bbox": [round(x1, 4), round(y1, 4), round(x2, 4), round(y2, 4)]
-                })
+        if self._model is None:
+            return empty
         
-        # Generate annotated image
-        annotated = results[0].plot()
-        annotated_img = Image.fromarray(annotated)
+        # Push the class filter into the model so it applies before NMS
+        class_ids = self._class_ids(classes)
+        if class_ids is not None and not class_ids:
+            return empty
         
-        buffer = io.BytesIO()
-        annotated_img.save(buffer, format="JPEG", quality=85)
-        annotated_data = buffer.getvalue()
+        # Run inference
+        results = self._model(
+            arrays,
+            conf=threshold,
+            imgsz=self._imgsz,
+            classes=class_ids,
+            verbose=False
+        )
         
-        return {
-            "detections": detections,
-            "annotated_data": annotated_data
-        }
+        outputs = []
+        for d, region, mask, result in zip(decoded, regions, masks, results):
+            detections = extract_detections(
+                result.boxes.data.cpu().numpy(),
+                result.boxes.orig_shape,
+                result.names,
+                threshold,
+                class_ids
+            )
+            if mask is not None and detections:
+                keep = inside_mask(np.array([det["bbox"] for det in detections]), mask)
+                detections = [det for det, k in zip(detections, keep.tolist()) if k]
+            outputs.append({
+                "detections": map_from_region(detections, region),
+                "image_size": list(d.original_size)
+            })
+        return outputs
+    
+    def _class_ids(self, classes: Optional[List[str]]) -> Optional[List[int]]:
+        """Map label names to model class IDs (None = no filter)"""
+        if not classes:
+            return None
+        wanted = set(classes)
+        return [cls_id for cls_id, name in self._model.names.items() if name in wanted]
+    
+    def warmup(self, sizes: List[int], runs: int = 1):
+        """Dummy inferences so first real requests don't pay lazy init costs"""
+        if self._model is None:
+            return
+        for size in sizes:
+            dummy = np.zeros((size, size, 3), dtype=np.uint8)
+            for _ in range(runs):
+                self._model(dummy, imgsz=size, verbose=False)
+    
+    def memory_bytes(self) -> int:
+        """Estimated resident size of the loaded weights"""
+        if self._model is None:
+            return 0
+        try:
+            return sum(p.numel() * p.element_size() for p in self._model.model.parameters())
+        except Exception:
+            pass
+        # Exported backends: use the size of the artifact on disk
+        path = Path(resolve_weights(self._model_path, self._backend, self._int8))
+        if path.is_dir():
+            return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        return path.stat().st_size if path.exists() else 0
+
+
+def extract_detections(
+    data: np.ndarray,
+    orig_shape: Tuple[int, int],
+    names: Dict[int, str],
+    threshold: float,
+    class_ids: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convert raw boxes (rows of x1, y1, x2, y2, [track_id,] conf, cls in pixels)
+    into detection dicts with normalized bboxes, using array ops for the filtering.
+    """
+    if len(data) == 0:
+        return []
+    
+    # float64 so rounded values survive tolist() exactly
+    data = np.asarray(data, dtype=np.float64)
+    conf = data[:, -2]
+    cls = data[:, -1].astype(np.int64)
+    keep = conf >= threshold
+    if class_ids is not None:
+        keep &= np.isin(cls, class_ids)
+    
+    height, width = orig_shape
+    bboxes = np.round(data[keep, :4] / np.array([width, height, width, height], dtype=np.float64), 4)
+    confidences = np.round(conf[keep], 3)
+    
+    return [
+        {"label": names[c], "confidence": p, "bbox": b}
+        for b, p, c in zip(bboxes.tolist(), confidences.tolist(), cls[keep].tolist())
+    ]
+
+
+def map_from_region(
+    detections: List[Dict[str, Any]],
+    region: Optional[Region]
+) -> List[Dict[str, Any]]:
+    """Re-express bboxes normalized to a crop as normalized to the full frame"""
+    if region is None or not detections:
+        return detections
+    x0, y0, x1, y1 = region
+    scale = np.array([x1 - x0, y1 - y0, x1 - x0, y1 - y0])
+    offset = np.array([x0, y0, x0, y0])
+    bboxes = np.round(np.array([d["bbox"] for d in detections]) * scale + offset, 4)
+    return [{**d, "bbox": b} for d, b in zip(detections, bboxes.tolist())]
 
 
 # Plant disease detection model (custom trained)
@@ -92,18 +232,152 @@ class PlantDiseaseDetector(YOLOInference):
         "healthy"
     ]
     
-    def __init__(self, model_path: str = "plant_disease.pt"):
+    def __init__(
+        self,
+        model_path: str = "plant_disease.pt",
+        backend: str = "torch",
+        int8: bool = False,
+        imgsz: int = 640
+    ):
         # Fall back to base YOLO if custom model not found
         if not Path(model_path).exists():
             model_path = "yolov8n.pt"
-        super().__init__(model_path)
+        super().__init__(model_path, backend=backend, int8=int8, imgsz=imgsz)
+
+
+class UnknownModelError(Exception):
+    """Raised when a requested model name has no weights configured"""
+    pass
+
+
+# Weights swapped in at runtime (name -> path); set in the service and each worker
+_model_overrides: Dict[str, str] = {}
+
+
+def set_model_overrides(overrides: Dict[str, str]):
+    global _model_overrides
+    _model_overrides = dict(overrides)
+
+
+def resolve_model_path(name: str) -> str:
+    """
+    Weights path for a model name.
+    Runtime overrides and configured names win; otherwise
+    <models_dir>/<name>.pt must exist.
+    """
+    if name in _model_overrides:
+        return _model_overrides[name]
+    settings = get_settings()
+    if name in settings.yolo_model_paths:
+        return settings.yolo_model_paths[name]
+    path = Path(settings.yolo_models_dir) / f"{name}.pt"
+    if path.exists():
+        return str(path)
+    raise UnknownModelError(f"Unknown model '{name}'")
+
+
+def model_tag(name: str) -> str:
+    """
+    Cache identity of a model: its name, plus the weights file when swapped,
+    so results from replaced weights are never reused.
+    """
+    if name in _model_overrides:
+        return f"{name}@{Path(_model_overrides[name]).name}"
+    return name
+
+
+class ModelRegistry:
+    """
+    Named detectors loaded on demand and shared by all requests in the process.
+    Least recently used models are evicted once the estimated resident size
+    exceeds the memory budget; the most recently used model is always kept.
+    """
+    
+    def __init__(
+        self,
+        default_model: str,
+        memory_budget_mb: int,
+        backend: str = "torch",
+        int8: bool = False,
+        imgsz: int = 640
+    ):
+        self._default_model = default_model
+        self._budget_bytes = memory_budget_mb * 1024 * 1024
+        self._backend = backend
+        self._int8 = int8
+        self._imgsz = imgsz
+        self._models: "OrderedDict[str, YOLOInference]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._events: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def default_model(self) -> str:
+        return self._default_model
+    
+    def get(self, name: str = None) -> YOLOInference:
+        name = name or self._default_model
+        with self._lock:
+            detector = self._models.get(name)
+            if detector is not None:
+                self._models.move_to_end(name)
+                return detector
+            
+            path = resolve_model_path(name)
+            if name == self._default_model:
+                detector = PlantDiseaseDetector(
+                    path, backend=self._backend, int8=self._int8, imgsz=self._imgsz
+                )
+            else:
+                detector = YOLOInference(
+                    path, backend=self._backend, int8=self._int8, imgsz=self._imgsz
+                )
+            
+            self._models[name] = detector
+            self._sizes[name] = detector.memory_bytes()
+            self._events.append(("load", name))
+            self._evict()
+            return detector
+    
+    def _evict(self):
+        while len(self._models) > 1 and self.resident_bytes() > self._budget_bytes:
+            name, _ = self._models.popitem(last=False)
+            self._sizes.pop(name, None)
+            self._events.append(("evict", name))
+    
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+    
+    def drain_events(self) -> List[Tuple[str, str]]:
+        """Load/evict events since the last call, for metric export"""
+        with self._lock:
+            events, self._events = self._events, []
+            return events
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": list(self._models.keys()),
+                "resident_bytes": self.resident_bytes()
+            }
+
+
+_registry: ModelRegistry = None
 
 
-_detector: YOLOInference = None
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        settings = get_settings()
+        _registry = ModelRegistry(
+            default_model=settings.yolo_default_model,
+            memory_budget_mb=settings.yolo_model_memory_budget_mb,
+            backend=settings.yolo_backend,
+            int8=settings.yolo_int8,
+            imgsz=settings.yolo_input_size
+        )
+    return _registry
 
 
-def get_detector() -> YOLOInference:
-    global _detector
-    if _detector is None:
-        _detector = PlantDiseaseDetector()
-    return _detector
+def get_detector(model: str = None) -> YOLOInference:
+    return get_registry().get(model)
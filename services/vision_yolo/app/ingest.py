@@ -0,0 +1,110 @@
+"""
+AFASA 2.0 - Image Ingestion
+Decodes snapshots straight to near model-input size
+"""
+import io
+import math
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover - opencv is installed in the image
+    cv2 = None
+
+
+@dataclass
+class DecodedImage:
+    array: np.ndarray               # HxWx3 uint8, BGR, C-contiguous
+    original_size: Tuple[int, int]  # (width, height) of the source frame
+    reduction: int                  # 1, 2, 4 or 8
+
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """Largest JPEG scale denominator that keeps the longest side >= target_size"""
+    longest = max(width, height)
+    factor = 1
+    while factor < 8 and longest // (factor * 2) >= target_size:
+        factor *= 2
+    return factor
+
+
+def _cv2_flag(factor: int) -> int:
+    # Keep the stored orientation: original_size comes from the header, and
+    # PIL doesn't apply EXIF rotation either
+    return {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+
+
+def decode_for_inference(image_data: bytes, target_size: int = 640) -> DecodedImage:
+    """
+    Decode an image for the detector.
+    JPEGs are downscaled in the DCT domain (libjpeg scale 1/2, 1/4, 1/8) so a
+    4K frame is never fully materialized. Normalized bboxes are unaffected
+    since the aspect ratio is preserved; original_size keeps pixel geometry.
+    """
+    header = Image.open(io.BytesIO(image_data))  # parses the header only
+    width, height = header.size
+    factor = reduction_factor(width, height, target_size)
+    
+    if header.format == "JPEG":
+        if cv2 is not None:
+            # imdecode returns a fresh BGR array, exactly what the model takes
+            array = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), _cv2_flag(factor))
+            if array is not None:
+                return DecodedImage(array, (width, height), factor)
+        header.draft("RGB", (math.ceil(width / factor), math.ceil(height / factor)))
+    
+    rgb = np.asarray(header.convert("RGB"))
+    # Arrays are taken as BGR by ultralytics; flip channels in the one copy we make
+    return DecodedImage(np.ascontiguousarray(rgb[:, :, ::-1]), (width, height), factor)
+
+
+def decode_preview(image_data: bytes) -> DecodedImage:
+    """
+    1/8-scale color preview for the cheap pre-inference checks.
+    JPEGs are scaled 1/8 inside libjpeg, which skips most of the IDCT and
+    color conversion work, but the header is still parsed and the whole
+    file entropy-decoded, so cost still grows with camera resolution.
+    """
+    header = Image.open(io.BytesIO(image_data))
+    width, height = header.size
+    
+    if header.format == "JPEG" and cv2 is not None:
+        array = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), _cv2_flag(8))
+        if array is not None:
+            return DecodedImage(array, (width, height), 8)
+    
+    header.draft("RGB", (math.ceil(width / 8), math.ceil(height / 8)))
+    rgb = header.convert("RGB")
+    if rgb.size[0] > math.ceil(width / 8):
+        rgb = rgb.resize((math.ceil(width / 8), math.ceil(height / 8)), Image.BILINEAR)
+    return DecodedImage(np.ascontiguousarray(np.asarray(rgb)[:, :, ::-1]), (width, height), 8)
+
+
+def to_gray(bgr: np.ndarray) -> np.ndarray:
+    """BGR uint8 -> luma as float32 (ITU-R BT.601 weights)"""
+    return bgr @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def thumbnail(gray: np.ndarray, size: int) -> np.ndarray:
+    """Area-resample a grayscale image to size x size float32"""
+    if cv2 is not None:
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    img = Image.fromarray(gray.astype(np.float32), mode="F")
+    return np.asarray(img.resize((size, size), Image.BOX), dtype=np.float32)
+
+
+def crop_region(array: np.ndarray, region: Tuple[float, float, float, float]) -> np.ndarray:
+    """Crop to a normalized (x0, y0, x1, y1) region"""
+    height, width = array.shape[:2]
+    x0, y0, x1, y1 = region
+    left, right = int(x0 * width), max(int(x0 * width) + 1, math.ceil(x1 * width))
+    top, bottom = int(y0 * height), max(int(y0 * height) + 1, math.ceil(y1 * height))
+    return np.ascontiguousarray(array[top:bottom, left:right])
@@ -0,0 +1,106 @@
+"""
+AFASA 2.0 - Model Lifecycle Manager
+Preloads and warms models at startup and hot-swaps weights without downtime
+"""
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+import sys
+sys.path.insert(0, '/app/services')
+
+from app.executor import create_executor, get_executor, replace_executor, InferenceExecutor
+from app.infer import set_model_overrides
+from app.metrics import MODEL_LOAD_SECONDS, MODEL_WARMUP_SECONDS, MODEL_READY, MODEL_SWAPS
+
+
+class ModelLifecycle:
+    """
+    Tracks whether the worker pool is loaded and warm.
+    A swap builds and warms a complete new pool with the new weights, switches
+    new submissions to it in one step, then drains the old pool so in-flight
+    requests finish on the weights they started with.
+    """
+    
+    def __init__(self):
+        self._ready = False
+        self._error: Optional[str] = None
+        self._overrides: Dict[str, str] = {}
+        self._swap_task: Optional[asyncio.Task] = None
+        self._swap_status: Dict[str, Any] = {"state": "idle"}
+    
+    @property
+    def ready(self) -> bool:
+        return self._ready
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self._ready,
+            "error": self._error,
+            "overrides": dict(self._overrides),
+            "swap": dict(self._swap_status)
+        }
+    
+    async def _start_pool(self, executor: InferenceExecutor):
+        for _, load_s, warmup_s in await executor.start():
+            MODEL_LOAD_SECONDS.observe(load_s)
+            MODEL_WARMUP_SECONDS.observe(warmup_s)
+    
+    async def startup(self):
+        """Load and warm the default model in every worker"""
+        MODEL_READY.set(0)
+        started = time.monotonic()
+        try:
+            await self._start_pool(get_executor())
+        except Exception as e:
+            self._error = str(e)
+            print(f"Model startup failed: {e}")
+            raise
+        self._ready = True
+        MODEL_READY.set(1)
+        print(f"Models loaded and warm in {time.monotonic() - started:.1f}s")
+    
+    def request_swap(self, name: str, weights_path: str) -> Dict[str, Any]:
+        """Start a background swap of `name` (existing or new) to new weights"""
+        if self._swap_task is not None and not self._swap_task.done():
+            raise RuntimeError("A model swap is already in progress")
+        if not Path(weights_path).exists():
+            raise FileNotFoundError(f"Weights not found: {weights_path}")
+        self._swap_status = {"state": "loading", "model": name, "weights_path": weights_path}
+        self._swap_task = asyncio.create_task(self._swap(name, weights_path))
+        return dict(self._swap_status)
+    
+    async def _swap(self, name: str, weights_path: str):
+        overrides = {**self._overrides, name: weights_path}
+        # Load and warm the swapped weights before they take traffic
+        executor = create_executor(model_overrides=overrides, preload_models=[name])
+        try:
+            await self._start_pool(executor)
+        except Exception as e:
+            executor.shutdown()
+            MODEL_SWAPS.labels(result="failed").inc()
+            self._swap_status = {**self._swap_status, "state": "failed", "error": str(e)}
+            print(f"Model swap to {weights_path} failed: {e}")
+            return
+        
+        # Switch names and pool together so cache tags match the serving weights
+        self._overrides = overrides
+        set_model_overrides(overrides)
+        previous = replace_executor(executor)
+        MODEL_SWAPS.labels(result="succeeded").inc()
+        self._swap_status = {**self._swap_status, "state": "draining"}
+        
+        if previous is not None:
+            await previous.drain()
+        self._swap_status = {**self._swap_status, "state": "done"}
+        print(f"Model {name} now serving {weights_path}")
+
+
+_lifecycle: Optional[ModelLifecycle] = None
+
+
+def get_lifecycle() -> ModelLifecycle:
+    global _lifecycle
+    if _lifecycle is None:
+        _lifecycle = ModelLifecycle()
+    return _lifecycle
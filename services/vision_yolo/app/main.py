@@ -2,10 +2,11 @@
 AFASA 2.0 - Vision YOLO Service
 Object detection and plant disease inference
 """
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, JSONResponse
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 import sys
 sys.path.insert(0, '/app/services')
@@ -14,16 +15,32 @@ from common import get_event_bus, Subjects
 
 from app.routes import router
 from app.subscriber import start_snapshot_subscriber
+from app.executor import shutdown_executor
+from app.lifecycle import get_lifecycle
+from app.persist import get_detection_writer
+
+
+async def warm_up_and_subscribe():
+    """Load and warm models, then start taking snapshot events"""
+    try:
+        await get_lifecycle().startup()
+        await start_snapshot_subscriber()
+    except Exception as e:
+        print(f"Vision YOLO startup failed: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup (in the background so /healthz answers while models load)
     event_bus = await get_event_bus()
-    await start_snapshot_subscriber()
+    get_detection_writer().start()
+    startup_task = asyncio.create_task(warm_up_and_subscribe())
     yield
     # Shutdown
+    startup_task.cancel()
     await event_bus.disconnect()
+    await get_detection_writer().stop()
+    shutdown_executor()
 
 
 app = FastAPI(
@@ -50,6 +67,11 @@ async def healthz():
 
 @app.get("/readyz")
 async def readyz():
+    if not get_lifecycle().ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading_models", "service": "afasa-vision-yolo"}
+        )
     return {"status": "ready", "service": "afasa-vision-yolo"}
 
 
@@ -0,0 +1,202 @@
+"""
+AFASA 2.0 - Vision YOLO Metrics
+Prometheus metrics for the inference pipeline
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+BATCH_SIZE = Histogram(
+    "afasa_yolo_batch_size",
+    "Images per batched YOLO model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+BATCH_LATENCY = Histogram(
+    "afasa_yolo_batch_latency_seconds",
+    "Wall time of one batched YOLO model call"
+)
+
+BATCH_WAIT = Histogram(
+    "afasa_yolo_batch_wait_seconds",
+    "Time a snapshot waits in the batcher before its model call starts",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+IMAGES_INFERRED = Counter(
+    "afasa_yolo_images_inferred_total",
+    "Images passed through the YOLO model",
+    ["source"]
+)
+
+EXECUTOR_WORKERS = Gauge(
+    "afasa_yolo_executor_workers",
+    "Inference worker processes in the pool"
+)
+
+EXECUTOR_CAPACITY = Gauge(
+    "afasa_yolo_executor_capacity",
+    "Maximum concurrent pool submissions (one per worker)"
+)
+
+EXECUTOR_IN_FLIGHT = Gauge(
+    "afasa_yolo_executor_in_flight",
+    "Submissions currently running or queued on the pool"
+)
+
+EXECUTOR_REJECTED = Counter(
+    "afasa_yolo_executor_rejected_total",
+    "Submissions rejected because the queue was full"
+)
+
+WORKER_LATENCY = Histogram(
+    "afasa_yolo_worker_latency_seconds",
+    "Inference time inside a worker process",
+    ["worker"]
+)
+
+ANNOTATION_REQUESTS = Counter(
+    "afasa_yolo_annotation_requests_total",
+    "Annotated image lookups by outcome",
+    ["result"]
+)
+
+ANNOTATION_RENDER_LATENCY = Histogram(
+    "afasa_yolo_annotation_render_seconds",
+    "Time to draw and encode an annotated image"
+)
+
+MODEL_LOADS = Counter(
+    "afasa_yolo_model_loads_total",
+    "Models loaded into a worker's registry",
+    ["model"]
+)
+
+MODEL_EVICTIONS = Counter(
+    "afasa_yolo_model_evictions_total",
+    "Models evicted from a worker's registry to stay within the memory budget",
+    ["model"]
+)
+
+MODEL_RESIDENT_BYTES = Gauge(
+    "afasa_yolo_model_resident_bytes",
+    "Estimated memory held by loaded models",
+    ["worker"]
+)
+
+MODELS_LOADED = Gauge(
+    "afasa_yolo_models_loaded",
+    "Models currently loaded",
+    ["worker"]
+)
+
+DEDUP_FRAMES = Counter(
+    "afasa_yolo_dedup_frames_total",
+    "Snapshots by near-duplicate outcome (skipped, inferred, forced)",
+    ["result"]
+)
+
+RESULT_CACHE_REQUESTS = Counter(
+    "afasa_yolo_result_cache_requests_total",
+    "Inference result cache lookups by outcome",
+    ["result"]
+)
+
+MODEL_LOAD_SECONDS = Histogram(
+    "afasa_yolo_model_load_seconds",
+    "Time for a worker to load its model",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+MODEL_WARMUP_SECONDS = Histogram(
+    "afasa_yolo_model_warmup_seconds",
+    "Time for a worker to run its warm-up inferences",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+MODEL_READY = Gauge(
+    "afasa_yolo_model_ready",
+    "1 once all workers have loaded and warmed their model"
+)
+
+MODEL_SWAPS = Counter(
+    "afasa_yolo_model_swaps_total",
+    "Hot swaps of model weights by outcome",
+    ["result"]
+)
+
+MOTION_FRAMES = Counter(
+    "afasa_yolo_motion_frames_total",
+    "Snapshots by change-gate outcome (unchanged, partial, full)",
+    ["result"]
+)
+
+MOTION_PIXELS = Counter(
+    "afasa_yolo_motion_pixels_total",
+    "Source pixels sent to the detector vs skipped by change gating",
+    ["kind"]
+)
+
+QUALITY_FRAMES = Counter(
+    "afasa_yolo_quality_frames_total",
+    "Snapshots by quality gate outcome (ok, flagged, skipped)",
+    ["result"]
+)
+
+QUALITY_ISSUES = Counter(
+    "afasa_yolo_quality_issues_total",
+    "Quality problems found (dark, overexposed, blurry, obstructed)",
+    ["issue"]
+)
+
+QUALITY_CHECK_SECONDS = Histogram(
+    "afasa_yolo_quality_check_seconds",
+    "Time to score a frame preview",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+
+ROI_AREA_RATIO = Histogram(
+    "afasa_yolo_roi_area_ratio",
+    "Share of the frame inside the camera's ROI polygon, per inference",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+
+TRACK_UPDATES = Counter(
+    "afasa_yolo_track_updates_total",
+    "Tracked detections by status (new, persisting, resolved)",
+    ["status"]
+)
+
+EVENTS_SUPPRESSED = Counter(
+    "afasa_yolo_events_suppressed_total",
+    "Detection events not published because nothing changed (delta mode)"
+)
+
+QUEUE_WAIT = Histogram(
+    "afasa_yolo_queue_wait_seconds",
+    "Time a batch waits for an executor slot, by priority class and tenant",
+    ["priority", "tenant"],
+    buckets=(0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+
+QUEUE_DEPTH = Gauge(
+    "afasa_yolo_queue_depth",
+    "Batches waiting for an executor slot, by priority class",
+    ["priority"]
+)
+
+SLO_MISSES = Counter(
+    "afasa_yolo_queue_slo_misses_total",
+    "Batches that started after their priority class's latency SLO",
+    ["priority"]
+)
+
+DETECTIONS_PERSISTED = Counter(
+    "afasa_yolo_detections_persisted_total",
+    "Detection rows written by the subscriber's write-behind buffer",
+    ["result"]
+)
+
+DETECTION_FLUSH_LATENCY = Histogram(
+    "afasa_yolo_detection_flush_seconds",
+    "Time to bulk-insert one tenant's buffered detections",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
@@ -0,0 +1,160 @@
+"""
+AFASA 2.0 - Change-Gated Inference
+Per-camera frame differencing so the detector only sees what changed
+"""
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.ingest import thumbnail
+from app.redis_client import get_redis
+
+REFERENCE_SIZE = 64  # nominal; rounded to a whole number of tiles per side
+
+Region = Tuple[float, float, float, float]
+
+
+@dataclass
+class ChangeDecision:
+    kind: str                       # unchanged | partial | full
+    changed_fraction: float         # share of tiles above threshold
+    region: Optional[Region] = None  # normalized area to re-run for "partial"
+    
+    @property
+    def region_fraction(self) -> float:
+        if self.kind == "unchanged":
+            return 0.0
+        if self.region is None:
+            return 1.0
+        x0, y0, x1, y1 = self.region
+        return (x1 - x0) * (y1 - y0)
+
+
+def motion_key(tenant_id: str, camera_id: str) -> str:
+    return f"yolo:motion:{tenant_id}:{camera_id}"
+
+
+def merge_detections(
+    previous: List[Dict[str, Any]],
+    fresh: List[Dict[str, Any]],
+    region: Region
+) -> List[Dict[str, Any]]:
+    """Previous detections centred outside the re-run region, plus the fresh ones"""
+    x0, y0, x1, y1 = region
+    kept = []
+    for det in previous:
+        bx0, by0, bx1, by1 = det["bbox"]
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        if not (x0 <= cx <= x1 and y0 <= cy <= y1):
+            kept.append(det)
+    return kept + fresh
+
+
+class ChangeGate:
+    """
+    Keeps a small grayscale reference frame per camera in Redis and compares
+    new frames tile by tile. Global brightness shifts are removed first so
+    passing clouds don't count as change.
+    """
+    
+    def __init__(
+        self,
+        grid: int = 8,
+        tile_threshold: float = 12.0,
+        max_partial_fraction: float = 0.5,
+        ttl_sec: int = 21600
+    ):
+        self._grid = min(max(1, grid), REFERENCE_SIZE)
+        self._tile = max(1, round(REFERENCE_SIZE / self._grid))
+        self.size = self._grid * self._tile
+        self._tile_threshold = tile_threshold
+        self._max_partial_fraction = max_partial_fraction
+        self._ttl_sec = ttl_sec
+    
+    def reference(self, gray: np.ndarray) -> np.ndarray:
+        return thumbnail(gray, self.size)
+    
+    def evaluate(self, current: np.ndarray, reference: np.ndarray) -> ChangeDecision:
+        """Compare two reference-size frames"""
+        diff = np.abs((current - current.mean()) - (reference - reference.mean()))
+        scores = diff.reshape(self._grid, self._tile, self._grid, self._tile).mean(axis=(1, 3))
+        changed = scores > self._tile_threshold
+        fraction = float(changed.mean())
+        
+        if not changed.any():
+            return ChangeDecision("unchanged", 0.0)
+        
+        # Bounding box of changed tiles, grown by one tile for objects on the edge
+        rows, cols = np.nonzero(changed)
+        r0, r1 = max(rows.min() - 1, 0), min(rows.max() + 2, self._grid)
+        c0, c1 = max(cols.min() - 1, 0), min(cols.max() + 2, self._grid)
+        region = (c0 / self._grid, r0 / self._grid, c1 / self._grid, r1 / self._grid)
+        
+        decision = ChangeDecision("partial", fraction, region)
+        if decision.region_fraction > self._max_partial_fraction:
+            return ChangeDecision("full", fraction)
+        return decision
+    
+    async def lookup(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        model_tag: str,
+        threshold: float
+    ) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """(reference frame, last result) if it was produced by the same model/threshold"""
+        r = await get_redis()
+        state = await r.hgetall(motion_key(tenant_id, camera_id))
+        if not state:
+            return None
+        meta = json.loads(state[b"meta"])
+        if meta["model"] != model_tag or meta["threshold"] != threshold:
+            return None
+        if len(state[b"ref"]) != self.size * self.size:
+            return None  # stored under a different grid
+        ref = np.frombuffer(state[b"ref"], dtype=np.uint8).reshape(self.size, self.size)
+        return ref.astype(np.float32), meta["result"]
+    
+    async def remember(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        reference: np.ndarray,
+        model_tag: str,
+        threshold: float,
+        result: Dict[str, Any]
+    ):
+        r = await get_redis()
+        key = motion_key(tenant_id, camera_id)
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "ref": np.clip(reference, 0, 255).astype(np.uint8).tobytes(),
+                "meta": json.dumps({"model": model_tag, "threshold": threshold, "result": result})
+            })
+            pipe.expire(key, self._ttl_sec)
+            await pipe.execute()
+
+
+def motion_enabled(tenant_id: str) -> bool:
+    settings = get_settings()
+    return settings.yolo_motion_enabled and tenant_id not in settings.yolo_force_inference_tenants
+
+
+_change_gate: Optional[ChangeGate] = None
+
+
+def get_change_gate() -> ChangeGate:
+    global _change_gate
+    if _change_gate is None:
+        settings = get_settings()
+        _change_gate = ChangeGate(
+            grid=settings.yolo_motion_grid,
+            tile_threshold=settings.yolo_motion_tile_threshold,
+            max_partial_fraction=settings.yolo_motion_max_partial_fraction,
+            ttl_sec=settings.yolo_motion_ttl_sec
+        )
+    return _change_gate
@@ -0,0 +1,165 @@
+"""
+AFASA 2.0 - Detection Persistence
+Bulk inserts for Detection rows, plus a write-behind buffer for the subscriber
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings, get_tenant_session, Detection
+from app.metrics import DETECTIONS_PERSISTED, DETECTION_FLUSH_LATENCY
+
+# Rows per INSERT statement; 10 bind parameters each keeps well under asyncpg's 32767
+INSERT_CHUNK_ROWS = 1000
+
+
+def detection_rows(
+    tenant_id: str,
+    snapshot_id: str,
+    camera_id: str,
+    model: str,
+    detections: List[Dict[str, Any]],
+    annotated_s3_key: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Column dicts for a snapshot's detections (IDs assigned up front)"""
+    created_at = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "tenant_id": UUID(tenant_id),
+            "snapshot_id": UUID(snapshot_id),
+            "camera_id": UUID(camera_id),
+            "label": det["label"],
+            "confidence": det["confidence"],
+            "bbox": det["bbox"],
+            "model": model,
+            "annotated_s3_key": annotated_s3_key,
+            "created_at": created_at
+        }
+        for det in detections
+    ]
+
+
+async def insert_detections(session: AsyncSession, rows: List[Dict[str, Any]]) -> List[UUID]:
+    """
+    Multi-row INSERT ... RETURNING id, one statement per INSERT_CHUNK_ROWS rows.
+    (COPY isn't an option: Postgres refuses COPY FROM into tables with RLS.)
+    """
+    ids: List[UUID] = []
+    for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+        chunk = rows[start:start + INSERT_CHUNK_ROWS]
+        result = await session.execute(
+            insert(Detection).values(chunk).returning(Detection.id)
+        )
+        ids.extend(result.scalars().all())
+    return ids
+
+
+class DetectionWriter:
+    """
+    Write-behind buffer for subscriber detections.
+    Rows are grouped per tenant (each flush needs that tenant's RLS session)
+    and written when max_rows are buffered or every flush_interval_ms.
+    Rows that fail to insert go back in the buffer for the next flush, up to
+    max_retries flushes in a row and max_retained rows per tenant.
+    """
+    
+    def __init__(
+        self,
+        max_rows: int = 500,
+        flush_interval_ms: int = 1000,
+        max_retries: int = 5,
+        max_retained: int = 20000
+    ):
+        self._max_rows = max(1, max_rows)
+        self._interval = flush_interval_ms / 1000
+        self._max_retries = max(0, max_retries)
+        self._max_retained = max(1, max_retained)
+        self._buffer: Dict[str, List[Dict[str, Any]]] = {}
+        self._buffered = 0
+        self._failures: Dict[str, int] = {}  # consecutive failed flushes per tenant
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the timer and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+    
+    def add(self, tenant_id: str, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        self._buffer.setdefault(tenant_id, []).extend(rows)
+        self._buffered += len(rows)
+        if self._buffered >= self._max_rows:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+    
+    async def flush(self):
+        async with self._lock:
+            pending, self._buffer, self._buffered = self._buffer, {}, 0
+            for tenant_id, rows in pending.items():
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                try:
+                    async with get_tenant_session(tenant_id) as session:
+                        await insert_detections(session, rows)
+                    DETECTIONS_PERSISTED.labels(result="ok").inc(len(rows))
+                    self._failures.pop(tenant_id, None)
+                except Exception as e:
+                    DETECTIONS_PERSISTED.labels(result="error").inc(len(rows))
+                    print(f"Failed to persist {len(rows)} detections for tenant {tenant_id}: {e}")
+                    self._retain(tenant_id, rows)
+                DETECTION_FLUSH_LATENCY.observe(loop.time() - started)
+    
+    def _retain(self, tenant_id: str, rows: List[Dict[str, Any]]):
+        """Put failed rows back ahead of anything added since, within the caps"""
+        failures = self._failures.get(tenant_id, 0) + 1
+        if failures > self._max_retries:
+            self._failures.pop(tenant_id, None)
+            DETECTIONS_PERSISTED.labels(result="dropped").inc(len(rows))
+            print(f"Dropping {len(rows)} detections for tenant {tenant_id} after {failures} failed flushes")
+            return
+        self._failures[tenant_id] = failures
+        retained = rows + self._buffer.get(tenant_id, [])
+        if len(retained) > self._max_retained:
+            dropped = len(retained) - self._max_retained
+            DETECTIONS_PERSISTED.labels(result="dropped").inc(dropped)
+            print(f"Dropping {dropped} oldest detections for tenant {tenant_id}: retry buffer full")
+            retained = retained[dropped:]
+        self._buffer[tenant_id] = retained
+
+
+_detection_writer: Optional[DetectionWriter] = None
+
+
+def get_detection_writer() -> DetectionWriter:
+    global _detection_writer
+    if _detection_writer is None:
+        settings = get_settings()
+        _detection_writer = DetectionWriter(
+            max_rows=settings.yolo_persist_max_rows,
+            flush_interval_ms=settings.yolo_persist_flush_interval_ms,
+            max_retries=settings.yolo_persist_max_retries,
+            max_retained=settings.yolo_persist_max_retained_rows
+        )
+    return _detection_writer
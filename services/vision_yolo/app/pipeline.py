@@ -0,0 +1,195 @@
+"""
+AFASA 2.0 - Snapshot Inference Pipeline
+Cheap gates first (cache, quality, near-duplicate, change), model last
+"""
+import asyncio
+import time
+from typing import Dict, Any, Optional
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.batcher import get_batcher
+from app.dedup import get_deduplicator, dedup_enabled, perceptual_hash
+from app.ingest import decode_preview, to_gray, crop_region
+from app.motion import ChangeDecision, get_change_gate, motion_enabled, merge_detections
+from app.roi import Polygon, Region, polygon_bbox, polygon_area, intersect, roi_tag
+from app.quality import get_quality_gate, quality_enabled, record_quality
+from app.result_cache import get_result_cache
+from app.infer import model_tag
+from app.metrics import (
+    DEDUP_FRAMES, MOTION_FRAMES, MOTION_PIXELS,
+    QUALITY_FRAMES, QUALITY_ISSUES, QUALITY_CHECK_SECONDS, ROI_AREA_RATIO
+)
+
+
+def _preview_gray(image_data: bytes):
+    preview = decode_preview(image_data)
+    return preview, to_gray(preview.array)
+
+
+async def process_snapshot(
+    tenant_id: str,
+    camera_id: str,
+    snapshot_id: str,
+    s3_key: str,
+    image_data: bytes,
+    model: str,
+    threshold: float = 0.5,
+    roi: Optional[Polygon] = None,
+    priority: str = "event"
+) -> Dict[str, Any]:
+    """
+    Produce the full detection result for a camera snapshot, limited to the
+    camera's ROI polygon when it has one. priority is the scheduler class
+    for any model call it needs.
+    Returns the result dict plus "quality", "duplicate_of", "motion" and "roi"
+    describing how much of the frame actually went through the model.
+    """
+    # Cache identity changes when the model's weights are hot-swapped or the ROI is edited
+    tag = model_tag(model) + roi_tag(roi)
+    result_cache = get_result_cache()
+    roi_region = polygon_bbox(roi) if roi else None
+    info: Dict[str, Any] = {
+        "quality": None,
+        "duplicate_of": None,
+        "motion": None,
+        "roi": {"area_ratio": round(polygon_area(roi), 4)} if roi else None
+    }
+    
+    cached = await result_cache.get(s3_key, tag, threshold)
+    if cached is not None:
+        return {**cached, **info}
+    
+    use_quality = quality_enabled(tenant_id)
+    use_dedup = dedup_enabled(tenant_id)
+    use_motion = motion_enabled(tenant_id)
+    if not (use_quality or use_dedup or use_motion):
+        DEDUP_FRAMES.labels(result="forced").inc()
+        result = await result_cache.get_or_compute(
+            s3_key, tag, threshold,
+            lambda: _infer(image_data, model, threshold, roi_region, roi, tenant_id, priority)
+        )
+        return {**result, **info}
+    
+    preview, gray = await asyncio.to_thread(_preview_gray, image_data)
+    width, height = preview.original_size
+    
+    # Night, blurred or covered frames are not worth a model pass
+    if use_quality:
+        started = time.perf_counter()
+        view = crop_region(preview.array, roi_region) if roi_region else preview.array
+        report = get_quality_gate().assess(view)
+        QUALITY_CHECK_SECONDS.observe(time.perf_counter() - started)
+        await record_quality(tenant_id, camera_id, report)
+        quality = info["quality"] = report.to_dict()
+        for issue in report.issues:
+            QUALITY_ISSUES.labels(issue=issue).inc()
+        
+        if report.usable:
+            quality["action"] = "ok"
+        elif get_settings().yolo_quality_action == "skip":
+            quality["action"] = "skipped"
+            QUALITY_FRAMES.labels(result="skipped").inc()
+            MOTION_PIXELS.labels(kind="skipped").inc(width * height)
+            return {"detections": [], "image_size": [width, height], **info}
+        else:
+            quality["action"] = "flagged"
+        QUALITY_FRAMES.labels(result=quality["action"]).inc()
+    
+    # Static cameras: reuse detections when the whole frame is a near-duplicate
+    deduplicator = get_deduplicator()
+    frame_hash = None
+    if use_dedup:
+        frame_hash = perceptual_hash(gray)
+        previous = await deduplicator.lookup(tenant_id, camera_id, frame_hash, tag, threshold)
+        if previous is not None:
+            DEDUP_FRAMES.labels(result="skipped").inc()
+            MOTION_PIXELS.labels(kind="skipped").inc(width * height)
+            result = {
+                "detections": previous["detections"],
+                "image_size": previous["image_size"]
+            }
+            info["duplicate_of"] = previous["snapshot_id"]
+            return {**result, **info}
+        DEDUP_FRAMES.labels(result="inferred").inc()
+    else:
+        DEDUP_FRAMES.labels(result="forced").inc()
+    
+    # Otherwise only re-run the tiles that changed since the last frame
+    gate = get_change_gate()
+    reference = gate.reference(gray)
+    decision = None
+    state = await gate.lookup(tenant_id, camera_id, tag, threshold) if use_motion else None
+    if state is not None:
+        previous_frame, previous_result = state
+        decision = gate.evaluate(reference, previous_frame)
+        # Changes outside the ROI (sky, walkways) don't need a model pass
+        if decision.kind == "partial" and roi_region:
+            region = intersect(decision.region, roi_region)
+            if region is None:
+                decision = ChangeDecision("unchanged", decision.changed_fraction)
+            else:
+                decision.region = region
+    
+    if decision is not None and decision.kind == "unchanged":
+        result = previous_result
+        processed = None
+    elif decision is not None and decision.kind == "partial":
+        processed = decision.region
+        fresh = await _infer(image_data, model, threshold, processed, roi, tenant_id, priority)
+        result = {
+            "detections": merge_detections(
+                previous_result["detections"], fresh["detections"], processed
+            ),
+            "image_size": fresh["image_size"]
+        }
+    else:
+        # Only exact full-frame results go in the shared cache, so the route
+        # never serves a reused or merged result; concurrent callers share the run
+        processed = roi_region
+        result = await result_cache.get_or_compute(
+            s3_key, tag, threshold,
+            lambda: _infer(image_data, model, threshold, processed, roi, tenant_id, priority)
+        )
+    
+    processed_fraction = 0.0 if decision is not None and decision.kind == "unchanged" else 1.0
+    if processed is not None:
+        processed_fraction = (processed[2] - processed[0]) * (processed[3] - processed[1])
+    MOTION_FRAMES.labels(result=decision.kind if decision is not None else "full").inc()
+    MOTION_PIXELS.labels(kind="processed").inc(int(width * height * processed_fraction))
+    MOTION_PIXELS.labels(kind="skipped").inc(int(width * height * (1 - processed_fraction)))
+    
+    if use_dedup:
+        await deduplicator.remember(
+            tenant_id, camera_id, snapshot_id, frame_hash, tag, threshold, result
+        )
+    # Unchanged frames keep the old reference so slow drift still adds up
+    if use_motion and (decision is None or decision.kind != "unchanged"):
+        await gate.remember(tenant_id, camera_id, reference, tag, threshold, result)
+    
+    if decision is not None:
+        info["motion"] = {
+            "result": decision.kind,
+            "changed_fraction": round(decision.changed_fraction, 3),
+            "region": list(decision.region) if decision.region else None
+        }
+    return {**result, **info}
+
+
+async def _infer(
+    image_data: bytes,
+    model: str,
+    threshold: float,
+    region: Optional[Region],
+    roi: Optional[Polygon],
+    tenant_id: str,
+    priority: str
+) -> Dict[str, Any]:
+    """Batched model call, recording how much of the frame the ROI keeps"""
+    if roi:
+        ROI_AREA_RATIO.observe(polygon_area(roi))
+    return await get_batcher().submit(
+        image_data, model, threshold=threshold, region=region, roi=roi,
+        tenant_id=tenant_id, priority=priority
+    )
@@ -0,0 +1,180 @@
+"""
+AFASA 2.0 - Frame Quality Gate
+Cheap exposure/focus/obstruction checks on the preview before running the model
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+import numpy as np
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.redis_client import get_redis
+
+# Long side the statistics are computed on; strided, not resampled, so edges stay sharp
+ANALYSIS_SIZE = 160
+
+
+def _above(value: float, minimum: float) -> float:
+    """Sub-score that is 0.5 at the minimum and saturates at 1 from twice the minimum"""
+    return min(1.0, 0.5 * value / minimum)
+
+
+def _below(fraction: float, maximum: float) -> float:
+    """Sub-score that is 0.5 at the maximum fraction and 0 at 1.0"""
+    return min(1.0, 0.5 * (1 - fraction) / (1 - maximum))
+
+
+@dataclass
+class QualityReport:
+    score: float                 # 0 (unusable) .. 1 (good), the worst sub-score
+    brightness: float            # mean luma 0-255
+    dark_fraction: float         # share of pixels below the dark level
+    bright_fraction: float       # share of clipped highlights
+    sharpness: float             # variance of the Laplacian
+    contrast: float              # luma standard deviation
+    saturation: float            # mean HSV saturation 0-1
+    issues: List[str] = field(default_factory=list)
+    
+    @property
+    def usable(self) -> bool:
+        return not self.issues
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "score": round(self.score, 3),
+            "brightness": round(self.brightness, 1),
+            "sharpness": round(self.sharpness, 1),
+            "contrast": round(self.contrast, 1),
+            "saturation": round(self.saturation, 3),
+            "issues": self.issues
+        }
+
+
+class QualityGate:
+    """
+    Flags night, over-exposed, blurry and obstructed (rain/dirt on the lens) frames.
+    Statistics come from a strided ANALYSIS_SIZE view of the 1/8 preview, so
+    min_sharpness is calibrated at that scale rather than camera resolution.
+    """
+    
+    def __init__(
+        self,
+        dark_level: int = 30,
+        max_dark_fraction: float = 0.85,
+        max_bright_fraction: float = 0.6,
+        min_sharpness: float = 50.0,
+        min_contrast: float = 12.0,
+        min_saturation: float = 0.04
+    ):
+        self._dark_level = dark_level
+        self._max_dark_fraction = max_dark_fraction
+        self._max_bright_fraction = max_bright_fraction
+        self._min_sharpness = min_sharpness
+        self._min_contrast = min_contrast
+        self._min_saturation = min_saturation
+    
+    def assess(self, bgr: np.ndarray) -> QualityReport:
+        """Score a BGR uint8 preview"""
+        step = max(1, math.ceil(max(bgr.shape[:2]) / ANALYSIS_SIZE))
+        bgr = bgr[::step, ::step]
+        # Integer BT.601 luma: (29 B + 150 G + 77 R) / 256
+        wide = bgr.astype(np.uint16)
+        luma = (29 * wide[:, :, 0] + 150 * wide[:, :, 1] + 77 * wide[:, :, 2]) >> 8
+        
+        # Exposure from the luma histogram
+        hist = np.bincount(luma.ravel(), minlength=256)
+        total = hist.sum()
+        dark_fraction = float(hist[:self._dark_level].sum() / total)
+        bright_fraction = float(hist[250:].sum() / total)
+        
+        gray = luma.astype(np.float32)
+        # 4-neighbour Laplacian on the interior
+        lap = (
+            4 * gray[1:-1, 1:-1]
+            - gray[:-2, 1:-1] - gray[2:, 1:-1]
+            - gray[1:-1, :-2] - gray[1:-1, 2:]
+        )
+        sharpness = float(lap.var())
+        contrast = float(gray.std())
+        
+        b, g, r = bgr[:, :, 0], bgr[:, :, 1], bgr[:, :, 2]
+        high = np.maximum(np.maximum(b, g), r)
+        low = np.minimum(np.minimum(b, g), r)
+        saturation = float(np.mean((high - low) / np.maximum(high, 1).astype(np.float32)))
+        
+        sub_scores = {
+            "dark": _below(dark_fraction, self._max_dark_fraction),
+            "overexposed": _below(bright_fraction, self._max_bright_fraction),
+            "blurry": _above(sharpness, self._min_sharpness),
+            "obstructed": _above(contrast, self._min_contrast)
+        }
+        issues = [issue for issue, value in sub_scores.items() if value < 0.5]
+        # Low contrast with colour still present is usually haze/fog, not a covered lens
+        if "obstructed" in issues and saturation >= self._min_saturation:
+            issues.remove("obstructed")
+            sub_scores["obstructed"] = 0.5
+        
+        return QualityReport(
+            score=float(max(0.0, min(sub_scores.values()))),
+            brightness=float(gray.mean()),
+            dark_fraction=dark_fraction,
+            bright_fraction=bright_fraction,
+            sharpness=sharpness,
+            contrast=contrast,
+            saturation=saturation,
+            issues=issues
+        )
+
+
+def quality_key(tenant_id: str) -> str:
+    return f"yolo:quality:{tenant_id}"
+
+
+async def record_quality(tenant_id: str, camera_id: str, report: QualityReport):
+    """Per-camera counters: cameras that keep failing are likely broken or dirty"""
+    r = await get_redis()
+    key = quality_key(tenant_id)
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hincrby(key, f"{camera_id}:checked", 1)
+        pipe.hset(key, f"{camera_id}:last_score", round(report.score, 3))
+        if not report.usable:
+            pipe.hincrby(key, f"{camera_id}:unusable", 1)
+            for issue in report.issues:
+                pipe.hincrby(key, f"{camera_id}:{issue}", 1)
+        await pipe.execute()
+
+
+async def camera_quality_stats(tenant_id: str) -> Dict[str, Dict[str, float]]:
+    """{camera_id: {"checked": n, "unusable": n, <issue>: n, "last_score": s}}"""
+    r = await get_redis()
+    raw = await r.hgetall(quality_key(tenant_id))
+    stats: Dict[str, Dict[str, float]] = {}
+    for name, value in raw.items():
+        camera_id, _, counter = name.decode().rpartition(":")
+        stats.setdefault(camera_id, {})[counter] = float(value)
+    return stats
+
+
+def quality_enabled(tenant_id: str) -> bool:
+    settings = get_settings()
+    return settings.yolo_quality_enabled and tenant_id not in settings.yolo_force_inference_tenants
+
+
+_quality_gate: Optional[QualityGate] = None
+
+
+def get_quality_gate() -> QualityGate:
+    global _quality_gate
+    if _quality_gate is None:
+        settings = get_settings()
+        _quality_gate = QualityGate(
+            dark_level=settings.yolo_quality_dark_level,
+            max_dark_fraction=settings.yolo_quality_max_dark_fraction,
+            max_bright_fraction=settings.yolo_quality_max_bright_fraction,
+            min_sharpness=settings.yolo_quality_min_sharpness,
+            min_contrast=settings.yolo_quality_min_contrast,
+            min_saturation=settings.yolo_quality_min_saturation
+        )
+    return _quality_gate
@@ -0,0 +1,17 @@
+"""
+AFASA 2.0 - Vision YOLO Redis Connection
+"""
+import redis.asyncio as redis
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+
+_redis: redis.Redis = None
+
+
+async def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(get_settings().redis_url)
+    return _redis
@@ -0,0 +1,138 @@
+"""
+AFASA 2.0 - Inference Result Cache
+Detections keyed by (s3_key, model, threshold), shared by the route and subscriber.
+Only full-frame model output is stored; results the pipeline reuses or merges
+from earlier frames (near-duplicates, partial re-runs) are not.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+import sys
+sys.path.insert(0, '/app/services')
+
+from common import get_settings
+from app.redis_client import get_redis
+from app.metrics import RESULT_CACHE_REQUESTS
+
+CacheKey = Tuple[str, str, float]
+
+
+class ResultCache:
+    """
+    In-process LRU in front of Redis.
+    Concurrent lookups for the same key share one computation (single-flight).
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_sec: int = 86400):
+        self._max_entries = max(1, max_entries)
+        self._ttl_sec = ttl_sec
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[CacheKey, asyncio.Future] = {}
+    
+    @staticmethod
+    def _redis_key(key: CacheKey) -> str:
+        s3_key, model, threshold = key
+        digest = hashlib.sha1(f"{s3_key}|{model}|{threshold:.4f}".encode()).hexdigest()
+        return f"yolo:result:{digest}"
+    
+    def _get_local(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+    
+    def _put_local(self, key: CacheKey, result: Dict[str, Any]):
+        self._entries[key] = (time.monotonic() + self._ttl_sec, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+    
+    async def get(self, s3_key: str, model: str, threshold: float) -> Optional[Dict[str, Any]]:
+        key = (s3_key, model, threshold)
+        result = self._get_local(key)
+        if result is not None:
+            RESULT_CACHE_REQUESTS.labels(result="memory_hit").inc()
+            return result
+        
+        r = await get_redis()
+        raw = await r.get(self._redis_key(key))
+        if raw is None:
+            return None
+        result = json.loads(raw)
+        self._put_local(key, result)
+        RESULT_CACHE_REQUESTS.labels(result="redis_hit").inc()
+        return result
+    
+    async def put(self, s3_key: str, model: str, threshold: float, result: Dict[str, Any]):
+        key = (s3_key, model, threshold)
+        self._put_local(key, result)
+        r = await get_redis()
+        await r.set(self._redis_key(key), json.dumps(result), ex=self._ttl_sec)
+    
+    async def get_or_compute(
+        self,
+        s3_key: str,
+        model: str,
+        threshold: float,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Cached result, or run compute() once for all concurrent callers.
+        compute() runs in its own task, so a caller that is cancelled (e.g. a
+        client disconnect) doesn't cancel it for the others.
+        """
+        key = (s3_key, model, threshold)
+        
+        result = self._get_local(key)
+        if result is not None:
+            RESULT_CACHE_REQUESTS.labels(result="memory_hit").inc()
+            return result
+        
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            RESULT_CACHE_REQUESTS.labels(result="shared").inc()
+            return await asyncio.shield(pending)
+        
+        task = asyncio.ensure_future(self._load(key, compute))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._settled(key, done))
+        return await asyncio.shield(task)
+    
+    async def _load(
+        self,
+        key: CacheKey,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        result = await self.get(*key)
+        if result is None:
+            RESULT_CACHE_REQUESTS.labels(result="miss").inc()
+            result = await compute()
+            await self.put(*key, result)
+        return result
+    
+    def _settled(self, key: CacheKey, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every caller had gone
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        settings = get_settings()
+        _result_cache = ResultCache(
+            max_entries=settings.yolo_result_cache_size,
+            ttl_sec=settings.yolo_result_cache_ttl_sec
+        )
+    return _result_cache
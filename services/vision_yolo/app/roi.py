@@ -0,0 +1,73 @@
+"""
+AFASA 2.0 - Camera Regions of Interest
+Polygon masks that keep sky, paths and neighbouring plots out of inference
+"""
+import hashlib
+import json
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageDraw
+
+Polygon = List[Tuple[float, float]]  # normalized (x, y) vertices
+Region = Tuple[float, float, float, float]
+
+# Letterbox grey used by YOLO, so masked pixels look like padding to the model
+MASK_FILL = 114
+
+
+def polygon_bbox(polygon: Polygon) -> Region:
+    points = np.asarray(polygon, dtype=np.float64)
+    x0, y0 = np.clip(points.min(axis=0), 0, 1)
+    x1, y1 = np.clip(points.max(axis=0), 0, 1)
+    return (float(x0), float(y0), float(x1), float(y1))
+
+
+def polygon_area(polygon: Polygon) -> float:
+    """Shoelace area as a fraction of the frame"""
+    points = np.clip(np.asarray(polygon, dtype=np.float64), 0, 1)
+    x, y = points[:, 0], points[:, 1]
+    return float(abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1))) / 2)
+
+
+def intersect(a: Region, b: Region) -> Optional[Region]:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1, y1)
+
+
+def roi_tag(polygon: Optional[Polygon]) -> str:
+    """Short stable identifier so cached results follow ROI edits"""
+    if not polygon:
+        return ""
+    encoded = json.dumps([[round(x, 4), round(y, 4)] for x, y in polygon])
+    return "#roi:" + hashlib.sha1(encoded.encode()).hexdigest()[:12]
+
+
+def polygon_mask(polygon: Polygon, region: Region, shape: Tuple[int, int]) -> np.ndarray:
+    """Boolean HxW mask of the polygon inside a crop covering region"""
+    height, width = shape
+    x0, y0, x1, y1 = region
+    sx, sy = width / (x1 - x0), height / (y1 - y0)
+    canvas = Image.new("1", (width, height), 0)
+    ImageDraw.Draw(canvas).polygon(
+        [((x - x0) * sx, (y - y0) * sy) for x, y in polygon], fill=1
+    )
+    return np.asarray(canvas, dtype=bool)
+
+
+def apply_mask(array: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Grey out pixels outside the mask (in place on a crop copy)"""
+    array[~mask] = MASK_FILL
+    return array
+
+
+def inside_mask(bboxes: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Which crop-normalized bboxes have their centre inside the mask"""
+    if len(bboxes) == 0:
+        return np.zeros(0, dtype=bool)
+    height, width = mask.shape
+    cx = np.clip(((bboxes[:, 0] + bboxes[:, 2]) / 2 * width).astype(int), 0, width - 1)
+    cy = np.clip(((bboxes[:, 1] + bboxes[:, 3]) / 2 * height).astype(int), 0, height - 1)
+    return mask[cy, cx]
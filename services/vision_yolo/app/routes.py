@@ -2,21 +2,32 @@
 AFASA 2.0 - Vision YOLO Routes
 """
 from datetime import datetime, timezone
+import time
 from typing import Optional, List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
 from pydantic import BaseModel
 from sqlalchemy import select
 import sys
 sys.path.insert(0, '/app/services')
 
 from common import (
-    verify_token, TokenPayload, get_tenant_session,
+    verify_token, require_role, TokenPayload, get_tenant_session,
     get_event_bus, Subjects, get_storage_client,
-    Detection, Snapshot
+    Detection, Snapshot, Camera, get_settings
 )
-from app.infer import get_detector
-from app.cooldown import check_cooldown, update_cooldown
+from app.persist import detection_rows, insert_detections
+from app.executor import get_executor, ExecutorBusyError
+from app.infer import resolve_model_path, model_tag, UnknownModelError
+from app.lifecycle import get_lifecycle
+from app.cooldown import check_cooldown, check_cooldowns
+from app.annotate import get_annotation_cache, is_significant
+from app.result_cache import get_result_cache
+from app.quality import camera_quality_stats
+from app.roi import polygon_area, roi_tag
+from app.metrics import ROI_AREA_RATIO
+from app.heatmap import get_heatmap_store, render_png, GRID
 
 router = APIRouter(tags=["vision-yolo"])
 
@@ -25,7 +36,7 @@ class InferRequest(BaseModel):
     snapshot_id: UUID
     camera_id: UUID
     s3_key: str
-    model: str = "yolov8n"
+    model: Optional[str] = None  # Defaults to the tenant's configured model
     threshold: float = 0.5
 
 
@@ -40,6 +51,7 @@ class InferResponse(BaseModel):
     snapshot_id: UUID
     detections: List[DetectionItem]
     annotated_s3_key: Optional[str]
+    roi_area_ratio: Optional[float] = None
     created_at: datetime
 
 
@@ -54,6 +66,19 @@ class CooldownCheckResponse(BaseModel):
     cooldown_remaining_sec: int
 
 
+class CooldownBatchRequest(BaseModel):
+    items: List[CooldownCheckRequest]
+
+
+class CooldownBatchItem(CooldownCheckResponse):
+    camera_id: UUID
+    label: str
+
+
+class CooldownBatchResponse(BaseModel):
+    results: List[CooldownBatchItem]
+
+
 @router.post("/infer/snapshot", response_model=InferResponse)
 async def infer_snapshot(
     body: InferRequest,
@@ -61,43 +86,76 @@ async def infer_snapshot(
 ):
     """Run YOLO inference on a snapshot"""
     storage = get_storage_client()
-    detector = get_detector()
+    settings = get_settings()
+    model = (
+        body.model
+        or settings.yolo_tenant_models.get(token.tenant_id)
+        or settings.yolo_default_model
+    )
+    try:
+        resolve_model_path(model)
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async with get_tenant_session(token.tenant_id) as session:
+        result = await session.execute(
+            select(Camera.roi_polygon).where(Camera.id == body.camera_id)
+        )
+        roi = result.scalar_one_or_none()
+    roi_area_ratio = round(polygon_area(roi), 4) if roi else None
+    
+    async def infer_fresh():
+        # Get snapshot image from S3
+        try:
+            image_data = storage.get_object(body.s3_key)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to get snapshot: {e}")
+        if roi:
+            ROI_AREA_RATIO.observe(roi_area_ratio)
+        return await get_executor().infer(
+            image_data, threshold=body.threshold, model=model, wait=False, roi=roi,
+            priority="interactive", tenant_id=token.tenant_id
+        )
     
-    # Get snapshot image from S3
+    # Reuse the subscriber's (or a concurrent request's) result when available;
+    # runs ahead of queued background work, shedding load only when too many
+    # interactive requests are already waiting
     try:
-        image_data = storage.get_object(body.s3_key)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to get snapshot: {e}")
+        result = await get_result_cache().get_or_compute(
+            body.s3_key, model_tag(model) + roi_tag(roi), body.threshold, infer_fresh
+        )
+    except ExecutorBusyError:
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+    
+    # Render annotated image up front only for significant findings;
+    # anything else is drawn on request via /snapshots/{id}/annotated
+    annotated_s3_key = None
+    if is_significant(result["detections"]):
+        annotated_s3_key = await get_annotation_cache().ensure(
+            token.tenant_id,
+            str(body.snapshot_id),
+            result["detections"],
+            s3_key=body.s3_key
+        )
     
-    # Run inference
-    result = detector.infer(image_data, threshold=body.threshold)
+    await get_heatmap_store().record(
+        token.tenant_id, str(body.camera_id), result["detections"], time.time()
+    )
     
     async with get_tenant_session(token.tenant_id) as session:
-        # Upload annotated image if we have detections
-        annotated_s3_key = None
-        if result["annotated_data"]:
-            annotated_s3_key = storage.upload_annotated(
-                token.tenant_id,
-                str(body.snapshot_id),
-                result["annotated_data"]
-            )
-        
         # Store detections
-        detection_ids = []
-        for det in result["detections"]:
-            detection = Detection(
-                tenant_id=UUID(token.tenant_id),
-                snapshot_id=body.snapshot_id,
-                camera_id=body.camera_id,
-                label=det["label"],
-                confidence=det["confidence"],
-                bbox=det["bbox"],
-                model=body.model,
-                annotated_s3_key=annotated_s3_key
-            )
-            session.add(detection)
-            await session.flush()
-            detection_ids.append(detection.id)
+        detection_ids = await insert_detections(session, detection_rows(
+            token.tenant_id,
+            str(body.snapshot_id),
+            str(body.camera_id),
+            model,
+            result["detections"],
+            annotated_s3_key
+        ))
         
         # Publish event
         event_bus = await get_event_bus()
@@ -108,10 +166,11 @@ async def infer_snapshot(
                 "detection_batch_id": str(detection_ids[0]) if detection_ids else str(body.snapshot_id),
                 "snapshot_id": str(body.snapshot_id),
                 "camera_id": str(body.camera_id),
-                "model": body.model,
+                "model": model,
                 "threshold": body.threshold,
                 "detections": result["detections"],
-                "annotated_s3_key": annotated_s3_key
+                "annotated_s3_key": annotated_s3_key,
+                "roi": {"area_ratio": roi_area_ratio} if roi else None
             },
             producer="afasa-vision-yolo"
         )
@@ -121,10 +180,104 @@ async def infer_snapshot(
             snapshot_id=body.snapshot_id,
             detections=[DetectionItem(**d) for d in result["detections"]],
             annotated_s3_key=annotated_s3_key,
+            roi_area_ratio=roi_area_ratio,
             created_at=datetime.now(timezone.utc)
         )
 
 
+@router.get("/snapshots/{snapshot_id}/annotated")
+async def get_annotated_snapshot(
+    snapshot_id: UUID,
+    token: TokenPayload = Depends(verify_token)
+):
+    """Annotated snapshot image, drawn from stored detections"""
+    async with get_tenant_session(token.tenant_id) as session:
+        result = await session.execute(
+            select(Snapshot).where(Snapshot.id == snapshot_id)
+        )
+        snapshot = result.scalar_one_or_none()
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        
+        result = await session.execute(
+            select(Detection).where(Detection.snapshot_id == snapshot_id)
+        )
+        detections = [
+            {"label": d.label, "confidence": d.confidence, "bbox": d.bbox}
+            for d in result.scalars().all()
+        ]
+    
+    try:
+        _, annotated = await get_annotation_cache().get_or_render(
+            token.tenant_id,
+            str(snapshot_id),
+            detections,
+            s3_key=snapshot.s3_key
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to render snapshot: {e}")
+    
+    return Response(content=annotated, media_type="image/jpeg")
+
+
+@router.get("/cameras/{camera_id}/heatmap")
+async def camera_heatmap(
+    camera_id: UUID,
+    label: Optional[str] = None,
+    days: Optional[int] = Query(None, ge=1),
+    format: str = Query("json", pattern="^(json|png)$"),
+    token: TokenPayload = Depends(verify_token)
+):
+    """
+    Where detections appear in a camera's view, as a GRID x GRID array or PNG.
+    All labels and all time unless label/days narrow it down.
+    """
+    store = get_heatmap_store()
+    grid = await store.load(token.tenant_id, str(camera_id), label=label, days=days)
+    
+    if format == "png":
+        return Response(content=render_png(grid), media_type="image/png")
+    return {
+        "camera_id": str(camera_id),
+        "label": label,
+        "days": days,
+        "grid": GRID,
+        "max": float(grid.max()),
+        "values": grid.round(3).tolist()
+    }
+
+
+@router.get("/quality/cameras")
+async def quality_by_camera(token: TokenPayload = Depends(verify_token)):
+    """Frame quality counters per camera, to spot broken or dirty lenses"""
+    return await camera_quality_stats(token.tenant_id)
+
+
+class ModelSwapRequest(BaseModel):
+    weights_path: str
+
+
+@router.get("/models/status")
+async def model_status(token: TokenPayload = Depends(verify_token)):
+    """Model readiness and hot-swap progress"""
+    return get_lifecycle().status()
+
+
+@router.post("/models/{name}/swap", status_code=202)
+async def swap_model(
+    name: str,
+    body: ModelSwapRequest,
+    token: TokenPayload = Depends(require_role("platform_admin"))
+):
+    """Load new weights for a model in the background and switch over when warm"""
+    try:
+        return get_lifecycle().request_swap(name, body.weights_path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.post("/policy/cooldown/check", response_model=CooldownCheckResponse)
 async def cooldown_check(
     body: CooldownCheckRequest,
@@ -138,10 +291,29 @@ async def cooldown_check(
         body.confidence
     )
     
-    if should_alert:
-        await update_cooldown(token.tenant_id, str(body.camera_id), body.label)
-    
     return CooldownCheckResponse(
         should_alert=should_alert,
         cooldown_remaining_sec=remaining
     )
+
+
+@router.post("/policy/cooldown/check-batch", response_model=CooldownBatchResponse)
+async def cooldown_check_batch(
+    body: CooldownBatchRequest,
+    token: TokenPayload = Depends(verify_token)
+):
+    """Cooldown decisions for every detection of an event in one Redis round trip"""
+    decisions = await check_cooldowns(
+        token.tenant_id,
+        [(str(item.camera_id), item.label, item.confidence) for item in body.items]
+    )
+    
+    return CooldownBatchResponse(results=[
+        CooldownBatchItem(
+            camera_id=item.camera_id,
+            label=item.label,
+            should_alert=should_alert,
+            cooldown_remaining_sec=remaining
+        )
+        for item, (should_alert, remaining) in zip(body.items, decisions)
+    ])
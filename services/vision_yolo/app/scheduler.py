@@ -0,0 +1,160 @@
+"""
+AFASA 2.0 - Inference Slot Scheduler
+Decides which queued batch gets the next free worker: earliest SLO deadline
+across priority classes, weighted-fair across tenants within a class
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+import sys
+sys.path.insert(0, '/app/services')
+
+from app.metrics import QUEUE_WAIT, QUEUE_DEPTH, SLO_MISSES
+
+# Highest priority first
+PRIORITY_CLASSES = ("interactive", "event", "backfill")
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    tenant_id: str
+    priority: str
+    cost: float
+    enqueued_at: float
+    deadline: float
+
+
+class _ClassQueue:
+    """Per-tenant FIFOs plus virtual time for weighted fair queueing"""
+    
+    def __init__(self):
+        self.tenants: Dict[str, Deque[_Waiter]] = {}
+        self.virtual_time: Dict[str, float] = {}
+        self.clock = 0.0  # virtual time of the last grant
+        self.size = 0
+    
+    def push(self, waiter: _Waiter):
+        queue = self.tenants.get(waiter.tenant_id)
+        if queue is None:
+            queue = self.tenants[waiter.tenant_id] = deque()
+            # Tenants (re)joining start level with the others, not with banked credit
+            self.virtual_time[waiter.tenant_id] = max(
+                self.virtual_time.get(waiter.tenant_id, 0.0), self.clock
+            )
+        queue.append(waiter)
+        self.size += 1
+    
+    def head(self) -> Optional[_Waiter]:
+        """Oldest waiter of the tenant that is furthest behind its fair share"""
+        if not self.tenants:
+            return None
+        tenant_id = min(self.tenants, key=lambda t: self.virtual_time[t])
+        return self.tenants[tenant_id][0]
+    
+    def charge(self, tenant_id: str, cost: float, weight: float):
+        self.clock = max(self.clock, self.virtual_time.get(tenant_id, self.clock))
+        self.virtual_time[tenant_id] = self.clock + cost / weight
+    
+    def discard(self, waiter: _Waiter) -> bool:
+        queue = self.tenants.get(waiter.tenant_id)
+        if queue is None or waiter not in queue:
+            return False
+        queue.remove(waiter)
+        self.size -= 1
+        if not queue:
+            del self.tenants[waiter.tenant_id]
+        return True
+
+
+class SlotScheduler:
+    """
+    Grants a fixed number of concurrent executor slots.
+    Among waiting classes the one whose fair-share head has the earliest
+    deadline (enqueue time + class SLO) goes first, so interactive requests
+    jump the queue while long-waiting backfill work still gets through.
+    Cost (images in the batch) is charged against the tenant's weight.
+    """
+    
+    def __init__(
+        self,
+        capacity: int,
+        slo_sec: Dict[str, float],
+        tenant_weights: Optional[Dict[str, float]] = None
+    ):
+        self._free = capacity
+        self._slo_sec = slo_sec
+        self._tenant_weights = tenant_weights or {}
+        self._classes = {priority: _ClassQueue() for priority in PRIORITY_CLASSES}
+    
+    def waiting(self, priority: str) -> int:
+        """Waiters at this priority or higher"""
+        index = PRIORITY_CLASSES.index(priority)
+        return sum(self._classes[p].size for p in PRIORITY_CLASSES[:index + 1])
+    
+    async def acquire(self, priority: str, tenant_id: str, cost: float = 1.0):
+        if priority not in self._classes:
+            raise ValueError(f"Unknown priority class: {priority}")
+        
+        now = time.monotonic()
+        if self._free > 0 and not any(q.size for q in self._classes.values()):
+            self._free -= 1
+            self._classes[priority].charge(tenant_id, cost, self._weight(tenant_id))
+            QUEUE_WAIT.labels(priority=priority, tenant=tenant_id).observe(0)
+            return
+        
+        waiter = _Waiter(
+            future=asyncio.get_running_loop().create_future(),
+            tenant_id=tenant_id,
+            priority=priority,
+            cost=cost,
+            enqueued_at=now,
+            deadline=now + self._slo_sec.get(priority, 60.0)
+        )
+        self._classes[priority].push(waiter)
+        QUEUE_DEPTH.labels(priority=priority).inc()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if self._classes[priority].discard(waiter):
+                QUEUE_DEPTH.labels(priority=priority).dec()
+            elif not waiter.future.cancelled():
+                # Granted just as the caller gave up: hand the slot on
+                self.release()
+            raise
+    
+    def release(self):
+        self._free += 1
+        self._dispatch()
+    
+    def _weight(self, tenant_id: str) -> float:
+        return max(self._tenant_weights.get(tenant_id, 1.0), 0.01)
+    
+    def _dispatch(self):
+        while self._free > 0:
+            heads = [
+                (queue.head(), queue)
+                for queue in self._classes.values()
+                if queue.size
+            ]
+            if not heads:
+                return
+            waiter, queue = min(heads, key=lambda h: h[0].deadline)
+            queue.discard(waiter)
+            QUEUE_DEPTH.labels(priority=waiter.priority).dec()
+            if waiter.future.done():
+                # Cancelled, its task just hasn't run the cleanup yet
+                continue
+            queue.charge(waiter.tenant_id, waiter.cost, self._weight(waiter.tenant_id))
+            
+            now = time.monotonic()
+            QUEUE_WAIT.labels(priority=waiter.priority, tenant=waiter.tenant_id).observe(
+                now - waiter.enqueued_at
+            )
+            if now > waiter.deadline:
+                SLO_MISSES.labels(priority=waiter.priority).inc()
+            
+            self._free -= 1
+            waiter.future.set_result(None)
@@ -2,11 +2,25 @@
 AFASA 2.0 - Snapshot Event Subscriber
 Auto-runs inference on new snapshots
 """
+import time
+from datetime import datetime
 import sys
 sys.path.insert(0, '/app/services')
 
-from common import get_event_bus, EventEnvelope, Subjects, get_storage_client
-from app.infer import get_detector
+from common import get_event_bus, EventEnvelope, Subjects, get_storage_client, get_settings
+from app.annotate import get_annotation_cache, is_significant
+from app.pipeline import process_snapshot
+from app.tracker import get_tracker, delta_detections
+from app.heatmap import get_heatmap_store
+from app.persist import get_detection_writer, detection_rows
+from app.metrics import TRACK_UPDATES, EVENTS_SUPPRESSED
+
+
+def _taken_at(data: dict) -> float:
+    try:
+        return datetime.fromisoformat(data["taken_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
 
 
 async def handle_snapshot_created(envelope: EventEnvelope):
@@ -22,27 +36,73 @@ async def handle_snapshot_created(envelope: EventEnvelope):
         print("Missing required fields in snapshot event")
         return
     
-    print(f"Processing snapshot {snapshot_id} for tenant {tenant_id}")
+    settings = get_settings()
+    model = (
+        data.get("model")
+        or settings.yolo_tenant_models.get(tenant_id)
+        or settings.yolo_default_model
+    )
+    
+    print(f"Processing snapshot {snapshot_id} for tenant {tenant_id} with model {model}")
     
     try:
         storage = get_storage_client()
-        detector = get_detector()
         
         # Get image
         image_data = storage.get_object(s3_key)
         
-        # Run inference
-        result = detector.infer(image_data, threshold=0.5)
+        # Gated and batched with other in-flight snapshots
+        result = await process_snapshot(
+            tenant_id, camera_id, snapshot_id, s3_key, image_data, model,
+            threshold=0.5,
+            roi=data.get("roi_polygon"),
+            # The daily scheduled burst yields to anything a user or event is waiting on
+            priority="backfill" if data.get("reason") == "scheduled" else "event"
+        )
         
-        # Upload annotated if detections found
+        # Follow findings across snapshots (frames the quality gate skipped say nothing)
+        detections = result["detections"]
+        resolved = []
+        skipped = (result["quality"] or {}).get("action") == "skipped"
+        if settings.yolo_tracking_enabled and not skipped:
+            detections, resolved = await get_tracker().update(
+                tenant_id, camera_id, detections, _taken_at(data)
+            )
+            for det in detections:
+                TRACK_UPDATES.labels(status=det["track_status"]).inc()
+            TRACK_UPDATES.labels(status="resolved").inc(len(resolved))
+        
+        await get_heatmap_store().record(tenant_id, camera_id, detections, _taken_at(data))
+        
+        # Deltas need track status; without tracking nothing would ever be "new"
+        deltas = settings.yolo_publish_deltas and settings.yolo_tracking_enabled
+        published = detections
+        if deltas:
+            published = delta_detections(detections)
+            if not published and not resolved:
+                # Still recorded, just not re-announced
+                get_detection_writer().add(tenant_id, detection_rows(
+                    tenant_id, snapshot_id, camera_id, model, detections
+                ))
+                EVENTS_SUPPRESSED.inc()
+                print(f"No new findings in snapshot {snapshot_id}")
+                return
+        
+        # Render annotated image only when the reasoner will need it
         annotated_s3_key = None
-        if result["detections"] and result["annotated_data"]:
-            annotated_s3_key = storage.upload_annotated(
+        if is_significant(published):
+            annotated_s3_key = await get_annotation_cache().ensure(
                 tenant_id,
                 snapshot_id,
-                result["annotated_data"]
+                detections,
+                image_data=image_data
             )
         
+        # Persisted in bulk with other snapshots' detections
+        get_detection_writer().add(tenant_id, detection_rows(
+            tenant_id, snapshot_id, camera_id, model, detections, annotated_s3_key
+        ))
+        
         # Publish detection event
         event_bus = await get_event_bus()
         await event_bus.publish(
@@ -52,16 +112,22 @@ async def handle_snapshot_created(envelope: EventEnvelope):
                 "detection_batch_id": snapshot_id,
                 "snapshot_id": snapshot_id,
                 "camera_id": camera_id,
-                "model": "yolov8n",
+                "model": model,
                 "threshold": 0.5,
-                "detections": result["detections"],
-                "annotated_s3_key": annotated_s3_key
+                "detections": published,
+                "resolved_tracks": resolved,
+                "delta": deltas,
+                "annotated_s3_key": annotated_s3_key,
+                "quality": result["quality"],
+                "duplicate_of": result["duplicate_of"],
+                "motion": result["motion"],
+                "roi": result["roi"]
             },
             producer="afasa-vision-yolo",
             correlation_id=envelope.correlation_id
         )
         
-        print(f"Detected {len(result['detections'])} objects in snapshot {snapshot_id}")
+        print(f"Detected {len(detections)} objects in snapshot {snapshot_id}")
         
     except Exception as e:
         print(f"Error processing snapshot {snapshot_id}: {e}")
@@ -69,10 +135,12 @@ async def handle_snapshot_created(envelope: EventEnvelope):
 
 async def start_snapshot_subscriber():
     """Start listening for snapshot events"""
+    settings = get_settings()
     event_bus = await get_event_bus()
     await event_bus.subscribe(
         Subjects.SNAPSHOT_CREATED,
         handle_snapshot_created,
-        queue="yolo-workers"
+        queue="yolo-workers",
+        max_in_flight=settings.yolo_subscriber_concurrency
     )
     print("Vision YOLO subscriber started")
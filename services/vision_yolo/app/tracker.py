@@ -0,0 +1,243 @@
+"""
+AFASA 2.0 - Cross-Snapshot Detection Tracker
+Stable track IDs per camera so repeated findings aren't re-reported
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import sys
+sys.path.insert(0, '/app/services')
+
+from redis.exceptions import WatchError
+
+from common import get_settings
+from app.redis_client import get_redis
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of Nx4 and Mx4 (x0, y0, x1, y1) boxes"""
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def centroid_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise distance between box centres (normalized units)"""
+    ca = (a[:, :2] + a[:, 2:]) / 2
+    cb = (b[:, :2] + b[:, 2:]) / 2
+    return np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=2)
+
+
+def match_tracks(
+    track_boxes: np.ndarray,
+    track_labels: List[str],
+    det_boxes: np.ndarray,
+    det_labels: List[str],
+    iou_threshold: float,
+    max_centroid_distance: float
+) -> List[Tuple[int, int]]:
+    """
+    Greedy same-label matching: best IoU first, then nearest centroid for
+    small boxes that jitter too much to overlap.
+    """
+    if len(track_boxes) == 0 or len(det_boxes) == 0:
+        return []
+    
+    same_label = np.array(track_labels)[:, None] == np.array(det_labels)[None, :]
+    iou = np.where(same_label, iou_matrix(track_boxes, det_boxes), 0.0)
+    dist = np.where(same_label, centroid_distance(track_boxes, det_boxes), np.inf)
+    
+    # IoU pairs rank above centroid-only pairs
+    score = np.where(iou >= iou_threshold, 1.0 + iou, 0.0)
+    score = np.where((score == 0) & (dist <= max_centroid_distance), 1.0 - dist, score)
+    
+    matches = []
+    used_tracks, used_dets = set(), set()
+    for flat in np.argsort(-score, axis=None):
+        t, d = divmod(int(flat), score.shape[1])
+        if score[t, d] <= 0:
+            break
+        if t in used_tracks or d in used_dets:
+            continue
+        used_tracks.add(t)
+        used_dets.add(d)
+        matches.append((t, d))
+    return matches
+
+
+@dataclass
+class TrackState:
+    """Array-backed tracks for one camera (one row per live track)"""
+    ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint32))
+    boxes: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype=np.float32))
+    hits: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint16))
+    misses: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint16))
+    labels: List[str] = field(default_factory=list)
+    next_id: int = 1
+    last_taken_at: float = 0.0
+    
+    @classmethod
+    def decode(cls, raw: Dict[bytes, bytes]) -> "TrackState":
+        if not raw:
+            return cls()
+        return cls(
+            ids=np.frombuffer(raw[b"ids"], dtype=np.uint32).copy(),
+            boxes=np.frombuffer(raw[b"boxes"], dtype=np.float32).reshape(-1, 4).copy(),
+            hits=np.frombuffer(raw[b"hits"], dtype=np.uint16).copy(),
+            misses=np.frombuffer(raw[b"misses"], dtype=np.uint16).copy(),
+            labels=json.loads(raw[b"labels"]),
+            next_id=int(raw[b"next_id"]),
+            last_taken_at=float(raw[b"last_taken_at"])
+        )
+    
+    def encode(self) -> Dict[str, Any]:
+        return {
+            "ids": self.ids.tobytes(),
+            "boxes": self.boxes.tobytes(),
+            "hits": self.hits.tobytes(),
+            "misses": self.misses.tobytes(),
+            "labels": json.dumps(self.labels),
+            "next_id": self.next_id,
+            "last_taken_at": self.last_taken_at
+        }
+
+
+def tracks_key(tenant_id: str, camera_id: str) -> str:
+    return f"yolo:tracks:{tenant_id}:{camera_id}"
+
+
+class DetectionTracker:
+    """
+    IoU/centroid tracker per camera, state kept in Redis.
+    Tracks survive max_misses snapshots without a match before being resolved,
+    so a single missed detection doesn't produce a resolved/new pair.
+    """
+    
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_centroid_distance: float = 0.05,
+        max_misses: int = 2,
+        ttl_sec: int = 86400
+    ):
+        self._iou_threshold = iou_threshold
+        self._max_centroid_distance = max_centroid_distance
+        self._max_misses = max_misses
+        self._ttl_sec = ttl_sec
+    
+    def step(
+        self,
+        state: TrackState,
+        detections: List[Dict[str, Any]]
+    ) -> Tuple[TrackState, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Advance state by one snapshot: (new state, annotated detections, resolved tracks)"""
+        det_boxes = np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4)
+        det_labels = [d["label"] for d in detections]
+        matches = match_tracks(
+            state.boxes, state.labels, det_boxes, det_labels,
+            self._iou_threshold, self._max_centroid_distance
+        )
+        
+        annotated = [dict(d) for d in detections]
+        ids, hits, misses = state.ids.copy(), state.hits.copy(), state.misses.copy()
+        boxes = state.boxes.copy()
+        matched = np.zeros(len(ids), dtype=bool)
+        for t, d in matches:
+            matched[t] = True
+            boxes[t] = det_boxes[d]
+            hits[t] = min(int(hits[t]) + 1, np.iinfo(np.uint16).max)
+            misses[t] = 0
+            annotated[d].update(track_id=int(ids[t]), track_status="persisting")
+        misses[~matched] += 1
+        
+        # Tracks that have been gone long enough are resolved
+        alive = misses <= self._max_misses
+        resolved = [
+            {
+                "track_id": int(ids[t]),
+                "label": state.labels[t],
+                "bbox": boxes[t].astype(np.float64).round(4).tolist()
+            }
+            for t in np.nonzero(~alive)[0]
+        ]
+        labels = [label for label, keep in zip(state.labels, alive) if keep]
+        ids, boxes, hits, misses = ids[alive], boxes[alive], hits[alive], misses[alive]
+        
+        # Unmatched detections start new tracks
+        matched_dets = {d for _, d in matches}
+        new_rows = [d for d in range(len(detections)) if d not in matched_dets]
+        next_id = state.next_id
+        for d in new_rows:
+            annotated[d].update(track_id=next_id, track_status="new")
+            next_id += 1
+        if new_rows:
+            ids = np.concatenate([ids, np.arange(state.next_id, next_id, dtype=np.uint32)])
+            boxes = np.concatenate([boxes, det_boxes[new_rows]])
+            hits = np.concatenate([hits, np.ones(len(new_rows), dtype=np.uint16)])
+            misses = np.concatenate([misses, np.zeros(len(new_rows), dtype=np.uint16)])
+            labels += [det_labels[d] for d in new_rows]
+        
+        new_state = TrackState(ids, boxes, hits, misses, labels, next_id, state.last_taken_at)
+        return new_state, annotated, resolved
+    
+    async def update(
+        self,
+        tenant_id: str,
+        camera_id: str,
+        detections: List[Dict[str, Any]],
+        taken_at: float
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Annotate detections with track_id/track_status and return resolved tracks.
+        Snapshots older than the last tracked one are annotated without
+        moving the tracks backwards in time.
+        """
+        r = await get_redis()
+        key = tracks_key(tenant_id, camera_id)
+        async with r.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    state = TrackState.decode(await pipe.hgetall(key))
+                    new_state, annotated, resolved = self.step(state, detections)
+                    if taken_at < state.last_taken_at:
+                        await pipe.reset()
+                        return annotated, []
+                    
+                    new_state.last_taken_at = taken_at
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.hset(key, mapping=new_state.encode())
+                    pipe.expire(key, self._ttl_sec)
+                    await pipe.execute()
+                    return annotated, resolved
+                except WatchError:
+                    # Another snapshot for this camera updated the tracks first
+                    continue
+
+
+def delta_detections(detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [d for d in detections if d.get("track_status") == "new"]
+
+
+_tracker: Optional[DetectionTracker] = None
+
+
+def get_tracker() -> DetectionTracker:
+    global _tracker
+    if _tracker is None:
+        settings = get_settings()
+        _tracker = DetectionTracker(
+            iou_threshold=settings.yolo_tracking_iou_threshold,
+            max_centroid_distance=settings.yolo_tracking_max_centroid_distance,
+            max_misses=settings.yolo_tracking_max_misses,
+            ttl_sec=settings.yolo_tracking_ttl_sec
+        )
+    return _tracker
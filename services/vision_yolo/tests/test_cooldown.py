@@ -0,0 +1,29 @@
+"""
+Cooldown policy edge cases
+"""
+import asyncio
+import types
+
+from app import cooldown
+
+
+def test_zero_cooldown_alerts_without_arming(monkeypatch):
+    settings = types.SimpleNamespace(
+        yolo_cooldown_sec=0,
+        yolo_cooldown_min_confidence=0.5,
+        yolo_tenant_cooldown_sec={},
+        yolo_tenant_min_confidence={}
+    )
+    
+    async def get_redis():
+        raise AssertionError("a zero cooldown has nothing to arm")
+    
+    monkeypatch.setattr(cooldown, "get_settings", lambda: settings)
+    monkeypatch.setattr(cooldown, "get_redis", get_redis)
+    
+    results = asyncio.run(cooldown.check_cooldowns("tenant", [
+        ("cam", "leaf_spot", 0.9),
+        ("cam", "leaf_spot", 0.9),
+        ("cam", "aphid", 0.2)
+    ]))
+    assert results == [(True, 0), (True, 0), (False, 0)]
@@ -0,0 +1,85 @@
+"""
+Executor hot-swap: workers only report ready with every preloaded model
+loaded, and batches queued on the old executor must still complete
+"""
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app.executor as executor_module
+import app.infer as infer_module
+from app.executor import InferenceExecutor, replace_executor, _init_worker
+
+
+def _fake_run_batch(images, threshold, classes, model, regions=None, rois=None):
+    time.sleep(0.02)
+    report = {"events": [], "resident_bytes": 0, "models": []}
+    return 1, 0.02, [{"image": image} for image in images], report
+
+
+def _thread_executor() -> InferenceExecutor:
+    executor = InferenceExecutor(workers=1, slo_sec={"event": 30.0})
+    executor._pool.shutdown(wait=False)
+    executor._pool = ThreadPoolExecutor(max_workers=1)
+    return executor
+
+
+def test_swap_completes_queued_batches(monkeypatch):
+    monkeypatch.setattr(executor_module, "_run_batch", _fake_run_batch)
+    
+    async def scenario():
+        old, new = _thread_executor(), _thread_executor()
+        monkeypatch.setattr(executor_module, "_executor", old)
+        
+        # One batch runs, the rest wait in the old executor's scheduler
+        queued = [
+            asyncio.create_task(old.infer_batch([f"q{i}".encode()], tenant_id="t"))
+            for i in range(6)
+        ]
+        await asyncio.sleep(0.005)
+        
+        replace_executor(new)
+        drain = asyncio.create_task(old.drain())
+        await asyncio.sleep(0)
+        # Arrives after the swap through a stale reference
+        late = asyncio.create_task(old.infer_batch([b"late"], tenant_id="t"))
+        
+        results = await asyncio.wait_for(asyncio.gather(*queued, late), timeout=5)
+        await asyncio.wait_for(drain, timeout=5)
+        new._pool.shutdown(wait=True)
+        return results
+    
+    results = asyncio.run(scenario())
+    assert [r[0]["image"] for r in results] == [f"q{i}".encode() for i in range(6)] + [b"late"]
+
+
+class FakeDetector:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.load_error = error
+        self.loaded = error is None
+        self.warmed = False
+    
+    def warmup(self, sizes, runs=1):
+        self.warmed = True
+
+
+def _init(monkeypatch, detectors, preload):
+    monkeypatch.setattr(infer_module, "get_detector", lambda name=None: detectors[name])
+    ready = queue.Queue()
+    _init_worker(1, {}, preload, [64], 1, ready)
+    return ready.get_nowait()
+
+
+def test_worker_loads_and_warms_swapped_model(monkeypatch):
+    detectors = {None: FakeDetector(None), "rust": FakeDetector("rust")}
+    _, _, _, error = _init(monkeypatch, detectors, [None, "rust"])
+    assert error is None
+    assert all(detector.warmed for detector in detectors.values())
+
+
+def test_worker_reports_model_that_failed_to_load(monkeypatch):
+    detectors = {None: FakeDetector(None), "rust": FakeDetector("rust", error="corrupt weights")}
+    _, _, _, error = _init(monkeypatch, detectors, [None, "rust"])
+    assert "rust" in error and "corrupt weights" in error
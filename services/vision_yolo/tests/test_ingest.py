@@ -0,0 +1,32 @@
+"""
+Reduced decodes keep the geometry original_size describes
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.ingest import decode_for_inference, decode_preview
+
+
+def _rotated_jpeg(width: int = 1600, height: int = 800) -> bytes:
+    """Landscape pixels tagged EXIF orientation 6 (rotate 90 degrees to display)"""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buf = io.BytesIO()
+    Image.fromarray(np.zeros((height, width, 3), dtype=np.uint8)).save(buf, format="JPEG", exif=exif)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("decode", [
+    lambda data: decode_for_inference(data, 640),
+    lambda data: decode_for_inference(data, 1600),
+    decode_preview
+])
+def test_exif_orientation_matches_original_size(decode):
+    decoded = decode(_rotated_jpeg())
+    width, height = decoded.original_size
+    assert (width, height) == (1600, 800)
+    assert decoded.array.shape[1] > decoded.array.shape[0]
+    assert decoded.array.shape[1] * decoded.reduction == pytest.approx(width, abs=decoded.reduction)
@@ -0,0 +1,23 @@
+"""
+Change gate tiling for grids that don't divide the nominal reference size
+"""
+import numpy as np
+import pytest
+
+from app.motion import ChangeGate
+
+
+@pytest.mark.parametrize("grid", [8, 10, 7, 64, 100])
+def test_any_grid_compares_frames(grid):
+    gate = ChangeGate(grid=grid)
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640)).astype(np.uint8)
+    reference = gate.reference(frame)
+    assert reference.shape == (gate.size, gate.size)
+    
+    assert gate.evaluate(reference, reference).kind == "unchanged"
+    
+    moved = reference.copy()
+    moved[: gate.size // 4, : gate.size // 4] = 255
+    decision = gate.evaluate(moved, reference)
+    assert decision.kind in ("partial", "full")
+    assert decision.region is None or decision.region[0] == 0.0
@@ -0,0 +1,55 @@
+"""
+Write-behind buffer keeps rows across a failed flush
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from app import persist
+from app.persist import DetectionWriter
+
+
+def test_failed_flush_keeps_rows_for_next_flush(monkeypatch):
+    written = []
+    outage = {"left": 1}
+    
+    @asynccontextmanager
+    async def get_tenant_session(tenant_id):
+        if outage["left"]:
+            outage["left"] -= 1
+            raise ConnectionError("database unavailable")
+        yield None
+    
+    async def insert_detections(session, rows):
+        written.extend(rows)
+    
+    monkeypatch.setattr(persist, "get_tenant_session", get_tenant_session)
+    monkeypatch.setattr(persist, "insert_detections", insert_detections)
+    
+    async def scenario():
+        writer = DetectionWriter(max_rows=100)
+        writer.add("tenant", [{"n": 0}, {"n": 1}])
+        await writer.flush()
+        assert written == []
+        writer.add("tenant", [{"n": 2}])
+        await writer.flush()
+    
+    asyncio.run(scenario())
+    assert written == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_rows_dropped_after_max_retries(monkeypatch):
+    @asynccontextmanager
+    async def get_tenant_session(tenant_id):
+        raise ConnectionError("database unavailable")
+        yield
+    
+    monkeypatch.setattr(persist, "get_tenant_session", get_tenant_session)
+    
+    async def scenario():
+        writer = DetectionWriter(max_retries=2)
+        writer.add("tenant", [{"n": 0}])
+        for _ in range(3):
+            await writer.flush()
+        return writer._buffer
+    
+    assert asyncio.run(scenario()) == {}
@@ -0,0 +1,48 @@
+"""
+Single-flight: one caller going away must not fail the others
+"""
+import asyncio
+
+from app import result_cache
+from app.result_cache import ResultCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+    
+    async def get(self, key):
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+def test_cancelled_owner_leaves_shared_computation_running(monkeypatch):
+    fake = FakeRedis()
+    
+    async def get_redis():
+        return fake
+    
+    monkeypatch.setattr(result_cache, "get_redis", get_redis)
+    cache = ResultCache()
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"detections": [], "image_size": [640, 480]}
+    
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_compute("snap.jpg", "chili", 0.5, compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_compute("snap.jpg", "chili", 0.5, compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter, owner.cancelled()
+    
+    result, owner_cancelled = asyncio.run(scenario())
+    assert owner_cancelled
+    assert result == {"detections": [], "image_size": [640, 480]}
+    assert len(calls) == 1
+    assert asyncio.run(cache.get("snap.jpg", "chili", 0.5)) == result
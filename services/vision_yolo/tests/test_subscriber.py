@@ -0,0 +1,59 @@
+"""
+Delta publishing only applies when tracking is on to mark detections "new"
+"""
+import asyncio
+import types
+import uuid
+
+from app import subscriber
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+    
+    def add(self, *args):
+        self.calls.append(args)
+    
+    async def record(self, *args):
+        self.calls.append(args)
+    
+    async def publish(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+def test_deltas_without_tracking_publish_every_detection(monkeypatch):
+    detections = [{"label": "leaf_spot", "confidence": 0.9, "bbox": [0.1, 0.1, 0.2, 0.2]}]
+    settings = types.SimpleNamespace(
+        yolo_tenant_models={},
+        yolo_default_model="chili",
+        yolo_tracking_enabled=False,
+        yolo_publish_deltas=True
+    )
+    bus = Recorder()
+    
+    async def process_snapshot(*args, **kwargs):
+        return {"detections": detections, "quality": None, "duplicate_of": None, "motion": None, "roi": None}
+    
+    async def get_event_bus():
+        return bus
+    
+    monkeypatch.setattr(subscriber, "get_settings", lambda: settings)
+    monkeypatch.setattr(subscriber, "get_storage_client", lambda: types.SimpleNamespace(get_object=lambda key: b""))
+    monkeypatch.setattr(subscriber, "process_snapshot", process_snapshot)
+    monkeypatch.setattr(subscriber, "get_heatmap_store", Recorder)
+    monkeypatch.setattr(subscriber, "get_detection_writer", Recorder)
+    monkeypatch.setattr(subscriber, "is_significant", lambda published: False)
+    monkeypatch.setattr(subscriber, "get_event_bus", get_event_bus)
+    
+    envelope = types.SimpleNamespace(
+        tenant_id=str(uuid.uuid4()),
+        correlation_id=None,
+        data={"snapshot_id": str(uuid.uuid4()), "camera_id": str(uuid.uuid4()), "s3_key": "snap.jpg"}
+    )
+    asyncio.run(subscriber.handle_snapshot_created(envelope))
+    
+    assert len(bus.calls) == 1
+    (_, _, payload), _ = bus.calls[0]
+    assert payload["detections"] == detections
+    assert payload["delta"] is False